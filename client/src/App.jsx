@@ -33,7 +33,7 @@ const App = () => {
 
   const fetchData = (project) => {
     // Fetch data for the selected project
-    axios.get(`http://127.0.0.1:5000/get_csv_data_monthly_aggregated?project=${project}`)
+    axios.get('http://127.0.0.1:5000/get_csv_data_monthly_aggregated', { params: { project } })
       .then(response => {
         console.log('Fetched data:', response.data);
         setData(response.data);
@@ -69,10 +69,10 @@ const App = () => {
 
               <TabPanel>
                 <div className="margin-top-3">
-                  <QualityImportanceStackedBarChart />
+                  <QualityImportanceStackedBarChart project={selectedProject} />
                 </div> 
                 <div className="margin-top-3">
-                  <ImportanceQualityStackedBarChart />
+                  <ImportanceQualityStackedBarChart project={selectedProject} />
                 </div> 
                 <div className="margin-top-3">
                   <Graph data={data} metrics={metrics} />
@@ -81,10 +81,10 @@ const App = () => {
 
               <TabPanel>
                 <div className="margin-top-3">
-                  <FilterTable />
+                  <FilterTable project={selectedProject} />
                 </div>
                 {/* <div className="margin-top-3">
-                  <FeatureCorrelationHeatmap />
+                  <FeatureCorrelationHeatmap project={selectedProject} />
                 </div> */}
               </TabPanel>
             </Tabs>
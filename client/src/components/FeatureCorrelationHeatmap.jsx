@@ -2,20 +2,20 @@ import React, { useState, useEffect } from 'react';
 import axios from 'axios';
 import Plot from 'react-plotly.js';
 
-const FeatureCorrelationHeatmap = () => {
+const FeatureCorrelationHeatmap = ({ project }) => {
     const [keys, setKeys] = useState([]);
     const [values, setValues] = useState([]);
 
     useEffect(() => {
         // Fetch the correlation data from the backend
-        axios.get('http://127.0.0.1:5000/get_correlation')
+        axios.get('http://127.0.0.1:5000/get_correlation', { params: { project } })
             .then(response => {
-                console.log('Raw response data:', response.data); // Log the raw response data
-                const parsedData = JSON.parse(response.data);
-                console.log('Parsed data:', parsedData); // Log the parsed data
+                // The matrix comes as {feature: {feature: correlation}}
+                const correlations = response.data;
                 
-                let keys = Object.keys(parsedData.pred_qual);
-                let values = keys.map(key => parsedData.pred_qual[key]);
+                // Features that do not vary have no correlation (null)
+                let keys = Object.keys(correlations.pred_qual).filter(key => correlations.pred_qual[key] !== null);
+                let values = keys.map(key => correlations.pred_qual[key]);
                 
                 // Check for NaN values
                 if (values.some(val => isNaN(val))) {
@@ -34,7 +34,7 @@ const FeatureCorrelationHeatmap = () => {
             .catch(error => {
                 console.error('Error fetching correlation data:', error);
             });
-    }, []);
+    }, [project]);
 
     if (keys.length === 0 || values.length === 0) {
         return <div>Loading...</div>;
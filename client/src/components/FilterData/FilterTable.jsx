@@ -3,7 +3,13 @@ import axios from 'axios';
 import SelectedArticles from './SelectedArticles';
 import DataTable from 'react-data-table-component';
 
-const FilterTable = () => {
+// Columns shown in the table, plus the ones SelectedArticles needs
+const TABLE_COLUMNS = [
+    'page_id', 'page_title', 'revision_id', 'num_refs', 'num_wikilinks', 'num_media',
+    'num_categories', 'num_headings', 'page_length', 'pred_qual', 'quality_class', 'importance_class'
+];
+
+const FilterTable = ({ project }) => {
     const [filters, setFilters] = useState({
         num_refs_min: '',
         num_refs_max: '',
@@ -24,11 +30,14 @@ const FilterTable = () => {
     });
 
     const [tableData, setTableData] = useState([]);
+    const [totalRows, setTotalRows] = useState(0);
     const [selectedRows, setSelectedRows] = useState([]); // Reset to an empty array
+    // Filters last applied (null shows the complete data), current page and sort; the server pages and sorts
+    const [query, setQuery] = useState({ filters: null, page: 1, perPage: 10, sortBy: null, order: 'asc' });
 
     useEffect(() => {
         // Fetch min/max values to set placeholders
-        axios.get('http://127.0.0.1:5000/minmax')
+        axios.get('http://127.0.0.1:5000/minmax', { params: { project } })
             .then(response => {
                 const data = response.data;
                 setFilters(prevFilters => ({
@@ -50,14 +59,27 @@ const FilterTable = () => {
                 }));
             })
             .catch(error => console.error('Error fetching min/max values:', error));
-        
-        // Fetch complete data initially
-        axios.get('http://127.0.0.1:5000/get_csv_data')
+    }, [project]);
+
+    useEffect(() => {
+        // Fetch only the rows of the current page
+        const paging = {
+            limit: query.perPage,
+            offset: (query.page - 1) * query.perPage,
+            order: query.order,
+            columns: TABLE_COLUMNS,
+            ...(query.sortBy ? { sort_by: query.sortBy } : {})
+        };
+        const pageRequest = query.filters
+            ? axios.post('http://127.0.0.1:5000/filter', { ...query.filters, ...paging }, { params: { project } })
+            : axios.get('http://127.0.0.1:5000/get_csv_data', { params: { project, ...paging, columns: TABLE_COLUMNS.join(',') } });
+        pageRequest
             .then(response => {
-                setTableData(response.data);
+                setTableData(response.data.rows);
+                setTotalRows(response.data.total);
             })
             .catch(error => console.error('Error fetching data:', error));
-    }, []);
+    }, [project, query]);
 
     const handleInputChange = (event) => {
         const { name, value } = event.target;
@@ -109,67 +131,74 @@ const FilterTable = () => {
             importance_class: filters.importance_class
         };
 
-        axios.post('http://127.0.0.1:5000/filter', numericFilters)
-            .then(response => {
-                setTableData(response.data);
-            })
-            .catch(error => console.error('Error filtering data:', error));
+        setQuery(prevQuery => ({ ...prevQuery, filters: numericFilters, page: 1 }));
     };
     const columns = [
         {
             name: 'Page Title',
             selector: row => row.page_title,
+            sortField: 'page_title',
             sortable: true,
             cell: row => <a href={`https://en.wikipedia.org/w/index.php?oldid=${row.revision_id}`} target="_blank" rel="noopener noreferrer">{row.page_title}</a>
         },
         {
             name: 'Number of References',
             selector: row => row.num_refs,
+            sortField: 'num_refs',
             sortable: true,
         },
         {
             name: 'Number of Wikilinks',
             selector: row => row.num_wikilinks,
+            sortField: 'num_wikilinks',
             sortable: true,
         },
         {
             name: 'Number of Media',
             selector: row => row.num_media,
+            sortField: 'num_media',
             sortable: true,
         },
         {
             name: 'Number of Categories',
             selector: row => row.num_categories,
+            sortField: 'num_categories',
             sortable: true,
         },
         {
             name: 'Number of Headings',
             selector: row => row.num_headings,
+            sortField: 'num_headings',
             sortable: true,
         },
         {
             name: 'Page Length',
             selector: row => row.page_length,
+            sortField: 'page_length',
             sortable: true,
         },
         {
             name: 'Predicted Quality',
             selector: row => row.pred_qual,
+            sortField: 'pred_qual',
             sortable: true,
         },
         {
             name: 'Revision ID',
             selector: row => row.revision_id,
+            sortField: 'revision_id',
             sortable: true,
         },
         {
             name: 'Quality Class',
             selector: row => row.quality_class,
+            sortField: 'quality_class',
             sortable: true,
         },
         {
             name: 'Importance Class',
             selector: row => row.importance_class,
+            sortField: 'importance_class',
             sortable: true,
         },
     ];
@@ -178,6 +207,18 @@ const FilterTable = () => {
         setSelectedRows(state.selectedRows);
     };
 
+    const handlePageChange = (page) => {
+        setQuery(prevQuery => ({ ...prevQuery, page }));
+    };
+
+    const handlePerRowsChange = (perPage, page) => {
+        setQuery(prevQuery => ({ ...prevQuery, perPage, page }));
+    };
+
+    const handleSort = (column, sortDirection) => {
+        setQuery(prevQuery => ({ ...prevQuery, sortBy: column.sortField, order: sortDirection, page: 1 }));
+    };
+
     return (
         <div className="main-container">
             <section>
@@ -444,6 +485,12 @@ const FilterTable = () => {
                         selectableRows
                         onSelectedRowsChange={handleSelectedRowsChange}
                         pagination
+                        paginationServer
+                        paginationTotalRows={totalRows}
+                        onChangePage={handlePageChange}
+                        onChangeRowsPerPage={handlePerRowsChange}
+                        sortServer
+                        onSort={handleSort}
                         highlightOnHover
                         pointerOnHover
                         selectableRowsComponentProps={{ inkdisabled: "true" }}
@@ -451,7 +498,7 @@ const FilterTable = () => {
                 </div>
 
 
-                <SelectedArticles selectedRows={selectedRows} key={tableData.length} />
+                <SelectedArticles project={project} selectedRows={selectedRows} key={totalRows} />
             </section>
         </div>
     );
@@ -3,7 +3,7 @@ import axios from 'axios';
 import Plot from 'react-plotly.js';
 import moment from 'moment';
 
-const SelectedArticles = ({ selectedRows }) => {
+const SelectedArticles = ({ project, selectedRows }) => {
     const [articleData, setArticleData] = useState([]);
     const [pageViewsData, setPageViewsData] = useState([]);
 
@@ -15,16 +15,15 @@ const SelectedArticles = ({ selectedRows }) => {
             setArticleData([]);
             setPageViewsData([]);
         }
-    }, [selectedRows]);
+    }, [project, selectedRows]);
 
     const fetchAllArticlesData = (articles) => {
-        const articlePromises = articles.map(article => 
-            axios.get(`http://127.0.0.1:5000/get_article_data?page_id=${article.page_id}`)
-        );
-
-        Promise.all(articlePromises)
-            .then(responses => {
-                const allArticleData = responses.map(response => response.data);
+        // Fetch the monthly data of all selected articles in one request
+        axios.post('http://127.0.0.1:5000/get_articles_data', { page_ids: articles.map(article => article.page_id) }, { params: { project } })
+            .then(response => {
+                const allArticleData = articles
+                    .map(article => response.data.articles[article.page_id])
+                    .filter(Boolean);
                 const aggregatedArticleData = aggregateArticleData(allArticleData);
                 setArticleData(aggregatedArticleData);
 
@@ -42,13 +41,10 @@ const SelectedArticles = ({ selectedRows }) => {
     };
 
     const fetchPageViewsData = (titles, start, end) => {
-        const pageViewsPromises = titles.map(title => 
-            axios.get(`http://127.0.0.1:5000/get_pageviews?title=${title}&start=${start}&end=${end}`)
-        );
-
-        Promise.all(pageViewsPromises)
-            .then(responses => {
-                const allPageViewsData = responses.flatMap(response => response.data.items);
+        // Fetch the page views of all titles in one request; the server queries them concurrently
+        axios.post('http://127.0.0.1:5000/get_pageviews_batch', { titles, start, end })
+            .then(response => {
+                const allPageViewsData = Object.values(response.data.pageviews).flatMap(pageviews => pageviews.items);
                 const aggregatedPageViewsData = aggregatePageViewsData(allPageViewsData);
                 setPageViewsData(aggregatedPageViewsData);
             })
@@ -137,10 +133,11 @@ const SelectedArticles = ({ selectedRows }) => {
     };
 
     const downloadCSV = () => {
-        const articleTitles = Array.isArray(selectedRows) ? selectedRows.map(article => article.page_title) : [];
-        axios.post('http://127.0.0.1:5000/download_csv', articleTitles)
+        const pageIds = Array.isArray(selectedRows) ? selectedRows.map(article => article.page_id) : [];
+        // The server streams the monthly rows of the selected articles as CSV
+        axios.post('http://127.0.0.1:5000/download_csv', { page_ids: pageIds }, { params: { project }, responseType: 'blob' })
             .then(response => {
-                const url = window.URL.createObjectURL(new Blob([response.data]));
+                const url = window.URL.createObjectURL(response.data);
                 const link = document.createElement('a');
                 link.href = url;
                 link.setAttribute('download', 'selected_articles.csv');
@@ -3,18 +3,18 @@ import Plot from 'react-plotly.js';
 import axios from 'axios';
 // import './ChartStyles.css'; // Ensure this CSS file includes the provided styles
 
-const ImportanceBarChart = () => {
+const ImportanceBarChart = ({ project }) => {
     const [data, setData] = useState([]);
     const [importanceCounts, setImportanceCounts] = useState([]);
 
     useEffect(() => {
-        axios.get('http://127.0.0.1:5000/get_csv_data')
+        axios.get('http://127.0.0.1:5000/get_csv_data', { params: { project } })
             .then(response => {
                 console.log('Fetched data:', response.data); // Debug statement
                 setData(response.data);
             })
             .catch(error => console.error('Error fetching data:', error));
-    }, []);
+    }, [project]);
 
     useEffect(() => {
         if (data.length === 0) return;
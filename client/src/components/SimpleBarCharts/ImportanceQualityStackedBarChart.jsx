@@ -2,7 +2,7 @@ import React, { useEffect, useState } from 'react';
 import Plot from 'react-plotly.js';
 import axios from 'axios';
 
-const QualityStackedBarChart = () => {
+const QualityStackedBarChart = ({ project }) => {
     const [data, setData] = useState([]);
     const [stackedData, setStackedData] = useState([]);
 
@@ -17,12 +17,12 @@ const QualityStackedBarChart = () => {
     };
 
     useEffect(() => {
-        axios.get('http://127.0.0.1:5000/get_csv_data')
+        axios.get('http://127.0.0.1:5000/get_csv_data', { params: { project } })
             .then(response => {
                 setData(response.data);
             })
             .catch(error => console.error('Error fetching data:', error));
-    }, []);
+    }, [project]);
 
     useEffect(() => {
         if (data.length === 0) return;
@@ -1,25 +1,40 @@
-import React, { useState, useEffect } from 'react';
-import Select from 'react-select';
+import React from 'react';
+import AsyncSelect from 'react-select/async';
 import axios from 'axios';
 
 const WikiProjectDropdown = ({ onSelectProject }) => {
-  const [wikiprojects, setWikiProjects] = useState([]);
+  // Search the WikiProjects on the server as the user types
+  const loadWikiProjects = (inputValue) =>
+    axios.get('http://127.0.0.1:5000/wikiprojects/search', { params: { q: inputValue, limit: 50 } })
+      .then(response => response.data.map(project => ({ label: project.name, value: project.name })))
+      .catch(error => {
+        console.error('Error fetching WikiProjects:', error);
+        return [];
+      });
 
-  useEffect(() => {
-    axios.get('http://127.0.0.1:5000/get_wikiprojects')
+  // Poll the ingest job started by the selection until the project data is ready
+  const waitForJob = (jobId, onDone) => {
+    axios.get(`http://127.0.0.1:5000/jobs/${jobId}`)
       .then(response => {
-        setWikiProjects(response.data.map(name => ({ label: name, value: name })));
+        const job = response.data;
+        if (job.state === 'succeeded') {
+          onDone();
+        } else if (job.state === 'failed') {
+          console.error('Error processing WikiProject:', job.error);
+        } else {
+          setTimeout(() => waitForJob(jobId, onDone), 1000);
+        }
       })
       .catch(error => {
-        console.error('Error fetching WikiProjects:', error);
+        console.error('Error fetching job status:', error);
       });
-  }, []);
+  };
 
   const handleProjectSelect = (option) => {
     axios.post('http://127.0.0.1:5000/set_selected_wikiproject', { project_name: option.value })
       .then(response => {
         console.log('WikiProject selected successfully:', response.data);
-        onSelectProject(option.value); // You may still want to do something with the selected project.
+        waitForJob(response.data.job_id, () => onSelectProject(option.value));
       })
       .catch(error => {
         console.error('Error selecting WikiProject:', error);
@@ -29,8 +44,10 @@ const WikiProjectDropdown = ({ onSelectProject }) => {
 
 
   return (
-    <Select
-      options={wikiprojects}
+    <AsyncSelect
+      cacheOptions
+      defaultOptions
+      loadOptions={loadWikiProjects}
       onChange={(option) => {
         onSelectProject(option.value);
         handleProjectSelect(option);
@@ -69,9 +86,6 @@ const WikiProjectDropdown = ({ onSelectProject }) => {
           primary: '#007bff',
         },
       })}
-      filterOption={(option, inputValue) => 
-        option.label.toLowerCase().includes(inputValue.toLowerCase())
-      }
     />
   );
 };
@@ -1,104 +1,181 @@
 from flask import Flask, request, jsonify,Response
+import numpy as np
 import pandas as pd
 import io
+import json
 from flask_cors import CORS
 import requests
-from bs4 import BeautifulSoup
 import os
-import process_wikiproject_monthly
-import process_wikiproject_latest
+from dataset_cache import DatasetCache
+from filter_engine import FilterIndex
+from article_index import ArticleIndex
+from table_view import PageRequest, SortOrder, select_page
+from serialization import compress_response, dataframe_response, dataframe_to_json, requested_format, stream_response
+from csv_export import ExportRequest, csv_chunks
+from data_registry import DataRegistry, DatasetNotFound, project_name
+from raw_cache import raw_cache
+from catalog import wikiproject_catalog, MAX_SEARCH_RESULTS
+from pageviews import pageviews_client, PageviewsError
+from ingest_jobs import JobManager
+from process_wikiproject_monthly import aggregate_months, AGGREGATE_STATS
+from correlation import correlation_stats
+from metrics import PROMETHEUS_CONTENT_TYPE, instrument_app, metrics, record_cache_stats
 
 app = Flask(__name__)
 CORS(app)
+# Time every request, including the compression below
+instrument_app(app)
+# Compress responses with gzip or brotli, as negotiated with Accept-Encoding
+app.after_request(compress_response)
 
-selected_wikiproject = None
+# Parsed datasets shared by all read endpoints, and the artifacts of every project on top of it
+dataset_cache = DatasetCache()
+data_registry = DataRegistry(dataset_cache)
+
+# Most articles a single /get_articles_data or /get_pageviews_batch request can ask for
+MAX_BATCH_ARTICLES = 1000
+
+# Columns needed to compute the filter bounds
+MINMAX_COLUMNS = ['num_refs', 'num_media', 'num_wikilinks', 'num_categories', 'num_headings', 'page_length', 'pred_qual']
+
+# Columns of the merged data mapping articles to their titles
+TITLE_COLUMNS = ['page_id', 'page_title']
+
+# WikiProject a read request is about, named by its `project` query parameter.
+# Requests without one are rejected, as every worker process may serve any project.
+def requested_project():
+    if not request.args.get('project'):
+        raise ValueError("No WikiProject given, pass it as the 'project' query parameter")
+    return project_name(request.args.get('project'))
+
+# Map page_id -> page_title and page_title -> page_id over the merged data of a project
+def article_titles(df):
+    titles = dict(zip(df['page_id'].tolist(), df['page_title'].tolist()))
+    return titles, {title: page_id for page_id, title in titles.items()}
+
+# Respond with one page of the selected rows of a dataset, see table_view.PageRequest.
+# `derived(name, builder)` returns a structure derived from the dataset, cached with it.
+def page_response(df, rows, page_request, derived):
+    page_request.validate(df)
+    sort_order = None
+    if page_request.sort_by:
+        sort_order = derived(f"sort_order:{page_request.sort_by}", lambda df: SortOrder(df[page_request.sort_by]))
+    total, page = select_page(df, rows, page_request, sort_order)
+    body = '{"total": %d, "offset": %d, "limit": %d, "rows": %s}' % (
+        total, page_request.offset, page_request.limit, dataframe_to_json(page, requested_format()))
+    return Response(body, mimetype='application/json')
+
+# Drop the cached datasets of a project once its ingest has finished
+def invalidate_project_datasets(job):
+    data_registry.invalidate(job.project)
+
+ingest_jobs = JobManager(on_finished=invalidate_project_datasets)
 
 @app.route('/set_selected_wikiproject', methods=['POST'])
 def set_selected_wikiproject():
-    global selected_wikiproject
     data = request.json
-    selected_wikiproject = data.get('project_name')
-    
-    if not selected_wikiproject:
+    if not data.get('project_name'):
         return jsonify({'error': 'No WikiProject name provided'}), 400
-    
-    # Call the first processing function
     try:
-        process_wikiproject_monthly.main(selected_wikiproject)
-    except Exception as e:
-        return jsonify({'error': f"Failed to process monthly data: {str(e)}"}), 500
+        project = project_name(data.get('project_name'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # Call the second processing function
-    try:
-        process_wikiproject_latest.main(selected_wikiproject)
-        return jsonify({'success': f'Selected WikiProject set to {selected_wikiproject} and processing started for both scripts.'}), 200
-    except Exception as e:
-        return jsonify({'error': f"Failed to process latest data: {str(e)}"}), 500
+    # Ingest the project in the background; a selection of a project that is
+    # already being ingested attaches to the running job
+    job = ingest_jobs.submit(project)
+    return jsonify({
+        'success': f'Selected WikiProject set to {project} and processing started for both scripts.',
+        'job_id': job.id,
+        'job': job.to_dict(),
+    }), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
 
-# Fetch WikiProjects from the URL
+# Fetch WikiProjects from the catalog, which revalidates the upstream listing in the background
 @app.route('/get_wikiprojects', methods=['GET'])
 def get_wikiprojects():
-    url = 'https://analytics.wikimedia.org/published/datasets/outreachy-round-28/revisions/'
-    response = requests.get(url)
-    if response.status_code == 200:
-        soup = BeautifulSoup(response.text, 'html.parser')
-        links = soup.find_all('a')
-        wikiprojects = [link.get('href') for link in links if link.get('href').endswith('.csv')]
-        wikiproject_names = [link.replace('.csv', '') for link in wikiprojects]
-        return jsonify(wikiproject_names)
-    else:
-        print(f'Failed to fetch WikiProjects, status code: {response.status_code}')
-        print(response.text)
+    try:
+        return jsonify([project['name'] for project in wikiproject_catalog.projects()])
+    except Exception as e:
+        print(f'Failed to fetch WikiProjects: {e}')
+        return jsonify({'error': 'Failed to fetch WikiProjects'}), 500
+
+
+# Search WikiProjects by name prefix, returning their file size and last-modified time
+@app.route('/wikiprojects/search', methods=['GET'])
+def search_wikiprojects():
+    try:
+        query = request.args.get('q', '')
+        limit = min(int(request.args.get('limit', MAX_SEARCH_RESULTS)), MAX_SEARCH_RESULTS)
+        return jsonify(wikiproject_catalog.search(query, limit))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f'Failed to fetch WikiProjects: {e}')
         return jsonify({'error': 'Failed to fetch WikiProjects'}), 500
     
 
+# Sample data served when no project is given, found next to this file whatever the working directory
+SAMPLE_DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'df_revisions_pred_manual_Carribean.csv')
+
 @app.route('/get_csv_data', methods=['GET'])
 def get_csv_data():
-    df = pd.read_csv('df_revisions_pred_manual_Carribean.csv')
-    return jsonify(df.to_dict(orient='records'))    
+    try:
+        # Serve the merged data of the requested project, or the sample data
+        if request.args.get('project'):
+            project = requested_project()
+            df = data_registry.load(project, 'merged')
+            derived = lambda name, builder: data_registry.derived(project, 'merged', name, builder)
+        else:
+            df = dataset_cache.get(SAMPLE_DATA_FILE)
+            derived = lambda name, builder: dataset_cache.get_derived(SAMPLE_DATA_FILE, name, builder)
+        page_request = PageRequest(request.args)
+        if page_request.paginated:
+            return page_response(df, np.arange(len(df)), page_request, derived)
+        return dataframe_response(df)
+    except DatasetNotFound as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        # Handle exceptions and return a JSON response with the error message
+        return jsonify({"error": str(e)}), 500
 
 @app.route('/get_csv_data_monthly_aggregated', methods=['GET'])
 def get_csv_data_monthly_aggregated():
     try:
-        # Ensure that the selected_wikiproject is set
-        if not selected_wikiproject:
-            return jsonify({"error": "No WikiProject selected"}), 400
+        # Get the WikiProject from the request
+        project = requested_project()
 
-        # Construct the CSV file name based on the selected Wikiproject
-        csv_file_name = f"{selected_wikiproject}_latest_monthly.csv"
-        
-        # Check if the file exists
-        if not os.path.exists(csv_file_name):
-            return jsonify({"error": f"CSV file '{csv_file_name}' does not exist"}), 404
-        
-        # Read the CSV file
-        df = pd.read_csv(csv_file_name)
-        
-        # Convert 'month' column to datetime
-        df['month'] = pd.to_datetime(df['month'], format='%Y-%m')
-        
-        # Sort the dataframe by 'month'
-        df = df.sort_values(by='month')
-        
-        # Select only numeric columns for aggregation
-        numeric_columns = df.select_dtypes(include='number').columns
-        
-        # Calculate monthly unique mean
-        monthly_mean = df.groupby(df['month'].dt.to_period('M'))[numeric_columns].mean().reset_index()
-        
-        # Calculate monthly unique sum
-        monthly_sum = df.groupby(df['month'].dt.to_period('M'))[numeric_columns].sum().reset_index()
+        # Statistics to return for every feature
+        stats = request.args.get('stats', 'mean,sum').split(',')
+        if not set(stats) <= set(AGGREGATE_STATS):
+            return jsonify({"error": f"Unknown statistic, expected any of {AGGREGATE_STATS}"}), 400
         
-        # Convert 'month' back to string for JSON serialization
-        monthly_mean['month'] = monthly_mean['month'].astype(str)
-        monthly_sum['month'] = monthly_sum['month'].astype(str)
+        # Serve the aggregates materialized at ingest time
+        try:
+            monthly_aggregated = data_registry.load(project, 'monthly_aggregated')
+        except DatasetNotFound:
+            # Projects ingested before the aggregates were materialized are aggregated once per load
+            monthly_aggregated = data_registry.derived(project, 'latest_monthly', 'monthly_aggregated', aggregate_months)
         
-        # Merge mean and sum dataframes
-        monthly_aggregated = monthly_mean.merge(monthly_sum, on='month', suffixes=('_mean', '_sum'))
+        # Keep the month and the requested statistics
+        columns = ['month'] + [column for column in monthly_aggregated.columns if column.rsplit('_', 1)[-1] in stats]
+        monthly_aggregated = monthly_aggregated[columns]
         
         # Return the JSON response
-        return jsonify(monthly_aggregated.to_dict(orient='records'))
+        return dataframe_response(monthly_aggregated)
     
+    except DatasetNotFound as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         # Handle exceptions and return a JSON response with the error message
         return jsonify({"error": str(e)}), 500
@@ -108,19 +185,11 @@ def get_csv_data_monthly_aggregated():
 @app.route('/minmax', methods=['GET'])
 def get_minmax():
     try:
-        # Ensure that the selected_wikiproject is set
-        if not selected_wikiproject:
-            return jsonify({"error": "No WikiProject selected"}), 400
-
-        # Construct the CSV file name based on the selected Wikiproject
-        csv_file_name = f"{selected_wikiproject}_merged.csv"
-        
-        # Check if the file exists
-        if not os.path.exists(csv_file_name):
-            return jsonify({"error": f"CSV file '{csv_file_name}' does not exist"}), 404
+        # Get the WikiProject from the request
+        project = requested_project()
         
-        # Read the CSV file
-        df = pd.read_csv(csv_file_name)
+        # Read the data
+        df = data_registry.load(project, 'merged', columns=MINMAX_COLUMNS)
         
         # Calculate the min and max values for the specified columns
         minmax_values = {
@@ -134,6 +203,10 @@ def get_minmax():
         }
         return jsonify(minmax_values)
     
+    except DatasetNotFound as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         # Handle exceptions and return a JSON response with the error message
         return jsonify({"error": str(e)}), 500
@@ -142,91 +215,83 @@ def get_minmax():
 @app.route('/filter', methods=['POST'])
 def filter_data():
     try:
-        # Ensure that the selected_wikiproject is set
-        if not selected_wikiproject:
-            return jsonify({"error": "No WikiProject selected"}), 400
-
-        # Construct the CSV file name based on the selected Wikiproject
-        csv_file_name = f"{selected_wikiproject}_merged.csv"
+        # Get the WikiProject from the request
+        project = requested_project()
         
-        # Check if the file exists
-        if not os.path.exists(csv_file_name):
-            return jsonify({"error": f"CSV file '{csv_file_name}' does not exist"}), 404
-        
-        # Read the CSV file
-        df = pd.read_csv(csv_file_name)
+        # Read the data and the filter index built over it
+        df = data_registry.load(project, 'merged')
+        filter_index = data_registry.derived(project, 'merged', 'filter_index', FilterIndex)
         
         # Get the filters from the request
         filters = request.json
         
         # Filter the data based on the provided criteria
-        filtered_data = df[
-            (df['num_refs'] >= filters.get('num_refs_min', df['num_refs'].min())) &
-            (df['num_refs'] <= filters.get('num_refs_max', df['num_refs'].max())) &
-            (df['num_media'] >= filters.get('num_media_min', df['num_media'].min())) &
-            (df['num_media'] <= filters.get('num_media_max', df['num_media'].max())) &
-            (df['num_wikilinks'] >= filters.get('num_wikilinks_min', df['num_wikilinks'].min())) &
-            (df['num_wikilinks'] <= filters.get('num_wikilinks_max', df['num_wikilinks'].max())) &
-            (df['num_categories'] >= filters.get('num_categories_min', df['num_categories'].min())) &
-            (df['num_categories'] <= filters.get('num_categories_max', df['num_categories'].max())) &
-            (df['num_headings'] >= filters.get('num_headings_min', df['num_headings'].min())) &
-            (df['num_headings'] <= filters.get('num_headings_max', df['num_headings'].max())) &
-            (df['page_length'] >= filters.get('page_length_min', df['page_length'].min())) &
-            (df['page_length'] <= filters.get('page_length_max', df['page_length'].max())) &
-            (df['pred_qual'] >= filters.get('pred_qual_min', df['pred_qual'].min())) &
-            (df['pred_qual'] <= filters.get('pred_qual_max', df['pred_qual'].max()))
-        ]
-        
-        # Apply additional filters if provided
-        if filters.get('quality_class'):
-            filtered_data = filtered_data[filtered_data['quality_class'].isin(filters['quality_class'])]
+        rows = filter_index.query(filters)
         
-        if filters.get('importance_class'):
-            filtered_data = filtered_data[filtered_data['importance_class'].isin(filters['importance_class'])]
+        # Return one page of the filtered data when paging, sorting or columns were requested
+        page_request = PageRequest({**request.args.to_dict(), **filters})
+        if page_request.paginated:
+            return page_response(df, rows, page_request,
+                                 lambda name, builder: data_registry.derived(project, 'merged', name, builder))
         
         # Return the filtered data as a JSON response
-        return filtered_data.to_json(orient='records')
+        return dataframe_response(df.iloc[rows])
     
+    except DatasetNotFound as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         # Handle exceptions and return a JSON response with the error message
         return jsonify({"error": str(e)}), 500
 
 
-# Function to download the CSV file
-def download_csv(url, local_file_name):
+# Classes accepted by a GET filter, given as repeated or comma-separated parameters
+def class_filter(name):
+    values = [value for param in request.args.getlist(name) for value in param.split(',') if value]
+    return set(values) if values else None
+
+
+@app.route('/get_correlation', methods=['GET'])
+def get_correlation():
     try:
-        response = requests.get(url, verify=False)
-        response.raise_for_status()
-        with open(local_file_name, 'wb') as file:
-            file.write(response.content)
-        print(f"Downloaded {local_file_name}")
-    except Exception as e:
-        print(f"Error downloading the file from {url}: {e}")
-        return False
-    return True
+        # Get the WikiProject from the request
+        project = requested_project()
 
+        # Load the correlation statistics kept for the merged data of the Wikiproject
+        stats = correlation_stats(project)
+        if stats is None:
+            raise DatasetNotFound(project, 'merged')
+        
+        # Combine the statistics of the requested classes into a correlation matrix
+        matrix = stats.correlation(class_filter('quality_class'), class_filter('importance_class'))
+        return jsonify(matrix)
+    
+    except DatasetNotFound as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        # Handle exceptions and return a JSON response with the error message
+        return jsonify({"error": str(e)}), 500
 
 
 @app.route('/get_csv_data_monthly_Latest', methods=['GET'])
 def get_csv_data_monthly_Latest():
     try:
-        # Ensure that the selected_wikiproject is set
-        if not selected_wikiproject:
-            return jsonify({"error": "No WikiProject selected"}), 400
-
-        # Construct the CSV file name based on the selected Wikiproject
-        csv_file_name = f"{selected_wikiproject}_latest_monthly.csv"
+        # Get the WikiProject from the request
+        project = requested_project()
         
-        # Check if the file exists
-        if not os.path.exists(csv_file_name):
-            return jsonify({"error": f"CSV file '{csv_file_name}' does not exist"}), 404
-        
-        # Read the CSV file
-        df2 = pd.read_csv(csv_file_name)
+        # Read the data
+        df2 = data_registry.load(project, 'latest_monthly')
         
         # Return the data as JSON
-        return jsonify(df2.to_dict(orient='records'))
+        return dataframe_response(df2)
     
+    except DatasetNotFound as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         # Handle exceptions and return a JSON response with the error message
         return jsonify({"error": str(e)}), 500
@@ -235,78 +300,172 @@ def get_csv_data_monthly_Latest():
 @app.route('/get_article_data', methods=['GET'])
 def get_article_data():
     try:
-        # Ensure that the selected_wikiproject is set
-        if not selected_wikiproject:
-            return jsonify({"error": "No WikiProject selected"}), 400
-
-        # Construct the CSV file name based on the selected Wikiproject
-        csv_file_name = f"{selected_wikiproject}_latest_monthly.csv"
-        
-        # Check if the file exists
-        if not os.path.exists(csv_file_name):
-            return jsonify({"error": f"CSV file '{csv_file_name}' does not exist"}), 404
-        
-        # Read the CSV file
-        df = pd.read_csv(csv_file_name)
-        print(df.columns)  # Print the columns to verify
+        # Get the WikiProject from the request
+        project = requested_project()
         
         # Get the article ID from the request
         article_id = request.args.get('page_id')
         if not article_id:
             return jsonify({'error': 'No article ID provided'}), 400
 
-        # Ensure that the 'page_id' column exists
-        if 'page_id' not in df.columns:
-            return jsonify({'error': 'page_id column not found'}), 400
-
-        # Filter the dataframe to get the article data
-        article_data = df[df['page_id'] == int(article_id)]
+        # Look the article up in the page_id index built over the data
+        article_index = data_registry.derived(project, 'latest_monthly', 'article_index', ArticleIndex)
+        article_data = article_index.lookup(int(article_id))
         
-        if article_data.empty:
+        if article_data is None:
             return jsonify({'error': 'Article not found'}), 404
         
         # Return the article data as JSON
-        return jsonify(article_data.to_dict(orient='records'))
+        return dataframe_response(article_data)
+    
+    except DatasetNotFound as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        # Handle exceptions and return a JSON response with the error message
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/get_articles_data', methods=['POST'])
+def get_articles_data():
+    try:
+        # Get the WikiProject from the request
+        project = requested_project()
+        
+        # Get the article IDs from the request
+        page_ids = (request.json or {}).get('page_ids')
+        if not isinstance(page_ids, list) or not page_ids:
+            return jsonify({'error': 'No article IDs provided'}), 400
+        if len(page_ids) > MAX_BATCH_ARTICLES:
+            return jsonify({'error': f'At most {MAX_BATCH_ARTICLES} articles can be requested at once'}), 400
+        page_ids = list(dict.fromkeys(int(page_id) for page_id in page_ids))
+
+        # Slice every article out of the page_id index built over the data
+        article_index = data_registry.derived(project, 'latest_monthly', 'article_index', ArticleIndex)
+        found, missing = article_index.lookup_many(page_ids)
+        
+        # Return the monthly data of every article found, keyed by page_id
+        format = requested_format()
+        articles = ', '.join(f'"{page_id}": {dataframe_to_json(rows, format)}' for page_id, rows in found.items())
+        body = '{"articles": {%s}, "missing": %s}' % (articles, json.dumps(missing))
+        return Response(body, mimetype='application/json')
+    
+    except DatasetNotFound as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        # Handle exceptions and return a JSON response with the error message
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/download_csv', methods=['POST'])
+def download_csv():
+    try:
+        # Get the WikiProject from the request
+        project = requested_project()
+        
+        # Get the articles, columns and months to export from the request
+        export_request = ExportRequest(request.get_json(silent=True))
+        columns = export_request.export_columns(data_registry.load(project, 'latest_monthly'))
+        
+        # Titles come from the merged data, which has one row per article
+        titles = None
+        page_ids = export_request.page_ids
+        try:
+            titles, page_ids_by_title = data_registry.derived(project, 'merged', 'page_titles', article_titles,
+                                                              columns=TITLE_COLUMNS)
+            page_ids = page_ids + [page_ids_by_title[title] for title in export_request.titles if title in page_ids_by_title]
+        except DatasetNotFound:
+            # Without merged data the export has no titles and titles cannot be looked up
+            if export_request.titles:
+                raise
+        page_ids = list(dict.fromkeys(page_ids))
+        
+        # Stream the monthly rows of every article, sliced out of the page_id index
+        article_index = data_registry.derived(project, 'latest_monthly', 'article_index', ArticleIndex)
+        chunks = csv_chunks(article_index, page_ids, columns, export_request.start, export_request.end, titles)
+        return stream_response(chunks, 'text/csv',
+                               headers={'Content-Disposition': 'attachment; filename=selected_articles.csv'})
     
+    except DatasetNotFound as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         # Handle exceptions and return a JSON response with the error message
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/cache_stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify({'datasets': dataset_cache.stats(), 'raw_downloads': raw_cache.stats(),
+                    'pageviews': pageviews_client.stats()})
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    # Read the cache counters at scrape time
+    record_cache_stats('datasets', dataset_cache.stats())
+    record_cache_stats('raw_downloads', raw_cache.stats())
+    pageviews = pageviews_client.stats()
+    record_cache_stats('pageviews', {'hits': pageviews['hits'], 'misses': pageviews['upstream_requests'],
+                                     'entries': pageviews['series']})
+    return Response(metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @app.route('/get_pageviews', methods=['GET'])
 def get_pageviews():
     # Retrieve query parameters
     title = request.args.get('title')
     start = request.args.get('start')
     end = request.args.get('end')
+    granularity = request.args.get('granularity', 'daily')
     
     # Check for missing parameters
     if not title or not start or not end:
         return jsonify({'error': 'Missing required parameters'}), 400
     
-    # Construct the URL for the Wikimedia API request
-    url = f'https://wikimedia.org/api/rest_v1/metrics/pageviews/per-article/en.wikipedia/all-access/user/{title}/daily/{start}/{end}'
-    
-    # Define the user agent
-    contact_email = 'paragon@wikimedia.org'
-    tutorial_label = 'PAWS Language-agnostic quality modeling tutorial (mwapi)'
-    user_agent = f'<{contact_email}> {tutorial_label}'
-    
     try:
-        # Make the request to the Wikimedia API with the user agent
-        response = requests.get(url, headers={'User-Agent': user_agent})
-        
-        # Check if the request was successful
-        if response.status_code == 200:
-            # Return the JSON response from the API
-            return jsonify(response.json())
-        else:
-            # Return an error message if the API request failed
-            return jsonify({'error': 'Failed to fetch data from Wikimedia API', 'status_code': response.status_code}), response.status_code
+        # Fetch the days not cached yet from the Wikimedia API
+        return jsonify(pageviews_client.get(title, start, end, granularity))
     
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except PageviewsError as e:
+        # Return an error message if the API request failed
+        return jsonify({'error': str(e), 'status_code': e.status_code}), e.status_code
     except requests.exceptions.RequestException as e:
         # Handle any exceptions that occur during the request
         return jsonify({'error': 'An error occurred while fetching data from the Wikimedia API', 'details': str(e)}), 500
 
+
+@app.route('/get_pageviews_batch', methods=['POST'])
+def get_pageviews_batch():
+    # Retrieve the titles and the day range from the request body
+    data = request.json or {}
+    titles = data.get('titles')
+    start = data.get('start')
+    end = data.get('end')
+    granularity = data.get('granularity', 'daily')
+    
+    # Check for missing parameters
+    if not isinstance(titles, list) or not titles or not start or not end:
+        return jsonify({'error': 'Missing required parameters'}), 400
+    if len(titles) > MAX_BATCH_ARTICLES:
+        return jsonify({'error': f'At most {MAX_BATCH_ARTICLES} titles can be requested at once'}), 400
+    
+    try:
+        # Fetch all titles concurrently; failed titles are reported next to the others
+        results = pageviews_client.get_many(list(dict.fromkeys(titles)), start, end, granularity)
+        return jsonify({
+            'pageviews': {title: result for title, result in results.items() if 'error' not in result},
+            'errors': {title: result for title, result in results.items() if 'error' in result},
+        })
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
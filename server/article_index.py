@@ -0,0 +1,58 @@
+import numpy as np
+
+
+# page_id -> row range index over a monthly dataset, built once per dataset load.
+#
+# The rows are kept sorted by (page_id, month), so the monthly series of an article
+# is one contiguous slice found with a binary search. Datasets written by the
+# monthly pipeline already are in that order and are used without a copy.
+class ArticleIndex:
+    def __init__(self, df):
+        page_ids = df['page_id'].to_numpy()
+        months = np.unique(df['month'].astype(str).to_numpy(), return_inverse=True)[1]
+        order = np.lexsort((months, page_ids))
+        if np.array_equal(order, np.arange(len(df))):
+            self._frame = df
+            frame_bytes = 0
+        else:
+            self._frame = df.take(order).reset_index(drop=True)
+            frame_bytes = int(self._frame.memory_usage(deep=True).sum())
+        sorted_ids = page_ids[order]
+        self._page_ids, self._starts = np.unique(sorted_ids, return_index=True)
+        self._stops = np.append(self._starts[1:], len(sorted_ids))
+        # Memory held besides the dataset: the sorted copy (if one was made) and the ranges
+        self.nbytes = frame_bytes + self._page_ids.nbytes + self._starts.nbytes + self._stops.nbytes
+
+    # Return the monthly rows of one article, or None when it is not in the dataset
+    def lookup(self, page_id):
+        position = np.searchsorted(self._page_ids, page_id)
+        if position == len(self._page_ids) or self._page_ids[position] != page_id:
+            return None
+        return self._frame.iloc[self._starts[position]:self._stops[position]]
+
+    # Return the rows of the index, sorted by (page_id, month)
+    @property
+    def frame(self):
+        return self._frame
+
+    # Return the page_ids found among the given ones, in the given order, with the
+    # start and stop positions of their rows in `frame`
+    def ranges(self, page_ids):
+        page_ids = np.asarray(page_ids, dtype=self._page_ids.dtype)
+        positions = np.searchsorted(self._page_ids, page_ids)
+        found = positions < len(self._page_ids)
+        found[found] = self._page_ids[positions[found]] == page_ids[found]
+        positions = positions[found]
+        return page_ids[found], self._starts[positions], self._stops[positions]
+
+    # Return {page_id: rows} for the articles found and the list of page_ids that were not
+    def lookup_many(self, page_ids):
+        found = {}
+        missing = []
+        for page_id in page_ids:
+            rows = self.lookup(page_id)
+            if rows is None:
+                missing.append(page_id)
+            else:
+                found[page_id] = rows
+        return found, missing
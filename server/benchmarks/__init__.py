@@ -0,0 +1,2 @@
+# Benchmarks of the server's data paths, run from the server directory with
+# python -m benchmarks.<name>
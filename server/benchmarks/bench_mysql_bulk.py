@@ -0,0 +1,122 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pymysql
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ssh'))
+from bulk_upsert import COLUMNS, insert_query, row_values, upsert
+
+# Local MySQL/MariaDB server to benchmark against; the table is created in this database
+BENCH_MYSQL_HOST = os.getenv('BENCH_MYSQL_HOST', '127.0.0.1')
+BENCH_MYSQL_PORT = int(os.getenv('BENCH_MYSQL_PORT', 3306))
+BENCH_MYSQL_USER = os.getenv('BENCH_MYSQL_USER', 'root')
+BENCH_MYSQL_PASSWORD = os.getenv('BENCH_MYSQL_PASSWORD', '')
+BENCH_MYSQL_DATABASE = os.getenv('BENCH_MYSQL_DATABASE', 'wikievolution_bench')
+
+BENCH_TABLE = 'bench_latest_rev'
+
+CREATE_TABLE = f"""
+CREATE TABLE {BENCH_TABLE} (
+    page_id BIGINT NOT NULL,
+    item_id VARCHAR(32),
+    revision_id BIGINT,
+    revision_timestamp DATETIME,
+    page_length INT,
+    num_refs INT,
+    num_wikilinks INT,
+    num_categories INT,
+    num_media INT,
+    num_headings INT,
+    pred_qual DOUBLE,
+    page_title VARCHAR(255),
+    quality_class VARCHAR(16),
+    importance_class VARCHAR(16),
+    wikiproject VARCHAR(255) NOT NULL,
+    PRIMARY KEY (page_id, wikiproject)
+)
+"""
+
+
+# Function to generate latest-revision rows shaped like the output of transform_data
+def make_articles(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    timestamps = pd.Timestamp('2001-01-01') + pd.to_timedelta(rng.integers(0, 23 * 365 * 86400, rows), unit='s')
+    return pd.DataFrame({
+        'page_id': np.arange(1, rows + 1),
+        'item_id': [f"Q{value}" for value in rng.integers(1, 10 ** 8, rows)],
+        'revision_id': rng.integers(1, 10 ** 9, rows),
+        'revision_timestamp': timestamps.strftime('%Y-%m-%d %H:%M:%S'),
+        'page_length': rng.integers(100, 200000, rows),
+        'num_refs': rng.integers(0, 500, rows),
+        'num_wikilinks': rng.integers(0, 2000, rows),
+        'num_categories': rng.integers(0, 50, rows),
+        'num_media': rng.integers(0, 100, rows),
+        'num_headings': rng.integers(0, 80, rows),
+        'pred_qual': rng.random(rows),
+        'page_title': [f"Article_{value}" for value in range(rows)],
+        'quality_class': rng.choice(['Stub', 'Start', 'C', 'B', 'GA', 'FA'], rows),
+        'importance_class': rng.choice(['Low', 'Mid', 'High', 'Top'], rows),
+        'wikiproject': 'Benchmark',
+    })[COLUMNS]
+
+
+# The per-row loop save_to_mysql used before the bulk strategies
+def upsert_row_by_row(conn, df):
+    query = insert_query(BENCH_TABLE)
+    with conn.cursor() as cursor:
+        for _, row in df.iterrows():
+            cursor.execute(query, tuple(row[column] for column in COLUMNS))
+        conn.commit()
+    return len(df)
+
+
+# Function to time one strategy on an empty table (inserts) and on a full one (updates)
+def measure(conn, name, load, df):
+    with conn.cursor() as cursor:
+        cursor.execute(f"TRUNCATE TABLE {BENCH_TABLE}")
+    for phase in ('insert', 'update'):
+        start = time.perf_counter()
+        rows = load(df)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<28} {phase:<7} {rows:>9} {elapsed:>9.2f} {rows / elapsed:>12,.0f}")
+
+
+def run(rows, row_by_row_rows, chunk_sizes):
+    conn = pymysql.connect(host=BENCH_MYSQL_HOST, port=BENCH_MYSQL_PORT, user=BENCH_MYSQL_USER,
+                           password=BENCH_MYSQL_PASSWORD, local_infile=True)
+    with conn.cursor() as cursor:
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {BENCH_MYSQL_DATABASE}")
+        cursor.execute(f"USE {BENCH_MYSQL_DATABASE}")
+        cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+        cursor.execute(CREATE_TABLE)
+
+    df = make_articles(rows)
+    print(f"{'strategy':<28} {'phase':<7} {'rows':>9} {'seconds':>9} {'rows/s':>12}")
+    measure(conn, 'row by row (before)', lambda df: upsert_row_by_row(conn, df), df.head(row_by_row_rows))
+    start = time.perf_counter()
+    row_values(df)
+    print(f"{'(row values only)':<28} {'':<7} {rows:>9} {time.perf_counter() - start:>9.2f}")
+    for chunk_size in chunk_sizes:
+        measure(conn, f"executemany chunk={chunk_size}",
+                lambda df: upsert(conn, df, 'executemany', chunk_size, table=BENCH_TABLE), df)
+    try:
+        measure(conn, 'load_data', lambda df: upsert(conn, df, 'load_data', table=BENCH_TABLE), df)
+    except pymysql.MySQLError as e:
+        print(f"load_data skipped, the server does not accept LOAD DATA LOCAL INFILE: {e}")
+
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP TABLE {BENCH_TABLE}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the MySQL upsert strategies of save_to_mysql")
+    parser.add_argument('--rows', type=int, default=100000, help="articles upserted by the bulk strategies")
+    parser.add_argument('--row-by-row-rows', type=int, default=2000, help="articles upserted by the per-row loop")
+    parser.add_argument('--chunk-sizes', default='1000,5000,20000', help="comma-separated executemany chunk sizes")
+    args = parser.parse_args()
+    run(args.rows, args.row_by_row_rows, [int(size) for size in args.chunk_sizes.split(',')])
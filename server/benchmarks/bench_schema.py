@@ -0,0 +1,55 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_data import make_project
+from process_wikiproject_monthly import fill_missing_months
+from schema import compact, memory_usage
+
+
+# Function to convert a DataFrame to the types pandas infers when reading a CSV:
+# strings as objects and numbers as 64 bits; the monthly grid used to hold every
+# column but page_id as float64
+def default_types(df, grid=False):
+    types = {}
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            types[column] = object
+        elif df[column].dtype.kind == 'f' or (grid and column != 'page_id' and df[column].dtype.kind in 'iu'):
+            types[column] = np.float64
+        elif df[column].dtype.kind in 'iu':
+            types[column] = np.int64
+    return df.astype(types)
+
+
+def report(name, before, after):
+    print(f"{name:<20} {before['total'] / 1024 ** 2:>12.1f} {after['total'] / 1024 ** 2:>12.1f} "
+          f"{before['total'] / after['total']:>7.1f}x")
+    for column in after:
+        if column != 'total':
+            print(f"  {column:<18} {before[column] / 1024 ** 2:>12.1f} {after[column] / 1024 ** 2:>12.1f}")
+
+
+# Function to compare the memory of the revisions and of their monthly grid with the
+# default and the compact column types
+def run(revisions, seed):
+    df_revisions, _ = make_project(revisions, seed=seed)
+    compact_revisions = compact(df_revisions.copy())
+    compact_revisions['revision_timestamp'] = pd.to_datetime(compact_revisions['revision_timestamp'], utc=True)
+    start = time.perf_counter()
+    grid = fill_missing_months(compact_revisions.copy())
+    print(f"{revisions} revisions, monthly grid of {len(grid)} rows in {time.perf_counter() - start:.1f}s")
+
+    print(f"{'dataset':<20} {'default MB':>12} {'compact MB':>12} {'ratio':>8}")
+    report('revisions', memory_usage(df_revisions), memory_usage(compact_revisions))
+    report('monthly grid', memory_usage(default_types(grid, grid=True)), memory_usage(grid))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the memory of the datasets with the default and compact types")
+    parser.add_argument('--revisions', type=int, default=1000000, help="number of synthetic revisions")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    run(args.revisions, args.seed)
@@ -0,0 +1,56 @@
+import argparse
+import gzip
+import os
+import time
+
+import pandas as pd
+from flask import Flask, jsonify
+
+from serialization import dataframe_to_json, brotli, GZIP_LEVEL, BROTLI_QUALITY
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'df_revisions_pred_manual_Carribean.csv')
+
+
+# Function to time a call, returning its result and the elapsed milliseconds
+def timed(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+# Function to compare the bytes and time of every response format and encoding
+def run(scale, repeat):
+    df = pd.read_csv(SAMPLE_FILE)
+    df = pd.concat([df] * scale, ignore_index=True)
+    print(f"{len(df)} rows x {len(df.columns)} columns (Carribean sample x{scale})")
+
+    app = Flask(__name__)
+    serializers = {
+        'jsonify records (before)': lambda: jsonify(df.to_dict(orient='records')).get_data(),
+        'records': lambda: dataframe_to_json(df, 'records').encode(),
+        'columns': lambda: dataframe_to_json(df, 'columns').encode(),
+    }
+    encoders = {'identity': lambda body: body, 'gzip': lambda body: gzip.compress(body, compresslevel=GZIP_LEVEL)}
+    if brotli is not None:
+        encoders['br'] = lambda body: brotli.compress(body, quality=BROTLI_QUALITY)
+
+    print(f"{'format':<26} {'encoding':<9} {'serialize ms':>13} {'encode ms':>10} {'bytes':>14}")
+    with app.app_context():
+        for format, serialize in serializers.items():
+            body, serialize_ms = timed(serialize, repeat)
+            for encoding, encode in encoders.items():
+                encoded, encode_ms = timed(lambda: encode(body), repeat)
+                print(f"{format:<26} {encoding:<9} {serialize_ms:>13.0f} {encode_ms:>10.0f} {len(encoded):>14,}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the JSON response formats and encodings")
+    parser.add_argument('--scale', type=int, default=100, help="number of copies of the Carribean sample")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per measurement, the best is reported")
+    args = parser.parse_args()
+    run(args.scale, args.repeat)
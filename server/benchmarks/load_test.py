@@ -0,0 +1,127 @@
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import requests
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Read requests of an analyst browsing one project, as (method, path, params, json)
+def endpoints(project, page_id):
+    return [
+        ('GET', '/get_csv_data_monthly_aggregated', {'project': project}, None),
+        ('GET', '/minmax', {'project': project}, None),
+        ('GET', '/get_csv_data', {'project': project, 'limit': 100, 'sort_by': 'pred_qual', 'order': 'desc'}, None),
+        ('POST', '/filter', {'project': project}, {'pred_qual_min': 0.5, 'limit': 100}),
+        ('GET', '/get_article_data', {'project': project, 'page_id': page_id}, None),
+        ('GET', '/get_correlation', {'project': project}, None),
+    ]
+
+
+# Function run by every client process: send the requests in turn until the deadline
+def client(url, requests_to_send, deadline, results):
+    session = requests.Session()
+    latencies = []
+    errors = 0
+    position = os.getpid()
+    while time.time() < deadline:
+        method, path, params, body = requests_to_send[position % len(requests_to_send)]
+        position += 1
+        start = time.perf_counter()
+        try:
+            response = session.request(method, url + path, params=params, json=body, timeout=60)
+            if response.status_code >= 400:
+                errors += 1
+        except requests.RequestException:
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+    results.put((latencies, errors))
+
+
+# Function to start gunicorn with a number of workers in the directory holding the
+# artifacts, and wait until it answers
+def start_server(workers, port, data_dir):
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', os.path.join(SERVER_DIR, 'gunicorn.conf.py'),
+         '--pythonpath', SERVER_DIR, '--workers', str(workers), '--bind', f"127.0.0.1:{port}", 'app:app'],
+        cwd=data_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(300):
+        try:
+            requests.get(url + '/cache_stats', timeout=1)
+            return server, url
+        except requests.RequestException:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("gunicorn did not start")
+
+
+# Function to load a server with concurrent clients for some seconds and summarize the latencies
+def measure(url, requests_to_send, clients, duration, warmup):
+    # Load every dataset into every worker before measuring
+    session = requests.Session()
+    for _ in range(warmup):
+        for method, path, params, body in requests_to_send:
+            session.request(method, url + path, params=params, json=body, timeout=300)
+
+    results = multiprocessing.Queue()
+    deadline = time.time() + duration
+    processes = [multiprocessing.Process(target=client, args=(url, requests_to_send, deadline, results))
+                 for _ in range(clients)]
+    for process in processes:
+        process.start()
+    latencies, errors = [], 0
+    for _ in processes:
+        client_latencies, client_errors = results.get()
+        latencies += client_latencies
+        errors += client_errors
+    for process in processes:
+        process.join()
+    latencies = np.array(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_second': len(latencies) / duration,
+        'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else 0,
+        'p95_ms': float(np.percentile(latencies, 95)) if len(latencies) else 0,
+    }
+
+
+def run(project, worker_counts, clients, duration, warmup, port, data_dir=SERVER_DIR, url=None):
+    print(f"{'workers':>7} {'clients':>7} {'requests':>9} {'errors':>6} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for workers in worker_counts:
+        server = None
+        if url is None:
+            server, server_url = start_server(workers, port, data_dir)
+        else:
+            server_url = url
+        try:
+            page = requests.get(server_url + '/get_csv_data', params={'project': project, 'limit': 1}, timeout=300).json()
+            requests_to_send = endpoints(project, page['rows'][0]['page_id'])
+            result = measure(server_url, requests_to_send, clients, duration, warmup)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+        print(f"{workers if url is None else '-':>7} {clients:>7} {result['requests']:>9} {result['errors']:>6} "
+              f"{result['requests_per_second']:>9.1f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure read throughput of the server for increasing worker counts")
+    parser.add_argument('project', help="an ingested WikiProject to read")
+    parser.add_argument('--workers', default='1,2,4', help="comma-separated gunicorn worker counts")
+    parser.add_argument('--clients', type=int, default=16, help="concurrent client processes")
+    parser.add_argument('--duration', type=float, default=10, help="seconds of load per worker count")
+    parser.add_argument('--warmup', type=int, default=8, help="rounds of requests sent before measuring")
+    parser.add_argument('--port', type=int, default=5055, help="port the started servers listen on")
+    parser.add_argument('--data-dir', default=SERVER_DIR, help="directory the started servers read the artifacts from")
+    parser.add_argument('--url', help="load an already running server instead of starting gunicorn")
+    args = parser.parse_args()
+    run(args.project, [int(count) for count in args.workers.split(',')], args.clients, args.duration,
+        args.warmup, args.port, args.data_dir, args.url)
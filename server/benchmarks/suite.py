@@ -0,0 +1,183 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_data import make_project
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+sys.path.insert(0, os.path.join(SERVER_DIR, 'ssh'))
+
+# Name the synthetic project is ingested under
+BENCH_PROJECT = 'Benchmark'
+
+
+# Function to time one step and measure the peak memory it allocates.
+#
+# `setup` builds fresh inputs (steps may modify them) outside the measurement.
+# The time is the best of `repeat` runs without tracing; the peak is measured in
+# a separate traced run, since tracemalloc slows allocation-heavy code down.
+# Memory allocated by numpy and pandas is traced, Arrow's is not.
+def measure(name, setup, step, rows, repeat=1, memory=True):
+    seconds = []
+    for _ in range(repeat):
+        inputs = setup()
+        start = time.perf_counter()
+        step(*inputs)
+        seconds.append(time.perf_counter() - start)
+    result = {'name': name, 'rows': rows, 'seconds': min(seconds)}
+    if memory:
+        inputs = setup()
+        tracemalloc.start()
+        step(*inputs)
+        result['peak_mb'] = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        tracemalloc.stop()
+    print(f"{name:<48} {rows:>10} {result['seconds']:>9.3f} {result.get('peak_mb', 0):>9.1f}", file=sys.stderr)
+    return result
+
+
+# Requests of the dashboard for one project, as (name, method, path, params, json)
+def endpoint_requests(project, page_ids):
+    params = {'project': project}
+    return [
+        ('monthly_aggregated', 'GET', '/get_csv_data_monthly_aggregated', params, None),
+        ('minmax', 'GET', '/minmax', params, None),
+        ('csv_data_page', 'GET', '/get_csv_data', {**params, 'limit': 100, 'sort_by': 'pred_qual', 'order': 'desc'}, None),
+        ('filter', 'POST', '/filter', params, {'pred_qual_min': 0.5, 'quality_class': ['B', 'GA', 'FA'], 'limit': 100}),
+        ('correlation', 'GET', '/get_correlation', params, None),
+        ('monthly_latest', 'GET', '/get_csv_data_monthly_Latest', params, None),
+        ('article_data', 'GET', '/get_article_data', {**params, 'page_id': page_ids[0]}, None),
+        ('articles_data', 'POST', '/get_articles_data', params, {'page_ids': page_ids}),
+        ('download_csv', 'POST', '/download_csv', params, {'page_ids': page_ids}),
+    ]
+
+
+# Function to time every endpoint through the Flask test client: the first request
+# of a fresh server (which loads the datasets) and the median of the warm ones
+def measure_endpoints(app, project, page_ids, repeat):
+    client = app.test_client()
+    results = []
+    for name, method, path, params, body in endpoint_requests(project, page_ids):
+        seconds = []
+        for _ in range(repeat + 1):
+            start = time.perf_counter()
+            response = client.open(path, method=method, query_string=params, json=body)
+            size = len(response.get_data())
+            seconds.append(time.perf_counter() - start)
+        result = {'name': f"endpoint {method} {path} ({name})", 'status': response.status_code, 'bytes': size,
+                  'cold_seconds': seconds[0], 'seconds': statistics.median(seconds[1:])}
+        print(f"{result['name']:<48} {response.status_code:>10} {result['seconds']:>9.3f} {'':>9}", file=sys.stderr)
+        results.append(result)
+    return results
+
+
+# Function to time save_to_mysql against the database of the MySQL benchmark,
+# when BENCH_MYSQL_HOST is set
+def measure_mysql(save_to_mysql, transformed_df, memory):
+    if not os.getenv('BENCH_MYSQL_HOST'):
+        return {'name': 'save_to_mysql', 'skipped': "BENCH_MYSQL_HOST is not set"}
+    import pymysql
+    from benchmarks.bench_mysql_bulk import (BENCH_MYSQL_DATABASE, BENCH_MYSQL_HOST, BENCH_MYSQL_PASSWORD,
+                                             BENCH_MYSQL_PORT, BENCH_MYSQL_USER, BENCH_TABLE, CREATE_TABLE)
+    from bulk_upsert import TABLE
+    conn = pymysql.connect(host=BENCH_MYSQL_HOST, port=BENCH_MYSQL_PORT, user=BENCH_MYSQL_USER,
+                           password=BENCH_MYSQL_PASSWORD, local_infile=True)
+
+    # save_to_mysql writes to the production table name, created in the benchmark database
+    def empty_table():
+        with conn.cursor() as cursor:
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {BENCH_MYSQL_DATABASE}")
+            cursor.execute(f"USE {BENCH_MYSQL_DATABASE}")
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+            cursor.execute(CREATE_TABLE.replace(BENCH_TABLE, TABLE, 1))
+        return transformed_df, conn
+
+    try:
+        return measure('save_to_mysql', empty_table, save_to_mysql, len(transformed_df), memory=memory)
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        conn.close()
+
+
+def run(revisions, pages, seed, repeat, memory, work_dir):
+    # The pipelines and the server keep their files in the working directory, and
+    # some create folders there when imported
+    os.chdir(work_dir)
+    from process_wikiproject_monthly import aggregate_months, fill_missing_months
+    import process_wikiproject_latest
+    import sshtunnelStoreData
+    from storage import write_dataset
+
+    start = time.perf_counter()
+    df_revisions, df_pages = make_project(revisions, pages, seed)
+    print(f"Generated {len(df_revisions)} revisions of {len(df_pages)} articles in "
+          f"{time.perf_counter() - start:.1f} s, working in {work_dir}", file=sys.stderr)
+    print(f"{'step':<48} {'rows':>10} {'seconds':>9} {'peak MB':>9}", file=sys.stderr)
+
+    results = []
+    copies = lambda: (df_revisions.copy(), df_pages.copy())
+    rows = len(df_revisions)
+    results.append(measure('fill_missing_months', lambda: (df_revisions.copy(),), fill_missing_months, rows, repeat, memory))
+    results.append(measure('fill_missing_months (global month range)', lambda: (df_revisions.copy(),),
+                           lambda df: fill_missing_months(df, global_month_range=True), rows, repeat, memory))
+    results.append(measure('transform_data (latest)', copies,
+                           lambda revisions, pages: process_wikiproject_latest.transform_data(revisions, pages, BENCH_PROJECT),
+                           rows, repeat, memory))
+    results.append(measure('transform_data (mysql)', copies,
+                           lambda revisions, pages: sshtunnelStoreData.transform_data(revisions, pages, BENCH_PROJECT),
+                           rows, repeat, memory))
+    results.append(measure_mysql(sshtunnelStoreData.save_to_mysql,
+                                 sshtunnelStoreData.transform_data(*copies(), BENCH_PROJECT), memory))
+
+    # Ingest the project as the pipelines do, then query it
+    df_filled = fill_missing_months(df_revisions.copy())
+    write_dataset(df_filled, BENCH_PROJECT, 'latest_monthly')
+    write_dataset(aggregate_months(df_filled), BENCH_PROJECT, 'monthly_aggregated')
+    write_dataset(process_wikiproject_latest.transform_data(*copies(), BENCH_PROJECT), BENCH_PROJECT, 'merged')
+    import app
+    page_ids = df_pages['page_id'].sample(min(100, len(df_pages)), random_state=seed).tolist()
+    results += measure_endpoints(app.app, BENCH_PROJECT, page_ids, repeat)
+
+    return {
+        'revisions': rows,
+        'pages': len(df_pages),
+        'seed': seed,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'results': results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the ingest steps and the endpoints on a synthetic WikiProject")
+    parser.add_argument('--revisions', type=int, default=100000, help="number of synthetic revisions (10k to 10M)")
+    parser.add_argument('--pages', type=int, help="number of synthetic articles")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1, help="runs per step, the fastest is reported")
+    parser.add_argument('--no-memory', action='store_true', help="skip the traced runs measuring peak memory")
+    parser.add_argument('--work-dir', help="directory the artifacts are written to, a temporary one by default")
+    parser.add_argument('--output', help="file the JSON report is written to instead of stdout")
+    args = parser.parse_args()
+    output_file_name = os.path.abspath(args.output) if args.output else None
+
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        report = run(args.revisions, args.pages, args.seed, args.repeat, not args.no_memory,
+                     os.path.abspath(args.work_dir or temporary_dir))
+    if output_file_name:
+        with open(output_file_name, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,125 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Columns of the published revisions and assessments files, in their order
+REVISION_COLUMNS = ['wiki_db', 'page_id', 'item_id', 'revision_id', 'revision_timestamp', 'page_length', 'num_refs',
+                    'num_wikilinks', 'num_categories', 'num_media', 'num_headings', 'pred_qual']
+ASSESSMENT_COLUMNS = ['page_id', 'page_title', 'quality_class', 'importance_class']
+
+QUALITY_CLASSES = ['Stub', 'Start', 'C', 'B', 'GA', 'FA']
+IMPORTANCE_CLASSES = ['Low', 'Mid', 'High', 'Top', 'NA']
+IMPORTANCE_SHARES = [0.55, 0.25, 0.08, 0.02, 0.10]
+
+# Period the revisions are spread over
+FIRST_REVISION = pd.Timestamp('2001-01-15', tz='UTC')
+LAST_REVISION = pd.Timestamp('2024-06-30', tz='UTC')
+
+# Average number of revisions of an article when the number of articles is not given
+REVISIONS_PER_PAGE = 40
+
+# Revisions generated and written at a time
+GENERATE_CHUNK_ROWS = 1_000_000
+
+
+# Function to generate the articles of a synthetic WikiProject.
+#
+# Besides the assessment columns, every article gets the time it was created,
+# how actively it is edited (a log-normal weight, so a few articles receive most
+# revisions as on Wikipedia) and the size it grows to.
+def make_pages(pages, seed=0):
+    rng = np.random.default_rng(seed)
+    first, last = FIRST_REVISION.value // 10 ** 9, LAST_REVISION.value // 10 ** 9
+    page_ids = np.sort(rng.choice(np.arange(1, max(pages * 20, 1000)), pages, replace=False))
+    # More articles were created in the early years of Wikipedia
+    created = first + (rng.beta(1.3, 2.5, pages) * (last - first)).astype(np.int64)
+    size = rng.lognormal(9.3, 0.9, pages)
+    # Larger articles tend to be assessed higher; most are stubs or start-class as on Wikipedia
+    quality = np.digitize((np.log(size) - 9.3) / 0.9 + rng.normal(0, 0.5, pages), [0.1, 1.0, 1.6, 2.1, 2.6])
+    return pd.DataFrame({
+        'page_id': page_ids,
+        'item_id': [f"Q{value}" for value in rng.integers(1, 10 ** 8, pages)],
+        'page_title': [f"Synthetic_article_{page_id}" for page_id in page_ids],
+        'quality_class': np.array(QUALITY_CLASSES)[quality],
+        'importance_class': rng.choice(IMPORTANCE_CLASSES, pages, p=IMPORTANCE_SHARES),
+        'created': created,
+        'activity': rng.lognormal(0, 1.2, pages),
+        'size': size,
+    })
+
+
+# Function to generate the revisions of the articles of make_pages, GENERATE_CHUNK_ROWS at a time.
+#
+# Revisions fall between the creation of their article and LAST_REVISION and are
+# numbered in time order. The features grow with the age of the article towards
+# its final size, with some noise from edit to edit.
+def revision_chunks(df_pages, revisions, seed=0, chunk_rows=GENERATE_CHUNK_ROWS):
+    rng = np.random.default_rng(seed + 1)
+    last = LAST_REVISION.value // 10 ** 9
+    weights = df_pages['activity'].to_numpy()
+    pages = rng.choice(len(df_pages), revisions, p=weights / weights.sum()).astype(np.int32)
+    created = df_pages['created'].to_numpy()[pages]
+    timestamps = created + (rng.random(revisions) * (last - created)).astype(np.int64)
+    order = np.argsort(timestamps, kind='stable')
+    pages, timestamps = pages[order], timestamps[order]
+    revision_ids = np.cumsum(rng.integers(1, 40, revisions)) + 1000
+
+    for start in range(0, revisions, chunk_rows):
+        stop = min(start + chunk_rows, revisions)
+        chunk_pages = df_pages.iloc[pages[start:stop]]
+        chunk_created = chunk_pages['created'].to_numpy()
+        age = (timestamps[start:stop] - chunk_created) / np.maximum(last - chunk_created, 1)
+        rows = stop - start
+        length = np.maximum(chunk_pages['size'].to_numpy() * (0.1 + 0.9 * age) * rng.normal(1, 0.05, rows), 1).astype(np.int64)
+        yield pd.DataFrame({
+            'wiki_db': 'enwiki',
+            'page_id': chunk_pages['page_id'].to_numpy(),
+            'item_id': chunk_pages['item_id'].to_numpy(),
+            'revision_id': revision_ids[start:stop],
+            'revision_timestamp': pd.to_datetime(timestamps[start:stop], unit='s', utc=True).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'page_length': length,
+            'num_refs': rng.poisson(length / 400),
+            'num_wikilinks': rng.poisson(length / 90),
+            'num_categories': rng.poisson(2 + 8 * age),
+            'num_media': rng.poisson(length / 5000),
+            'num_headings': rng.poisson(length / 2000),
+            'pred_qual': 1 / (1 + np.exp(-(np.log(length) - 9 + rng.normal(0, 0.4, rows)))),
+        })[REVISION_COLUMNS]
+
+
+# Function to generate a synthetic project in memory, returning (df_revisions, df_pages)
+# shaped like the downloaded revisions and assessments files
+def make_project(revisions, pages=None, seed=0):
+    df_pages = make_pages(pages or max(revisions // REVISIONS_PER_PAGE, 1), seed)
+    df_revisions = pd.concat(revision_chunks(df_pages, revisions, seed), ignore_index=True)
+    return df_revisions, df_pages[ASSESSMENT_COLUMNS]
+
+
+# Function to write a synthetic project as revisions/<name>.csv and assessments/<name>.csv.
+#
+# The layout is the one of the published datasets, so serving `directory` over
+# HTTP and pointing DATASET_BASE_URL at it runs the ingest pipelines on the files.
+def write_project(directory, name, revisions, pages=None, seed=0):
+    df_pages = make_pages(pages or max(revisions // REVISIONS_PER_PAGE, 1), seed)
+    revisions_file_name = os.path.join(directory, 'revisions', f"{name}.csv")
+    assessments_file_name = os.path.join(directory, 'assessments', f"{name}.csv")
+    os.makedirs(os.path.dirname(revisions_file_name), exist_ok=True)
+    os.makedirs(os.path.dirname(assessments_file_name), exist_ok=True)
+    for position, chunk in enumerate(revision_chunks(df_pages, revisions, seed)):
+        chunk.to_csv(revisions_file_name, mode='w' if position == 0 else 'a', header=position == 0, index=False)
+    df_pages[ASSESSMENT_COLUMNS].to_csv(assessments_file_name, index=False)
+    return revisions_file_name, assessments_file_name
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write synthetic revisions and assessments files of a WikiProject")
+    parser.add_argument('name', help="name of the synthetic WikiProject")
+    parser.add_argument('--revisions', type=int, default=100000, help="number of revisions (10k to 10M)")
+    parser.add_argument('--pages', type=int, help=f"number of articles, revisions / {REVISIONS_PER_PAGE} by default")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='synthetic', help="directory the revisions/ and assessments/ folders go in")
+    args = parser.parse_args()
+    for file_name in write_project(args.output, args.name, args.revisions, args.pages, args.seed):
+        print(f"Wrote {file_name}")
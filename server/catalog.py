@@ -0,0 +1,155 @@
+import bisect
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+import requests
+from bs4 import BeautifulSoup
+
+from downloader import REVISIONS_BASE_URL, TIMEOUT
+
+# Where the project list is kept between restarts, and how long it is used before revalidating
+CATALOG_FILE = os.getenv('CATALOG_FILE', 'wikiproject_catalog.json')
+CATALOG_TTL = int(os.getenv('CATALOG_TTL', 3600))
+
+# Most projects a search returns
+MAX_SEARCH_RESULTS = 100
+
+# Date and size the directory listing prints after every link, e.g. "01-Jul-2024 13:09    19923"
+_LISTING_DETAILS = re.compile(r'(\d{2}-[A-Za-z]{3}-\d{4} \d{2}:\d{2})?\s*(\d+)?')
+
+
+# List of the WikiProjects available upstream, with the size and last-modified
+# time of their revisions file.
+#
+# The list is parsed from the upstream directory listing, persisted to disk and
+# revalidated with If-None-Match / If-Modified-Since once it is older than the TTL.
+# A stale list is still served while it is revalidated in the background, so only
+# the very first start waits for the network.
+class WikiProjectCatalog:
+    def __init__(self, url=REVISIONS_BASE_URL, path=CATALOG_FILE, ttl=CATALOG_TTL):
+        self.url = url
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._state = self._load()
+        self._index()
+
+    # Return the metadata of every project, sorted by name
+    def projects(self):
+        self._ensure_fresh()
+        return self._state['projects']
+
+    # Return the metadata of one project, or None when upstream does not list it
+    def get(self, name):
+        self._ensure_fresh()
+        return self._by_name.get(name)
+
+    # Return up to limit projects whose name starts with query (case-insensitive),
+    # followed by projects that contain it elsewhere in their name
+    def search(self, query, limit=MAX_SEARCH_RESULTS):
+        self._ensure_fresh()
+        query = query.lower()
+        names, projects = self._lower_names, self._state['projects']
+        position = bisect.bisect_left(names, query)
+        results = []
+        while position < len(names) and names[position].startswith(query) and len(results) < limit:
+            results.append(projects[position])
+            position += 1
+        if query and len(results) < limit:
+            for name, project in zip(names, projects):
+                if query in name and not name.startswith(query):
+                    results.append(project)
+                    if len(results) == limit:
+                        break
+        return results
+
+    # Fetch the listing again unless upstream reports it unchanged
+    def refresh(self):
+        headers = {}
+        if self._state.get('etag'):
+            headers['If-None-Match'] = self._state['etag']
+        if self._state.get('last_modified'):
+            headers['If-Modified-Since'] = self._state['last_modified']
+        response = requests.get(self.url, headers=headers, timeout=TIMEOUT)
+        if response.status_code == 304:
+            state = {**self._state, 'validated_at': time.time()}
+        elif response.status_code == 200:
+            state = {
+                'projects': parse_listing(response.text),
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'validated_at': time.time(),
+            }
+        else:
+            raise RuntimeError(f"Failed to fetch WikiProjects, status code: {response.status_code}")
+        with self._lock:
+            self._state = state
+            self._index()
+            self._save()
+
+    def _ensure_fresh(self):
+        if time.time() - self._state['validated_at'] < self.ttl:
+            return
+        if not self._state['projects']:
+            # Nothing to serve yet, so this request has to wait for upstream
+            self.refresh()
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh_in_background, daemon=True).start()
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Error refreshing the WikiProject catalog: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _index(self):
+        self._lower_names = [project['name'].lower() for project in self._state['projects']]
+        self._by_name = {project['name']: project for project in self._state['projects']}
+
+    def _load(self):
+        try:
+            with open(self.path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {'projects': [], 'etag': None, 'last_modified': None, 'validated_at': 0}
+
+    def _save(self):
+        temporary_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'w') as file:
+            json.dump(self._state, file)
+        os.replace(temporary_path, self.path)
+
+
+# Function to parse the projects, file sizes and modification times out of a directory listing
+def parse_listing(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    projects = []
+    for link in soup.find_all('a'):
+        href = link.get('href') or ''
+        if not href.endswith('.csv'):
+            continue
+        details = _LISTING_DETAILS.match(str(link.next_sibling or '').strip())
+        modified, size = details.groups()
+        projects.append({
+            'name': href[:-4],
+            'size': int(size) if size else None,
+            'last_modified': datetime.strptime(modified, '%d-%b-%Y %H:%M').isoformat() if modified else None,
+        })
+    # Sorted case-insensitively, the order searches look names up in
+    return sorted(projects, key=lambda project: project['name'].lower())
+
+
+# Catalog shared by the endpoints
+wikiproject_catalog = WikiProjectCatalog()
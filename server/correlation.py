@@ -0,0 +1,218 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from storage import dataset_path, read_dataset_chunks
+from watermarks import changed_rows
+
+# Numeric features the correlation matrix is computed over
+CORRELATION_FEATURES = ['page_length', 'num_refs', 'num_wikilinks', 'num_categories', 'num_media', 'num_headings', 'pred_qual']
+
+# Class columns the statistics are kept apart by, so filtered matrices need no rescan
+CORRELATION_GROUP_COLUMNS = ['quality_class', 'importance_class']
+
+# Variance, relative to the sum of squares, below which a feature counts as constant
+CONSTANT_TOLERANCE = 1e-10
+
+# Rows added to the statistics at a time when they are computed from a stored dataset
+CORRELATION_CHUNK_ROWS = 100000
+
+
+# Sufficient statistics of the pairwise correlations of CORRELATION_FEATURES, per
+# (quality_class, importance_class) pair.
+#
+# For every pair of features (i, j) a group keeps, over the rows where both are
+# present: the row count, the sum and sum of squares of feature i, and the sum of
+# the products of i and j. These add up across rows, so the statistics are built
+# in one pass over chunks, combined across classes, and updated by adding new rows
+# and subtracting replaced ones. Values are shifted by a fixed reference point per
+# feature to keep the sums of squares from losing precision.
+class CorrelationStats:
+    def __init__(self, shift, groups=None):
+        self.shift = np.asarray(shift, dtype=np.float64)
+        self.groups = groups if groups is not None else {}
+
+    # Statistics of a stored dataset, computed one chunk at a time
+    @classmethod
+    def from_dataset(cls, path, chunk_rows=CORRELATION_CHUNK_ROWS):
+        stats = None
+        for chunk in read_dataset_chunks(path, CORRELATION_FEATURES + CORRELATION_GROUP_COLUMNS, chunk_rows):
+            if stats is None:
+                stats = cls(_reference_point(chunk))
+            stats.add(chunk)
+        return stats if stats is not None else cls(np.zeros(len(CORRELATION_FEATURES)))
+
+    def add(self, df):
+        self._accumulate(df, 1)
+
+    def subtract(self, df):
+        self._accumulate(df, -1)
+
+    # Return the correlation matrix of the rows in the given classes (all when None)
+    # as {feature: {feature: r}}; r is None where a feature does not vary
+    def correlation(self, quality_classes=None, importance_classes=None):
+        size = len(CORRELATION_FEATURES)
+        count, sums, squares, products = (np.zeros((size, size)) for _ in range(4))
+        for (quality_class, importance_class), moments in self.groups.items():
+            if quality_classes is not None and quality_class not in quality_classes:
+                continue
+            if importance_classes is not None and importance_class not in importance_classes:
+                continue
+            count += moments[0]
+            sums += moments[1]
+            squares += moments[2]
+            products += moments[3]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            covariance = count * products - sums * sums.T
+            variances = count * squares - sums * sums
+            # A feature that does not vary leaves rounding noise rather than an exact zero
+            variances = np.where(variances <= CONSTANT_TOLERANCE * count * squares, 0.0, variances)
+            matrix = covariance / np.sqrt(variances * variances.T)
+        matrix = np.where(np.isfinite(matrix), np.clip(matrix, -1, 1), np.nan)
+        return {
+            row_feature: {
+                column_feature: None if np.isnan(matrix[i, j]) else float(matrix[i, j])
+                for j, column_feature in enumerate(CORRELATION_FEATURES)
+            }
+            for i, row_feature in enumerate(CORRELATION_FEATURES)
+        }
+
+    def to_dict(self):
+        return {
+            'features': CORRELATION_FEATURES,
+            'shift': self.shift.tolist(),
+            'groups': [
+                {'quality_class': quality_class, 'importance_class': importance_class,
+                 'moments': [moment.tolist() for moment in moments]}
+                for (quality_class, importance_class), moments in self.groups.items()
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('features') != CORRELATION_FEATURES:
+            raise ValueError("Correlation statistics were computed for other features")
+        groups = {
+            (group['quality_class'], group['importance_class']): [np.array(moment) for moment in group['moments']]
+            for group in data['groups']
+        }
+        return cls(data['shift'], groups)
+
+    def _accumulate(self, df, sign):
+        if not len(df):
+            return
+        values = df[CORRELATION_FEATURES].to_numpy(dtype=np.float64) - self.shift
+        present = ~np.isnan(values)
+        values = np.where(present, values, 0.0)
+        present = present.astype(np.float64)
+        keys = pd.MultiIndex.from_frame(df[CORRELATION_GROUP_COLUMNS].astype(object))
+        codes, uniques = pd.factorize(keys)
+        for code, (quality_class, importance_class) in enumerate(uniques):
+            rows = codes == code
+            group_values, group_present = values[rows], present[rows]
+            moments = [
+                group_present.T @ group_present,             # rows where both features are present
+                group_values.T @ group_present,              # sum of feature i over those rows
+                (group_values ** 2).T @ group_present,       # sum of squares of feature i
+                group_values.T @ group_values,               # sum of products of features i and j
+            ]
+            key = (_class_key(quality_class), _class_key(importance_class))
+            current = self.groups.get(key)
+            if current is None:
+                current = [np.zeros_like(moment) for moment in moments]
+            current = [total + sign * moment for total, moment in zip(current, moments)]
+            if current[0].max() <= 0:
+                # Every row of the class was subtracted
+                self.groups.pop(key, None)
+            else:
+                self.groups[key] = current
+
+
+# Path of the correlation statistics persisted next to a project's artifacts
+def correlation_path(project):
+    return f"{project}_correlation.json"
+
+
+# Identifies one version of a file
+def file_signature(path):
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+# Function to save a project's statistics together with the dataset file they describe
+def save_correlation_stats(project, stats, data_file_name):
+    temporary_path = f"{correlation_path(project)}.tmp"
+    with open(temporary_path, 'w') as file:
+        json.dump({'source': file_signature(data_file_name), **stats.to_dict()}, file)
+    os.replace(temporary_path, correlation_path(project))
+
+
+# Function to load a project's saved statistics if they describe the file version `signature`
+def load_correlation_stats(project, signature):
+    try:
+        with open(correlation_path(project)) as file:
+            data = json.load(file)
+        if data.get('source') != signature:
+            return None
+        return CorrelationStats.from_dict(data)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+# Function to bring a project's statistics up to date after its merged data was rewritten.
+#
+# When the saved statistics describe previous_signature, the rows of
+# previous_latest that changed are subtracted and their new versions in `latest`
+# added; otherwise the statistics are computed again from the new dataset.
+def update_correlation_stats(project, data_file_name, latest, previous_latest=None, previous_signature=None):
+    stats = None
+    if previous_latest is not None and previous_signature is not None:
+        stats = load_correlation_stats(project, previous_signature)
+    if stats is None:
+        stats = CorrelationStats.from_dataset(data_file_name)
+    else:
+        changed = changed_rows(latest, previous_latest)
+        replaced = ~previous_latest['page_title'].isin(latest['page_title']) | previous_latest['page_title'].isin(changed['page_title'])
+        stats.subtract(previous_latest[replaced])
+        stats.add(changed)
+    save_correlation_stats(project, stats, data_file_name)
+    return stats
+
+
+# Saved statistics of every project, keyed by the project and the dataset file they describe
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+# Function to get the statistics of a project's merged data, loading the saved ones
+# or computing (and saving) them when they are missing or out of date
+def correlation_stats(project):
+    data_file_name = dataset_path(project, 'merged')
+    if data_file_name is None:
+        return None
+    key = (project, file_signature(data_file_name))
+    with _loaded_lock:
+        stats = _loaded.get(key)
+    if stats is not None:
+        return stats
+    stats = load_correlation_stats(project, key[1])
+    if stats is None:
+        stats = CorrelationStats.from_dataset(data_file_name)
+        save_correlation_stats(project, stats, data_file_name)
+    with _loaded_lock:
+        for loaded_key in [loaded_key for loaded_key in _loaded if loaded_key[0] == project]:
+            del _loaded[loaded_key]
+        _loaded[key] = stats
+    return stats
+
+
+def _class_key(value):
+    return None if pd.isna(value) else str(value)
+
+
+# Typical value of every feature in the first rows, so shifted values stay small
+def _reference_point(df):
+    return df[CORRELATION_FEATURES].head(1000).astype(np.float64).median().fillna(0).to_numpy()
@@ -0,0 +1,85 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Rows written to CSV and sent together by an export
+EXPORT_CHUNK_ROWS = 5000
+
+# Most articles a single export can ask for
+MAX_EXPORT_ARTICLES = 50000
+
+_MONTH = re.compile(r'\d{4}-\d{2}')
+
+
+# Articles, columns and months requested from /download_csv.
+#
+# The body is either a list of page titles (what the client used to send) or an
+# object with `page_ids` and/or `titles`, optional `columns` (a list or a
+# comma-separated string) and an optional inclusive month range `start` / `end`
+# ('YYYY-MM').
+class ExportRequest:
+    def __init__(self, body):
+        if isinstance(body, list):
+            body = {'titles': body}
+        if not isinstance(body, dict):
+            raise ValueError("Expected a list of titles or an object with page_ids and titles")
+        self.page_ids = [int(page_id) for page_id in body.get('page_ids') or []]
+        self.titles = [str(title) for title in body.get('titles') or []]
+        columns = body.get('columns')
+        if isinstance(columns, str):
+            columns = [column for column in columns.split(',') if column]
+        self.columns = columns or None
+        self.start = body.get('start')
+        self.end = body.get('end')
+
+        if not self.page_ids and not self.titles:
+            raise ValueError("No articles requested")
+        if len(self.page_ids) + len(self.titles) > MAX_EXPORT_ARTICLES:
+            raise ValueError(f"At most {MAX_EXPORT_ARTICLES} articles can be exported at once")
+        for month in (self.start, self.end):
+            if month is not None and not _MONTH.fullmatch(str(month)):
+                raise ValueError("start and end must be months formatted as YYYY-MM")
+
+    # Return the columns to export from a monthly dataset, all of them by default
+    def export_columns(self, df):
+        if self.columns is None:
+            return list(df.columns)
+        unknown = [column for column in self.columns if column not in df.columns]
+        if unknown:
+            raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+        return self.columns
+
+
+# Function to generate the CSV export of some articles, one piece at a time.
+#
+# The monthly rows of the articles are taken from the ArticleIndex a few thousand
+# at a time, restricted to the month range and written with pandas' CSV writer;
+# every piece is yielded as bytes, so memory use does not grow with the number of
+# articles. `titles` maps page_id to page title for a leading page_title column,
+# when the titles are known; it replaces the page_title column of the monthly rows.
+def csv_chunks(article_index, page_ids, columns, start=None, end=None, titles=None):
+    if titles is not None:
+        columns = [column for column in columns if column != 'page_title']
+    header = (['page_title'] if titles is not None else []) + list(columns)
+    yield pd.DataFrame(columns=header).to_csv(index=False).encode('utf-8')
+    
+    frame = article_index.frame
+    found, starts, stops = article_index.ranges(page_ids)
+    lengths = stops - starts
+    ends = np.cumsum(lengths)
+    first = 0
+    while first < len(found):
+        # At least one article, then as many more as fit in EXPORT_CHUNK_ROWS rows
+        last = max(int(np.searchsorted(ends, ends[first] - lengths[first] + EXPORT_CHUNK_ROWS, side='right')), first + 1)
+        positions = np.concatenate([np.arange(row_start, row_stop) for row_start, row_stop in zip(starts[first:last], stops[first:last])])
+        rows = frame.iloc[positions][columns]
+        if titles is not None:
+            article_titles = [titles.get(page_id) for page_id in found[first:last].tolist()]
+            rows.insert(0, 'page_title', np.repeat(article_titles, lengths[first:last]))
+        if start is not None or end is not None:
+            months = frame['month'].iloc[positions].astype(str).to_numpy()
+            rows = rows[(months >= (start or '')) & (months <= (end or '9999-99'))]
+        if len(rows):
+            yield rows.to_csv(header=False, index=False).encode('utf-8')
+        first = last
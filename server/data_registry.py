@@ -0,0 +1,67 @@
+import re
+
+from storage import artifact_path, csv_path, dataset_path, read_dataset
+
+# Artifacts the ingest writes for every project
+PROJECT_DATASETS = ('merged', 'latest_monthly', 'monthly_aggregated')
+
+# WikiProject names become file names, so they may not contain path separators or control characters
+MAX_PROJECT_NAME_LENGTH = 255
+_UNSAFE_NAME = re.compile(r'[/\\\x00-\x1f]')
+
+
+# Raised when a project has no artifact of the requested kind (not ingested yet)
+class DatasetNotFound(Exception):
+    def __init__(self, project, kind):
+        super().__init__(f"No {kind} data for WikiProject '{project}'")
+        self.project = project
+        self.kind = kind
+
+
+# Function to check a WikiProject name taken from a request, returning it without a ".csv" extension
+def project_name(name):
+    name = (name or '').strip()
+    if name.endswith('.csv'):
+        name = name[:-4]
+    if not name:
+        raise ValueError("No WikiProject selected")
+    if len(name) > MAX_PROJECT_NAME_LENGTH or name.startswith('.') or _UNSAFE_NAME.search(name):
+        raise ValueError(f"Invalid WikiProject name: {name!r}")
+    return name
+
+
+# Per-project access to the ingested artifacts.
+#
+# Datasets are located by project name on every request and loaded through a
+# DatasetCache, which revalidates the files on each lookup. No project state is
+# kept anywhere else, so any worker process can serve any project, and an ingest
+# finished by one worker is picked up by the others on their next request.
+class DataRegistry:
+    def __init__(self, cache):
+        self.cache = cache
+
+    # Return the path of a project's artifact, raising DatasetNotFound when it does not exist
+    def path(self, project, kind):
+        path = dataset_path(project, kind)
+        if path is None:
+            raise DatasetNotFound(project, kind)
+        return path
+
+    # Return a project's artifact, optionally reading only some of its columns
+    def load(self, project, kind, columns=None):
+        return self.cache.get(self.path(project, kind), loader=_loader(columns),
+                              variant=tuple(columns) if columns else None)
+
+    # Return a structure derived from a project's artifact, built once per load
+    def derived(self, project, kind, name, builder, columns=None):
+        return self.cache.get_derived(self.path(project, kind), name, builder, loader=_loader(columns),
+                                      variant=tuple(columns) if columns else None)
+
+    # Drop the cached artifacts of a project (e.g. after it was ingested again)
+    def invalidate(self, project):
+        for kind in PROJECT_DATASETS:
+            self.cache.invalidate(artifact_path(project, kind), csv_path(project, kind))
+
+
+def _loader(columns):
+    return lambda path: read_dataset(path, columns)
@@ -0,0 +1,155 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from schema import read_csv
+
+# Default memory budget for cached DataFrames (1 GiB), overridable from the environment
+DEFAULT_MAX_BYTES = int(os.getenv('DATASET_CACHE_MAX_BYTES', 1024 ** 3))
+
+
+# A cached dataset together with the file signature it was parsed from
+class _Entry:
+    def __init__(self, signature, df):
+        self.signature = signature
+        self.df = df
+        self.size = int(df.memory_usage(deep=True).sum())
+        # Structures derived from the DataFrame (indexes, orderings, ...) live and die with it
+        self.derived = {}
+
+
+# In-process cache of parsed datasets keyed by file path.
+#
+# Entries are revalidated against the file's mtime and size on every lookup, so a
+# file rewritten by an ingest is re-parsed on the next request. The least recently
+# used entries are evicted once the total size goes over the memory budget; the
+# size of an entry includes the structures derived from its dataset.
+# DataFrames returned from the cache are shared between requests and must be
+# treated as read-only by callers.
+class DatasetCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Return the parsed dataset stored at path, loading it with loader on a miss
+    def get(self, path, loader=read_csv, variant=None):
+        key = (os.path.abspath(path), variant)
+        signature = _file_signature(key[0])
+
+        entry = self._lookup(key, signature)
+        if entry is not None:
+            return entry.df
+
+        # Only one thread parses a given file; concurrent requests wait for its result
+        with self._load_lock(key):
+            entry = self._lookup(key, signature)
+            if entry is not None:
+                return entry.df
+            with self._lock:
+                self.misses += 1
+            df = loader(path)
+            self._store(key, _Entry(signature, df))
+            return df
+
+    # Return a structure derived from the cached dataset, building it once per load
+    def get_derived(self, path, name, builder, loader=read_csv, variant=None):
+        df = self.get(path, loader=loader, variant=variant)
+        key = (os.path.abspath(path), variant)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.df is df and name in entry.derived:
+                return entry.derived[name]
+        value = builder(df)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.df is df and name not in entry.derived:
+                entry.derived[name] = value
+                entry.size += derived_size(value)
+                self._evict()
+        return value
+
+    # Drop every cached variant of the given files (e.g. after new data is ingested)
+    def invalidate(self, *paths):
+        targets = {os.path.abspath(path) for path in paths}
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in targets]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': sum(entry.size for entry in self._entries.values()),
+                'max_bytes': self.max_bytes,
+            }
+
+    def _lookup(self, key, signature):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.signature != signature:
+                # The file changed on disk since it was parsed
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return entry
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+
+    # Evict least recently used entries, but never the most recently used one
+    def _evict(self):
+        total = sum(cached.size for cached in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            total -= evicted.size
+            self.evictions += 1
+
+    def _load_lock(self, key):
+        with self._lock:
+            return self._load_locks.setdefault(key, threading.Lock())
+
+
+# Function to estimate the memory held by a derived structure, in bytes.
+#
+# Index classes report their own `nbytes` (counting only what they do not share
+# with the dataset); DataFrames, arrays and containers of them are measured.
+def derived_size(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(value, pd.DataFrame) else int(usage)
+    if isinstance(value, np.ndarray) or hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(derived_size(key) + derived_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(derived_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+# Signature used to detect that a file was rewritten since it was cached
+def _file_signature(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,125 @@
+import json
+import os
+
+import pandas as pd
+import requests
+
+# Base URL of the published datasets; point it at a local server to ingest fixture files
+DATASET_BASE_URL = os.getenv('DATASET_BASE_URL', 'https://analytics.wikimedia.org/published/datasets/outreachy-round-28/')
+REVISIONS_BASE_URL = f"{DATASET_BASE_URL}revisions/"
+ASSESSMENTS_BASE_URL = f"{DATASET_BASE_URL}assessments/"
+
+# Size of the chunks written to disk while downloading
+CHUNK_SIZE = 1024 * 1024
+
+# Number of rows parsed per chunk when reading CSV files incrementally
+CSV_CHUNK_ROWS = 200_000
+
+# Connect and read timeouts for upstream requests, in seconds
+TIMEOUT = (10, 120)
+
+
+# Function to stream a file to disk in chunks.
+#
+# The body is written to '<local_file_name>.part' and renamed once complete. If a
+# partial file from an interrupted transfer exists, the download resumes from its
+# end with an HTTP Range request (guarded by If-Range, so a file that changed
+# upstream is fetched again from the start). Interrupted transfers are retried up
+# to `retries` times. `progress`, if given, is called with the number of bytes on
+# disk after every chunk. Returns the final response; with conditional request
+# headers this may be a 304, in which case nothing is written.
+def download_file(url, local_file_name, headers=None, chunk_size=CHUNK_SIZE, retries=3, session=None, progress=None):
+    partial_file_name = f"{local_file_name}.part"
+    http = session or requests
+    attempt = 0
+    while True:
+        request_headers = dict(headers or {})
+        offset = os.path.getsize(partial_file_name) if os.path.exists(partial_file_name) else 0
+        validator = _read_validator(partial_file_name) if offset else None
+        if offset and validator:
+            request_headers['Range'] = f"bytes={offset}-"
+            request_headers['If-Range'] = validator
+        try:
+            with http.get(url, headers=request_headers, stream=True, verify=False, timeout=TIMEOUT) as response:
+                if response.status_code == 304:
+                    return response
+                if response.status_code == 416:
+                    # The partial file does not match the remote one any more, start over
+                    _discard_partial(partial_file_name)
+                    continue
+                response.raise_for_status()
+
+                resumed = response.status_code == 206
+                if not resumed:
+                    _write_validator(partial_file_name, response.headers)
+                written = offset if resumed else 0
+                with open(partial_file_name, 'ab' if resumed else 'wb') as file:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        file.write(chunk)
+                        written += len(chunk)
+                        if progress:
+                            progress(written)
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError, requests.exceptions.Timeout):
+            attempt += 1
+            if attempt > retries:
+                raise
+            print(f"Download of {url} interrupted, resuming (attempt {attempt} of {retries})")
+            continue
+
+        os.replace(partial_file_name, local_file_name)
+        _discard_partial(partial_file_name)
+        return response
+
+
+# Function to download a CSV file, reporting failures instead of raising
+def download_csv(url, local_file_name):
+    try:
+        download_file(url, local_file_name)
+        print(f"Downloaded {local_file_name}")
+    except Exception as e:
+        print(f"Error downloading the file from {url}: {e}")
+        return False
+    return True
+
+
+# Function to parse a CSV file chunk by chunk.
+#
+# `source` may be a local path or an http(s) URL; URLs are parsed straight from the
+# response stream, so at most one chunk of rows is held in memory at a time.
+def read_csv_chunks(source, chunksize=CSV_CHUNK_ROWS, **read_csv_kwargs):
+    if source.startswith(('http://', 'https://')):
+        with requests.get(source, stream=True, verify=False, timeout=TIMEOUT) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            yield from pd.read_csv(response.raw, chunksize=chunksize, **read_csv_kwargs)
+    else:
+        yield from pd.read_csv(source, chunksize=chunksize, **read_csv_kwargs)
+
+
+# The validator of a partial download is kept next to it, so a resumed transfer
+# only appends to the bytes of the same upstream file
+def _validator_file_name(partial_file_name):
+    return f"{partial_file_name}.json"
+
+
+def _read_validator(partial_file_name):
+    try:
+        with open(_validator_file_name(partial_file_name)) as file:
+            return json.load(file).get('validator')
+    except (OSError, ValueError):
+        return None
+
+
+def _write_validator(partial_file_name, response_headers):
+    validator = response_headers.get('ETag') or response_headers.get('Last-Modified')
+    if validator:
+        with open(_validator_file_name(partial_file_name), 'w') as file:
+            json.dump({'validator': validator}, file)
+    elif os.path.exists(_validator_file_name(partial_file_name)):
+        os.remove(_validator_file_name(partial_file_name))
+
+
+def _discard_partial(partial_file_name):
+    for file_name in (partial_file_name, _validator_file_name(partial_file_name)):
+        if os.path.exists(file_name):
+            os.remove(file_name)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# Numeric features that can be filtered with '<column>_min' / '<column>_max' bounds
+NUMERIC_FILTER_COLUMNS = ['num_refs', 'num_media', 'num_wikilinks', 'num_categories', 'num_headings', 'page_length', 'pred_qual']
+
+# Class columns that can be filtered with a list of accepted values
+CLASS_FILTER_COLUMNS = ['quality_class', 'importance_class']
+
+
+# Range and class filter over one dataset, built once per dataset load.
+#
+# Every numeric feature keeps its values in sorted order together with the row
+# positions they came from, so a [min, max] bound is two binary searches. Class
+# columns keep one bitmap per class value. A query starts from the most selective
+# numeric bound, checks the remaining bounds on those candidates only and skips
+# bounds that were not supplied.
+class FilterIndex:
+    def __init__(self, df):
+        self.size = len(df)
+        self._values = {}
+        self._orders = {}
+        self._sorted_values = {}
+        self._class_bitmaps = {}
+
+        # Rows with a missing feature never match, as no bound can be compared with them
+        complete = np.ones(self.size, dtype=bool)
+        for column in NUMERIC_FILTER_COLUMNS:
+            values = df[column].to_numpy(dtype=np.float64)
+            complete &= ~np.isnan(values)
+            order = np.argsort(values, kind='stable')
+            # NaNs sort last; leave them out of the searchable range
+            order = order[:np.count_nonzero(~np.isnan(values))]
+            self._values[column] = values
+            self._orders[column] = order
+            self._sorted_values[column] = values[order]
+        self._complete = complete
+
+        for column in CLASS_FILTER_COLUMNS:
+            codes, classes = pd.factorize(df[column])
+            self._class_bitmaps[column] = {value: codes == code for code, value in enumerate(classes)}
+
+        # Memory held by the index, counted in the size of its cached dataset
+        self.nbytes = (self._complete.nbytes
+                       + sum(self._values[column].nbytes + self._orders[column].nbytes + self._sorted_values[column].nbytes
+                             for column in NUMERIC_FILTER_COLUMNS)
+                       + sum(bitmap.nbytes for bitmaps in self._class_bitmaps.values() for bitmap in bitmaps.values()))
+
+    # Return the ascending row positions matching the filters of a /filter request
+    def query(self, filters):
+        bounds = []
+        for column in NUMERIC_FILTER_COLUMNS:
+            low, high = filters.get(f"{column}_min"), filters.get(f"{column}_max")
+            if low is None and high is None:
+                continue
+            sorted_values = self._sorted_values[column]
+            start = 0 if low is None else np.searchsorted(sorted_values, float(low), side='left')
+            stop = len(sorted_values) if high is None else np.searchsorted(sorted_values, float(high), side='right')
+            bounds.append((max(stop - start, 0), column, low, high, start, stop))
+
+        if bounds:
+            # Candidates come from the most selective bound, the others are checked on them
+            bounds.sort(key=lambda bound: bound[0])
+            _, column, _, _, start, stop = bounds[0]
+            rows = self._orders[column][start:stop] if stop > start else np.empty(0, dtype=np.intp)
+            for _, column, low, high, _, _ in bounds[1:]:
+                values = self._values[column][rows]
+                keep = np.ones(len(rows), dtype=bool)
+                if low is not None:
+                    keep &= values >= float(low)
+                if high is not None:
+                    keep &= values <= float(high)
+                rows = rows[keep]
+            rows = np.sort(rows)
+        else:
+            rows = np.arange(self.size)
+        rows = rows[self._complete[rows]]
+
+        for column in CLASS_FILTER_COLUMNS:
+            accepted = filters.get(column)
+            if not accepted:
+                continue
+            bitmaps = self._class_bitmaps[column]
+            matches = np.zeros(self.size, dtype=bool)
+            for value in accepted:
+                if value in bitmaps:
+                    matches |= bitmaps[value]
+            rows = rows[matches[rows]]
+
+        return rows
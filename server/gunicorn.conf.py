@@ -0,0 +1,12 @@
+import os
+
+# Settings of the multi-worker server, started from the server directory with
+#   gunicorn app:app
+# Every worker keeps its own dataset cache; the artifacts are memory-mapped, so
+# the workers share their pages through the operating system's page cache.
+bind = os.getenv('BIND', '127.0.0.1:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', os.cpu_count() or 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+# Large exports and first loads of big projects can take a while
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 300))
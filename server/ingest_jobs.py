@@ -0,0 +1,183 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import process_wikiproject_monthly
+import process_wikiproject_latest
+from downloader import REVISIONS_BASE_URL, ASSESSMENTS_BASE_URL
+from raw_cache import raw_cache
+
+# Number of projects that can be ingested at the same time
+INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', 2))
+
+# Finished jobs are kept around for status queries for this many seconds
+JOB_RETENTION_SECONDS = 3600
+
+# Directory the status of every job is written to, so any server process can report it
+JOB_DIR = os.getenv('JOB_DIR', 'jobs')
+
+# Progress updates are written to disk at most this often per job
+JOB_SAVE_INTERVAL = 1.0
+
+_JOB_ID = re.compile(r'[0-9a-f]{32}')
+
+
+# A background ingest of one WikiProject and its progress
+class IngestJob:
+    def __init__(self, project):
+        self.id = uuid.uuid4().hex
+        self.project = project
+        self.state = 'queued'
+        self.stage = None
+        self.progress = {}
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.saved_at = 0
+        self._lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.state in ('succeeded', 'failed')
+
+    def update(self, section, **details):
+        with self._lock:
+            self.progress.setdefault(section, {}).update(details)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'job_id': self.id,
+                'project': self.project,
+                'state': self.state,
+                'stage': self.stage,
+                'progress': {section: dict(details) for section, details in self.progress.items()},
+                'error': self.error,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+            }
+
+
+# Runs ingest jobs on a worker pool.
+#
+# A job first downloads the project's raw files into the shared raw cache, then runs
+# the monthly and latest pipelines concurrently, as they only share those inputs.
+# Submitting a project that is already queued or running in this process returns the
+# existing job. The status of every job is also written to job_dir, so status
+# queries answered by another server process see it too.
+# `on_finished(job)` is called once a job has completed, successfully or not.
+class JobManager:
+    def __init__(self, max_workers=INGEST_WORKERS, on_finished=None, job_dir=JOB_DIR):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ingest')
+        self._jobs = {}
+        self._active = {}
+        self._lock = threading.Lock()
+        self._on_finished = on_finished
+        self.job_dir = job_dir
+
+    def submit(self, project):
+        if project.endswith('.csv'):
+            project = project[:-4]
+        with self._lock:
+            self._expire()
+            job = self._active.get(project)
+            if job is not None:
+                return job
+            job = IngestJob(project)
+            self._jobs[job.id] = job
+            self._active[project] = job
+        self._save(job)
+        self._executor.submit(self._run, job)
+        return job
+
+    # Return the status of a job as a dict, from this process or from the job directory
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        if not _JOB_ID.fullmatch(job_id):
+            return None
+        try:
+            with open(self._job_path(job_id)) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _run(self, job):
+        job.state = 'running'
+        job.started_at = time.time()
+        try:
+            job.stage = 'download'
+            self._save(job)
+            for name, base_url in (('revisions', REVISIONS_BASE_URL), ('assessments', ASSESSMENTS_BASE_URL)):
+                url = f"{base_url}{job.project}.csv"
+                raw_cache.fetch(url, progress=lambda written, name=name: self._update(job, 'download', **{f"{name}_bytes": written}))
+
+            job.stage = 'process'
+            self._save(job)
+            pipelines = {
+                'monthly': lambda: process_wikiproject_monthly.main(
+                    job.project, progress=lambda stage, **details: self._update(job, 'monthly', stage=stage, **details)),
+                'latest': lambda: process_wikiproject_latest.main(
+                    job.project, progress=lambda stage, **details: self._update(job, 'latest', stage=stage, **details)),
+            }
+            with ThreadPoolExecutor(max_workers=len(pipelines)) as executor:
+                futures = {name: executor.submit(pipeline) for name, pipeline in pipelines.items()}
+                failed = [name for name, future in futures.items() if future.result() is None]
+            if failed:
+                raise RuntimeError(f"Failed to process {' and '.join(failed)} data")
+
+            job.stage = 'done'
+            job.state = 'succeeded'
+        except Exception as e:
+            job.error = str(e)
+            job.state = 'failed'
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                if self._active.get(job.project) is job:
+                    del self._active[job.project]
+            self._save(job)
+            if self._on_finished:
+                self._on_finished(job)
+
+    # Record progress, writing the job to disk at most every JOB_SAVE_INTERVAL seconds
+    def _update(self, job, section, **details):
+        job.update(section, **details)
+        if time.time() - job.saved_at >= JOB_SAVE_INTERVAL:
+            self._save(job)
+
+    def _save(self, job):
+        job.saved_at = time.time()
+        temporary_path = f"{self._job_path(job.id)}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.job_dir, exist_ok=True)
+            with open(temporary_path, 'w') as file:
+                json.dump(job.to_dict(), file)
+            os.replace(temporary_path, self._job_path(job.id))
+        except OSError as e:
+            print(f"Error saving the status of job {job.id}: {e}")
+
+    def _job_path(self, job_id):
+        return os.path.join(self.job_dir, f"{job_id}.json")
+
+    # Forget finished jobs once they are older than the retention period, here and on disk
+    def _expire(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done and job.finished_at and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+        if not os.path.isdir(self.job_dir):
+            return
+        for entry in os.scandir(self.job_dir):
+            if entry.name.endswith('.json') and entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+# Timestamp formats of the tables served by the API and loaded into MySQL
+API_TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+MYSQL_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+# Function to pick the latest revision of every article and join it with the article's assessment.
+#
+# Returns one row per page_title, sorted by title, holding for every column the
+# value of the newest revision that has one (as the newest revision of each
+# column would be found by sorting all revisions by timestamp). Timestamps are
+# compared as datetimes to the second, ties going to the revision listed first,
+# and formatted with timestamp_format only in the result.
+#
+# The latest revision is selected per page_id before the join, so only one row
+# per article is joined and sorted. Articles sharing a title with another
+# page_id keep all their revisions, as their newest values may come from
+# either page.
+def latest_revisions(df_revisions, df_pages, timestamp_format):
+    timestamps = pd.to_datetime(df_revisions['revision_timestamp'], utc=True).dt.floor('s')
+    # Missing timestamps (NaT) are the smallest integers, so they rank below every revision
+    ranks = timestamps.to_numpy(dtype='datetime64[ns]').view(np.int64)
+    page_ids = df_revisions['page_id'].to_numpy()
+    collapsed = ~np.isin(page_ids, _pages_sharing_a_title(df_pages))
+
+    # The newest revision of every page: the first row with the highest rank
+    positions = _first_maximum(ranks, page_ids, np.flatnonzero(collapsed))
+    latest = df_revisions.iloc[positions].reset_index(drop=True)
+    latest['revision_timestamp'] = timestamps.array[positions]
+
+    # Values missing from the newest revision come from the newest revision that has them
+    latest_page_ids = latest['page_id'].to_numpy()
+    for column in latest.columns:
+        missing = latest[column].isna().to_numpy()
+        if column == 'page_id' or not missing.any():
+            continue
+        source = timestamps if column == 'revision_timestamp' else df_revisions[column]
+        candidates = np.flatnonzero(collapsed & np.isin(page_ids, latest_page_ids[missing]) & source.notna().to_numpy())
+        if not len(candidates):
+            continue
+        best = _first_maximum(ranks, page_ids, candidates)
+        rows = pd.Index(latest_page_ids).get_indexer(page_ids[best])
+        latest.iloc[rows, latest.columns.get_loc(column)] = source.iloc[best].to_numpy()
+
+    if not collapsed.all():
+        shared = df_revisions[~collapsed].assign(revision_timestamp=timestamps[~collapsed])
+        latest = pd.concat([latest, shared], ignore_index=True)
+
+    # Join the assessments and pick the newest values per title among the few remaining rows
+    df_merged = latest.merge(df_pages, on='page_id')
+    sorted_df = df_merged.sort_values(by=['page_title', 'revision_timestamp'], ascending=[True, False])
+    latest_revisions_df = sorted_df.groupby('page_title').first().reset_index()
+    latest_revisions_df['revision_timestamp'] = latest_revisions_df['revision_timestamp'].dt.strftime(timestamp_format)
+    return latest_revisions_df
+
+
+# Positions (among `candidates`) of the first row with the highest rank for every page
+def _first_maximum(ranks, page_ids, candidates):
+    return pd.Series(ranks[candidates], index=candidates).groupby(page_ids[candidates], sort=False).idxmax().to_numpy()
+
+
+# page_ids whose title is also the title of another page_id
+def _pages_sharing_a_title(df_pages):
+    titles = df_pages[['page_id', 'page_title']].drop_duplicates()
+    return titles.loc[titles['page_title'].duplicated(keep=False) & titles['page_title'].notna(), 'page_id'].to_numpy()
@@ -0,0 +1,197 @@
+import cProfile
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, request
+
+# Upper bounds (seconds) of the latency histogram buckets, from fast reads to whole ingests
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# Requests slower than this many seconds have their cProfile dumped to PROFILE_DIR; 0 disables profiling
+PROFILE_SLOW_REQUESTS = float(os.getenv('PROFILE_SLOW_REQUESTS', 0))
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Type and description of every metric
+METRICS = {
+    'wikievolution_stage_duration_seconds': ('histogram', "Time spent in a pipeline stage"),
+    'wikievolution_stage_rows_total': ('counter', "Rows processed by a pipeline stage"),
+    'wikievolution_stage_bytes_total': ('counter', "Bytes read or written by a pipeline stage"),
+    'wikievolution_http_request_duration_seconds': ('histogram', "Time to produce the response of a request"),
+    'wikievolution_http_response_bytes_total': ('counter', "Bytes of the responses of a route, after compression"),
+    'wikievolution_cache_hits_total': ('counter', "Lookups a cache answered"),
+    'wikievolution_cache_misses_total': ('counter', "Lookups a cache could not answer"),
+    'wikievolution_cache_hit_ratio': ('gauge', "Share of the lookups of a cache it answered"),
+    'wikievolution_cache_bytes': ('gauge', "Bytes held by a cache"),
+    'wikievolution_cache_entries': ('gauge', "Entries held by a cache"),
+}
+
+_PROFILE_NAME = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+# Counters, gauges and histograms of one process, rendered in the Prometheus text format.
+#
+# Every gunicorn worker keeps its own values, and /metrics reports those of the
+# worker that answers it.
+class MetricsRegistry:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._values = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._values[(name, _label_key(labels))] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram['counts'][position] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    # Return every metric in the Prometheus text exposition format
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+            histograms = {key: {**histogram, 'counts': list(histogram['counts'])}
+                          for key, histogram in self._histograms.items()}
+        lines = []
+        for name in sorted({name for name, _ in values} | {name for name, _ in histograms}):
+            kind, description = METRICS.get(name, ('untyped', name))
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (metric, labels), value in sorted(values.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, count in zip(self.buckets, histogram['counts']):
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+        return '\n'.join(lines) + '\n'
+
+
+# Metrics of this process
+metrics = MetricsRegistry()
+
+
+# What a pipeline stage processed, filled in by the code inside span()
+class Span:
+    def __init__(self, pipeline, stage):
+        self.pipeline = pipeline
+        self.stage = stage
+        self.rows = None
+        self.bytes = None
+
+
+# Function to time a stage of a pipeline.
+#
+#     with span('latest', 'read') as stage:
+#         df = pd.read_csv(file_name)
+#         stage.rows = len(df)
+#
+# The time is recorded even when the stage fails, together with the rows and
+# bytes the stage reported, and printed with the pipeline's other messages.
+@contextmanager
+def span(pipeline, stage, registry=metrics):
+    record = Span(pipeline, stage)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        elapsed = time.perf_counter() - start
+        registry.observe('wikievolution_stage_duration_seconds', elapsed, pipeline=pipeline, stage=stage)
+        if record.rows is not None:
+            registry.increment('wikievolution_stage_rows_total', record.rows, pipeline=pipeline, stage=stage)
+        if record.bytes is not None:
+            registry.increment('wikievolution_stage_bytes_total', record.bytes, pipeline=pipeline, stage=stage)
+        print(f"[{pipeline}] {stage} took {elapsed:.2f}s" + (f" ({record.rows} rows)" if record.rows is not None else ""))
+
+
+# Function to record the counters of a cache, given as in DatasetCache.stats
+def record_cache_stats(cache, stats, registry=metrics):
+    hits = stats['hits'] + stats.get('revalidations', 0)
+    lookups = hits + stats['misses']
+    registry.set('wikievolution_cache_hits_total', hits, cache=cache)
+    registry.set('wikievolution_cache_misses_total', stats['misses'], cache=cache)
+    registry.set('wikievolution_cache_hit_ratio', hits / lookups if lookups else 0.0, cache=cache)
+    if 'bytes' in stats:
+        registry.set('wikievolution_cache_bytes', stats['bytes'], cache=cache)
+    registry.set('wikievolution_cache_entries', stats['entries'], cache=cache)
+
+
+# Function to record the latency and response size of every request of a Flask app,
+# and to profile requests when PROFILE_SLOW_REQUESTS is set.
+#
+# Register it before other after_request handlers (such as compression) so their
+# time and the final response size are included. Streamed responses are timed up
+# to their first byte.
+def instrument_app(app, registry=metrics, profile_slow_requests=PROFILE_SLOW_REQUESTS, profile_dir=PROFILE_DIR):
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+        g.profiler = None
+        if profile_slow_requests > 0:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                g.profiler = profiler
+            except ValueError:
+                # Another request of this process is being profiled
+                pass
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop('request_start', None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        registry.observe('wikievolution_http_request_duration_seconds', elapsed,
+                         route=route, method=request.method, status=str(response.status_code))
+        if response.content_length is not None:
+            registry.increment('wikievolution_http_response_bytes_total', response.content_length, route=route)
+
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            if elapsed >= profile_slow_requests:
+                os.makedirs(profile_dir, exist_ok=True)
+                file_name = os.path.join(profile_dir, _PROFILE_NAME.sub('_', f"{int(time.time() * 1000)}_{request.method}_{route}") + '.prof')
+                profiler.dump_stats(file_name)
+                print(f"Slow request {request.method} {request.full_path} took {elapsed:.2f}s, profile saved to {file_name}")
+        return response
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,174 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Per-article endpoint of the Wikimedia pageviews API, overridable to test against a local server
+PAGEVIEWS_API_BASE = os.getenv(
+    'PAGEVIEWS_API_BASE',
+    'https://wikimedia.org/api/rest_v1/metrics/pageviews/per-article/en.wikipedia/all-access/user')
+
+# Most upstream requests in flight at the same time
+PAGEVIEWS_WORKERS = int(os.getenv('PAGEVIEWS_WORKERS', 8))
+
+# Number of (title, granularity) series kept in memory
+PAGEVIEWS_CACHE_ENTRIES = int(os.getenv('PAGEVIEWS_CACHE_ENTRIES', 10000))
+
+# Days this close to today are not final upstream yet and are fetched again every time
+PAGEVIEWS_UNSETTLED_DAYS = 2
+
+TIMEOUT = (10, 30)
+
+# Define the user agent
+contact_email = 'paragon@wikimedia.org'
+tutorial_label = 'PAWS Language-agnostic quality modeling tutorial (mwapi)'
+USER_AGENT = f'<{contact_email}> {tutorial_label}'
+
+
+# Raised when upstream answers a pageviews request with an error
+class PageviewsError(Exception):
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# Pooled, concurrent and cached client of the pageviews API.
+#
+# Every (title, granularity) series is cached together with the day ranges it
+# covers; a request only asks upstream for the days that are not covered yet and
+# merges them into the series. All requests share one keep-alive session, and at
+# most max_workers of them run at the same time.
+class PageviewsClient:
+    def __init__(self, base_url=PAGEVIEWS_API_BASE, max_workers=PAGEVIEWS_WORKERS,
+                 max_entries=PAGEVIEWS_CACHE_ENTRIES):
+        self.base_url = base_url.rstrip('/')
+        self.max_entries = max_entries
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers,
+                              max_retries=Retry(total=2, backoff_factor=0.5, status_forcelist=[429, 502, 503, 504]))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pageviews')
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.upstream_requests = 0
+
+    # Return the pageview items of one title between two days (YYYYMMDD, inclusive)
+    def get(self, title, start, end, granularity='daily'):
+        start, end = _parse_day(start), _parse_day(end)
+        if start > end:
+            raise ValueError("start must not be after end")
+        series = self._get_series(title, granularity)
+        with series.lock:
+            gaps = series.gaps(start, end)
+            for gap_start, gap_end in gaps:
+                series.add(self._fetch(title, granularity, gap_start, gap_end), gap_start, gap_end)
+            if not gaps:
+                with self._lock:
+                    self.hits += 1
+            return {'items': series.items_between(start, end)}
+
+    # Return {title: response} for many titles, fetched concurrently.
+    # A title that failed maps to {'error': ..., 'status_code': ...} instead.
+    def get_many(self, titles, start, end, granularity='daily'):
+        def get_one(title):
+            try:
+                return self.get(title, start, end, granularity)
+            except PageviewsError as e:
+                return {'error': str(e), 'status_code': e.status_code}
+            except requests.exceptions.RequestException as e:
+                return {'error': str(e), 'status_code': 502}
+        return dict(zip(titles, self._executor.map(get_one, titles)))
+
+    def stats(self):
+        with self._lock:
+            return {'series': len(self._series), 'hits': self.hits, 'upstream_requests': self.upstream_requests}
+
+    def _get_series(self, title, granularity):
+        with self._lock:
+            key = (title, granularity)
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series()
+                while len(self._series) > self.max_entries:
+                    self._series.popitem(last=False)
+            else:
+                self._series.move_to_end(key)
+            return series
+
+    def _fetch(self, title, granularity, start, end):
+        url = f"{self.base_url}/{quote(title, safe='')}/{granularity}/{start:%Y%m%d}/{end:%Y%m%d}"
+        with self._lock:
+            self.upstream_requests += 1
+        response = self.session.get(url, timeout=TIMEOUT)
+        # Upstream answers 404 when there are no pageviews in the range
+        if response.status_code == 404:
+            return []
+        if response.status_code != 200:
+            raise PageviewsError('Failed to fetch data from Wikimedia API', response.status_code)
+        return response.json().get('items', [])
+
+
+# Cached pageviews of one title and granularity, and the day ranges they cover
+class _Series:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.items = {}
+        self.covered = []
+
+    # Return the (start, end) day ranges between start and end that are not covered
+    def gaps(self, start, end):
+        gaps = []
+        cursor = start
+        for covered_start, covered_end in self.covered:
+            if covered_end < cursor:
+                continue
+            if covered_start > end:
+                break
+            if covered_start > cursor:
+                gaps.append((cursor, covered_start - timedelta(days=1)))
+            cursor = max(cursor, covered_end + timedelta(days=1))
+        if cursor <= end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def add(self, items, start, end):
+        for item in items:
+            self.items[item['timestamp']] = item
+        # Recent days can still change upstream, so they are never marked as covered
+        end = min(end, datetime.now(timezone.utc).date() - timedelta(days=PAGEVIEWS_UNSETTLED_DAYS))
+        if start > end:
+            return
+        ranges = sorted(self.covered + [(start, end)])
+        merged = [ranges[0]]
+        for range_start, range_end in ranges[1:]:
+            last_start, last_end = merged[-1]
+            if range_start <= last_end + timedelta(days=1):
+                merged[-1] = (last_start, max(last_end, range_end))
+            else:
+                merged.append((range_start, range_end))
+        self.covered = merged
+
+    def items_between(self, start, end):
+        low, high = f"{start:%Y%m%d}00", f"{end:%Y%m%d}99"
+        return [self.items[timestamp] for timestamp in sorted(self.items) if low <= timestamp <= high]
+
+
+# Days are given as YYYYMMDD, optionally followed by an hour as the API accepts
+def _parse_day(value):
+    value = str(value)
+    if len(value) not in (8, 10) or not value.isdigit():
+        raise ValueError(f"Invalid date '{value}', expected YYYYMMDD")
+    return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+
+
+# Client shared by the pageviews endpoints
+pageviews_client = PageviewsClient()
@@ -1,36 +1,24 @@
-import pandas as pd
-import requests
 import os
 
+import pandas as pd
+from downloader import REVISIONS_BASE_URL, ASSESSMENTS_BASE_URL
+from raw_cache import fetch_csv
+from latest_revisions import API_TIMESTAMP_FORMAT, latest_revisions
+from metrics import span
+from schema import read_csv
+from correlation import file_signature, update_correlation_stats
+from storage import dataset_path, read_dataset, write_dataset
+from watermarks import INCREMENTAL_INGEST, latest_revision_inputs, load_watermark, new_revisions, save_watermark
+
 # Function to construct the URL based on the user's input
 def construct_url(base_url, wikiproject_name):
     file_name = f"{wikiproject_name}.csv"
     return f"{base_url}{file_name}"
 
-# Function to download the CSV file
-def download_csv(url, local_file_name):
-    try:
-        response = requests.get(url, verify=False)  # Disable SSL verification
-        response.raise_for_status()  # Raise an error for bad status
-        with open(local_file_name, 'wb') as file:
-            file.write(response.content)
-        print(f"Downloaded {local_file_name}")
-    except Exception as e:
-        print(f"Error downloading the file from {url}: {e}")
-        return False
-    return True
-
 # Function to perform the data transformations
 def transform_data(df_revisions, df_pages, wikiproject_name):
-    # Convert the timestamp format to 'YYYY-MM-DDTHH:MM:SSZ'
-    df_revisions['revision_timestamp'] = pd.to_datetime(df_revisions['revision_timestamp']).dt.strftime('%Y-%m-%dT%H:%M:%SZ')
-    
-    # Merge the dataframes on 'page_id'
-    df_merged = df_revisions.merge(df_pages, on='page_id')
-    
-    # Sort the merged dataframe and get the latest revisions
-    sorted_df = df_merged.sort_values(by=['page_title', 'revision_timestamp'], ascending=[True, False])
-    latest_revisions_df = sorted_df.groupby('page_title').first().reset_index()
+    # Get the latest revisions with their assessments, timestamps formatted as 'YYYY-MM-DDTHH:MM:SSZ'
+    latest_revisions_df = latest_revisions(df_revisions, df_pages, API_TIMESTAMP_FORMAT)
     
     # Add a column for the Wikiproject name
     latest_revisions_df['wikiproject'] = wikiproject_name
@@ -47,11 +35,17 @@ def transform_data(df_revisions, df_pages, wikiproject_name):
     
     return transformed_df
 
-# Main function to execute the script
-def main(selected_wikiproject):
+# Main function to execute the script.
+#
+# `progress`, if given, is called as progress(stage, **details) as the pipeline
+# advances. With `incremental`, a project processed before only has the revisions
+# added since its watermark merged into its existing table, and is skipped when
+# neither raw file has changed. Returns the name of the written file, or None if
+# processing failed.
+def main(selected_wikiproject, progress=None, incremental=INCREMENTAL_INGEST):
     # Base URLs
-    revisions_base_url = "https://analytics.wikimedia.org/published/datasets/outreachy-round-28/revisions/"
-    assessments_base_url = "https://analytics.wikimedia.org/published/datasets/outreachy-round-28/assessments/"
+    revisions_base_url = REVISIONS_BASE_URL
+    assessments_base_url = ASSESSMENTS_BASE_URL
     
     # Use the provided Wikiproject name
     wikiproject_name = selected_wikiproject
@@ -60,41 +54,68 @@ def main(selected_wikiproject):
     if wikiproject_name.endswith(".csv"):
         wikiproject_name = wikiproject_name[:-4]
     
-    # Construct the URLs and local file names
+    # Construct the URLs
     revisions_url = construct_url(revisions_base_url, wikiproject_name)
     assessments_url = construct_url(assessments_base_url, wikiproject_name)
-    revisions_file_name = f"{wikiproject_name}_revisions.csv"
-    assessments_file_name = f"{wikiproject_name}_assessments.csv"
     
-    # Download the CSV files
-    if not download_csv(revisions_url, revisions_file_name):
-        return
-    if not download_csv(assessments_url, assessments_file_name):
+    # Fetch the CSV files through the shared download cache
+    with span('latest', 'download') as stage:
+        revisions_file_name = fetch_csv(revisions_url)
+        assessments_file_name = fetch_csv(assessments_url) if revisions_file_name else None
+        if assessments_file_name:
+            stage.bytes = os.path.getsize(revisions_file_name) + os.path.getsize(assessments_file_name)
+    if not revisions_file_name or not assessments_file_name:
         return
     
+    # The raw cache names its files after their content, so unchanged files keep their names
+    source = f"{os.path.basename(revisions_file_name)}:{os.path.basename(assessments_file_name)}"
+    previous_file_name = dataset_path(wikiproject_name, 'merged')
+    watermark = load_watermark(wikiproject_name, 'latest') if incremental and previous_file_name else None
+    if watermark and watermark['source'] == source:
+        print(f"No new revisions for {wikiproject_name}, keeping {previous_file_name}")
+        return previous_file_name
+    
     # Read the CSV files
     try:
-        df_revisions = pd.read_csv(revisions_file_name)
-        df_pages = pd.read_csv(assessments_file_name)
+        with span('latest', 'read') as stage:
+            df_revisions = read_csv(revisions_file_name, timestamps=True)
+            df_pages = read_csv(assessments_file_name)
+            stage.rows = len(df_revisions) + len(df_pages)
+            stage.bytes = os.path.getsize(revisions_file_name) + os.path.getsize(assessments_file_name)
     except Exception as e:
         print(f"Error reading the CSV files: {e}")
         return
+    if progress:
+        progress('read', rows=len(df_revisions))
     
-    # Perform the data transformations
-    transformed_df = transform_data(df_revisions, df_pages, wikiproject_name)
+    # Perform the data transformations, only on the new revisions when possible
+    with span('latest', 'transform') as stage:
+        df_input = df_revisions
+        previous_df, previous_signature = None, None
+        new_mask = new_revisions(df_revisions, watermark)
+        if new_mask is not None:
+            print(f"Merging {int(new_mask.sum())} new revisions into {previous_file_name}")
+            previous_signature = file_signature(previous_file_name)
+            previous_df = read_dataset(previous_file_name)
+            df_input = latest_revision_inputs(df_revisions, df_pages, previous_df, new_mask)
+        transformed_df = transform_data(df_input, df_pages, wikiproject_name)
+        stage.rows = len(transformed_df)
+    if progress:
+        progress('transform', rows=len(transformed_df))
     
-    # Save the transformed data to a CSV file
-    merged_file_name = f"{wikiproject_name}_merged.csv"
-    transformed_df.to_csv(merged_file_name, index=False)
+    # Save the transformed data
+    with span('latest', 'write') as stage:
+        merged_file_name = write_dataset(transformed_df, wikiproject_name, 'merged')
+        stage.rows, stage.bytes = len(transformed_df), os.path.getsize(merged_file_name)
     print(f"Saved merged data to {merged_file_name}")
+    save_watermark(wikiproject_name, 'latest', df_revisions, source)
     
-    # Delete the downloaded CSV files
-    try:
-        os.remove(revisions_file_name)
-        os.remove(assessments_file_name)
-        print(f"Deleted {revisions_file_name} and {assessments_file_name}")
-    except Exception as e:
-        print(f"Error deleting the files: {e}")
+    # Update the correlation statistics with the articles that changed
+    with span('latest', 'correlation'):
+        update_correlation_stats(wikiproject_name, merged_file_name, transformed_df, previous_df, previous_signature)
+    if progress:
+        progress('write', rows=len(transformed_df))
+    return merged_file_name
 
 if __name__ == "__main__":
     main()
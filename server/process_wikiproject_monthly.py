@@ -1,66 +1,186 @@
+import os
+
+import numpy as np
 import pandas as pd
-import requests
-from io import StringIO
+from downloader import REVISIONS_BASE_URL
+from raw_cache import fetch_csv
+from metrics import span
+from schema import compact, read_csv
+from storage import dataset_path, read_dataset, write_dataset
+from watermarks import INCREMENTAL_INGEST, load_watermark, new_revisions, save_watermark
 
 # Function to construct the URL based on the Wikiproject name
 def construct_url(base_url, wikiproject_name):
     file_name = f"{wikiproject_name}.csv"
     return f"{base_url}{file_name}"
 
-# Function to download the CSV file using requests and StringIO
-def download_csv(url):
-    try:
-        # Make a GET request to fetch the raw CSV data
-        response = requests.get(url, verify=False)  # Disable SSL verification
-        response.raise_for_status()  # Raise an error for bad status codes
-
-        # Use StringIO to convert the response text to a file-like object
-        csv_data = StringIO(response.text)
-        
-        # Read the CSV data into a DataFrame
-        df = pd.read_csv(csv_data)
-        
-        return df
-    except Exception as e:
-        print(f"Error downloading the file from {url}: {e}")
-        return None
-
 # Function to perform the data preprocessing
-def fill_missing_months(df):
+#
+# By default each article's months run from its first revision to the last month of
+# the project. With global_month_range=True every article spans the project's full
+# month range instead, back-filled from its first revision (the original behaviour).
+# start_month / end_month ('YYYY-MM') widen the project's month range beyond the
+# months of the given revisions, for grids computed for a subset of the articles.
+def fill_missing_months(df, global_month_range=False, start_month=None, end_month=None):
     # Ensure the revision_timestamp is in datetime format
     df['revision_timestamp'] = pd.to_datetime(df['revision_timestamp'])
     
-    # Ensure the 'month' column is in the correct format 'YYYY-MM'
-    df['month'] = df['revision_timestamp'].dt.to_period('M').astype(str)
-    
     # Sort the data by page_id and revision_timestamp
     df = df.sort_values(by=['page_id', 'revision_timestamp'])
     
-    # Generate a full range of months for each article
-    all_months = pd.period_range(start=df['revision_timestamp'].min(), end=df['revision_timestamp'].max(), freq='M')
+    # Work with integer month ordinals (year * 12 + month - 1) instead of 'YYYY-MM' strings
+    timestamps = df['revision_timestamp']
+    month_ordinals = (timestamps.dt.year * 12 + timestamps.dt.month - 1).to_numpy()
+    first_month, last_month = month_ordinals.min(), month_ordinals.max()
+    if start_month is not None:
+        first_month = min(first_month, month_ordinal(start_month))
+    if end_month is not None:
+        last_month = max(last_month, month_ordinal(end_month))
     
-    # Create a new DataFrame that contains a row for every article and every month
-    expanded_df = pd.DataFrame([
-        (page_id, month) for page_id in df['page_id'].unique() for month in all_months
-    ], columns=['page_id', 'month'])
+    # Pick the first month of every article; the grid is laid out article by article
+    page_codes, page_ids = pd.factorize(df['page_id'], sort=True)
+    first_revisions = np.searchsorted(page_codes, np.arange(len(page_ids)), side='left')
+    if global_month_range:
+        page_first_months = np.full(len(page_ids), first_month)
+    else:
+        page_first_months = month_ordinals[first_revisions]
+    months_per_page = last_month - page_first_months + 1
+    page_offsets = np.cumsum(months_per_page) - months_per_page
+    grid_keys = page_offsets[page_codes] + (month_ordinals - page_first_months[page_codes])
+    grid_size = months_per_page.sum()
     
-    # Merge the original data with the expanded DataFrame
-    df['month'] = df['month'].astype(str)
-    expanded_df['month'] = expanded_df['month'].astype(str)
-    df_filled = pd.merge(expanded_df, df, on=['page_id', 'month'], how='left')
+    # A grid cell holds all revisions made in that month, or a single empty row
+    rows_per_key = np.maximum(np.bincount(grid_keys, minlength=grid_size), 1)
+    key_starts = np.cumsum(rows_per_key) - rows_per_key
+    rank_in_key = np.arange(len(grid_keys)) - np.searchsorted(grid_keys, grid_keys, side='left')
+    positions = key_starts[grid_keys] + rank_in_key
+    row_keys = np.repeat(np.arange(grid_size), rows_per_key)
+    row_pages = np.repeat(np.arange(len(page_ids)), months_per_page)[row_keys]
     
-    # Forward fill the missing values
-    df_filled = df_filled.groupby('page_id').apply(lambda group: group.ffill().bfill())
+    # Forward fill: every row takes the latest revision at or before it within the article
+    source_rows = np.zeros(len(row_keys), dtype=np.int64)
+    source_rows[positions] = positions
+    source_rows = np.maximum.accumulate(source_rows)
+    
+    # Back fill: months before an article's first revision take that first revision
+    first_positions = positions[first_revisions]
+    before_first = source_rows < first_positions[row_pages]
+    source_rows[before_first] = first_positions[row_pages[before_first]]
+    
+    # Map grid positions back to revisions and gather every column in one pass
+    revision_at = np.empty(len(row_keys), dtype=np.int64)
+    revision_at[positions] = np.arange(len(positions))
+    values = df.drop(columns=['page_id', 'month'], errors='ignore')
+    # Strings repeat across the months of an article, the grid holds codes for them
+    values = values.astype({column: 'category' for column in values.select_dtypes(include='object').columns})
+    df_filled = values.take(revision_at[source_rows]).reset_index(drop=True)
+    
+    # Columns with missing values are filled cell by cell, as a missing value must not
+    # hide the one carried over from an earlier revision
+    incomplete_columns = values.columns[values.isna().any()]
+    if len(incomplete_columns):
+        sparse = values[incomplete_columns].set_axis(positions).reindex(pd.RangeIndex(len(row_keys)))
+        sparse = sparse.groupby(row_pages, sort=False).ffill()
+        df_filled[incomplete_columns] = sparse.groupby(row_pages, sort=False).bfill()
+    
+    # Format the month labels once per distinct month; rows hold their month ordinal as a category code
+    month_range = np.arange(first_month, last_month + 1)
+    month_labels = [f"{ordinal // 12:04d}-{ordinal % 12 + 1:02d}" for ordinal in month_range]
+    df_filled.insert(0, 'page_id', page_ids.to_numpy()[row_pages])
+    row_months = page_first_months[row_pages] + (row_keys - page_offsets[row_pages])
+    df_filled.insert(1, 'month', pd.Categorical.from_codes(row_months - first_month, month_labels))
     
     # Drop any remaining NaN values that couldn't be filled
-    df_filled = df_filled.dropna()
+    if len(incomplete_columns):
+        df_filled = df_filled.dropna().reset_index(drop=True)
     
-    return df_filled
+    # Counts that had missing values are whole numbers again
+    return compact(df_filled)
 
-# Main function to execute the script
-def main(selected_wikiproject):
+# Integer month ordinal of a 'YYYY-MM' label
+def month_ordinal(label):
+    return int(label[:4]) * 12 + int(label[5:7]) - 1
+
+# Function to update a monthly grid with the revisions added since it was computed.
+#
+# Articles with new revisions are recomputed from their full history; all other
+# articles keep their rows and are only extended, carrying their last month
+# forward, when the new revisions reach past the grid's last month. Returns None
+# when the grid cannot be updated in place (new revisions before its first month
+# in global_month_range mode).
+def update_monthly_grid(previous_grid, df, new_mask, global_month_range=False):
+    new_timestamps = pd.to_datetime(df.loc[new_mask, 'revision_timestamp'])
+    if not len(new_timestamps):
+        return previous_grid
+    months = previous_grid['month'].astype(str)
+    first_month, last_month = months.min(), months.max()
+    new_first_month = new_timestamps.min().strftime('%Y-%m')
+    if global_month_range and new_first_month < first_month:
+        return None
+    end_month = max(last_month, new_timestamps.max().strftime('%Y-%m'))
+    
+    # Recompute the articles that have new revisions
+    touched = df.loc[new_mask, 'page_id'].unique()
+    recomputed = fill_missing_months(df[df['page_id'].isin(touched)].copy(), global_month_range=global_month_range,
+                                     start_month=first_month if global_month_range else None,
+                                     end_month=end_month)
+    # Stored the way write_dataset stores them
+    recomputed['revision_timestamp'] = recomputed['revision_timestamp'].astype(str)
+    
+    # Carry the other articles' last month forward into the new months
+    unchanged = previous_grid[~previous_grid['page_id'].isin(touched)]
+    new_months = month_ordinal(end_month) - month_ordinal(last_month)
+    parts = [unchanged, recomputed]
+    if new_months:
+        # An empty month carries the article's latest revision only, as fill_missing_months does;
+        # the stored timestamps are strings of one format, which sort chronologically
+        last_rows = unchanged[months[unchanged.index] == last_month]
+        latest_order = np.lexsort((last_rows['revision_timestamp'].astype(str).to_numpy(), last_rows['page_id'].to_numpy()))
+        last_rows = last_rows.iloc[latest_order].drop_duplicates('page_id', keep='last')
+        extension = last_rows.loc[last_rows.index.repeat(new_months)].reset_index(drop=True)
+        ordinals = month_ordinal(last_month) + np.tile(np.arange(1, new_months + 1), len(last_rows))
+        extension['month'] = [f"{ordinal // 12:04d}-{ordinal % 12 + 1:02d}" for ordinal in ordinals]
+        parts.append(extension)
+    
+    # Categorical columns of the stored grid are combined as plain values
+    parts = [part.astype({column: object for column in part.columns if isinstance(part[column].dtype, pd.CategoricalDtype)})
+             for part in parts]
+    updated = pd.concat(parts, ignore_index=True)
+    return compact(updated.sort_values(['page_id', 'month'], kind='stable', ignore_index=True))
+
+# Statistics materialized per month for every numeric feature
+AGGREGATE_STATS = ['mean', 'sum', 'count', 'min', 'max']
+
+# Function to aggregate the monthly grid over all articles in a single groupby pass.
+#
+# Produces one row per month with a '<column>_<stat>' column for every numeric column
+# of the grid and every statistic in AGGREGATE_STATS.
+def aggregate_months(df_filled):
+    numeric_columns = df_filled.select_dtypes(include='number').columns
+    # Integer sums are computed in int64 by pandas; float32 columns are widened so their
+    # sums and means keep full precision over many articles
+    widened = df_filled[numeric_columns].astype(
+        {column: np.float64 for column in numeric_columns if df_filled[column].dtype == np.float32})
+    aggregated = widened.groupby(df_filled['month'], sort=True, observed=True).agg(AGGREGATE_STATS)
+    aggregated.columns = [f"{column}_{stat}" for column, stat in aggregated.columns]
+    
+    # Group the columns by statistic: all means, then all sums, ...
+    ordered_columns = [f"{column}_{stat}" for stat in AGGREGATE_STATS for column in numeric_columns]
+    aggregated = aggregated[ordered_columns].reset_index()
+    aggregated['month'] = aggregated['month'].astype(str)
+    # 'YYYY-MM' labels sort chronologically, whatever order a categorical month had
+    return aggregated.sort_values('month', ignore_index=True)
+
+# Main function to execute the script.
+#
+# `progress`, if given, is called as progress(stage, **details) as the pipeline
+# advances. With `incremental`, a project processed before only has the revisions
+# added since its watermark merged into its existing grid, and is skipped when
+# the raw file has not changed. Returns the name of the written file, or None if
+# processing failed.
+def main(selected_wikiproject, global_month_range=False, progress=None, incremental=INCREMENTAL_INGEST):
     # Base URL for the revisions data
-    base_url = "https://analytics.wikimedia.org/published/datasets/outreachy-round-28/revisions/"
+    base_url = REVISIONS_BASE_URL
     
     # Use the provided Wikiproject name
     wikiproject_name = selected_wikiproject
@@ -72,19 +192,66 @@ def main(selected_wikiproject):
     # Construct the URL
     url = construct_url(base_url, wikiproject_name)
     
-    # Download the CSV file
+    # Fetch the CSV file through the shared download cache
     print("Downloading the data...")
-    df = download_csv(url)
-    
-    if df is None:
+    with span('monthly', 'download') as stage:
+        revisions_file_name = fetch_csv(url)
+        if revisions_file_name:
+            stage.bytes = os.path.getsize(revisions_file_name)
+    if not revisions_file_name:
         print("Failed to download or load the data.")
         return
     
-    # Preprocess the data to fill in missing months
+    # The raw cache names its files after their content, so an unchanged file keeps its name
+    source = os.path.basename(revisions_file_name)
+    previous_file_name = dataset_path(wikiproject_name, 'latest_monthly')
+    watermark = load_watermark(wikiproject_name, 'monthly') if incremental and previous_file_name else None
+    # A grid computed for the other month range cannot be updated in place
+    if watermark and watermark.get('global_month_range') != global_month_range:
+        watermark = None
+    if watermark and watermark['source'] == source and dataset_path(wikiproject_name, 'monthly_aggregated'):
+        print(f"No new revisions for {wikiproject_name}, keeping {previous_file_name}")
+        return previous_file_name
+    
+    # Read the CSV file from disk
+    try:
+        with span('monthly', 'read') as stage:
+            df = read_csv(revisions_file_name, timestamps=True)
+            stage.rows, stage.bytes = len(df), os.path.getsize(revisions_file_name)
+    except Exception as e:
+        print(f"Error reading the CSV file: {e}")
+        return
+    if progress:
+        progress('read', rows=len(df))
+    
+    # Preprocess the data to fill in missing months, only for the new revisions when possible
     print("Processing the data...")
-    df_processed = fill_missing_months(df)
+    with span('monthly', 'transform') as stage:
+        df_processed = None
+        new_mask = new_revisions(df, watermark)
+        if new_mask is not None:
+            print(f"Merging {int(new_mask.sum())} new revisions into {previous_file_name}")
+            df_processed = update_monthly_grid(read_dataset(previous_file_name), df, new_mask,
+                                               global_month_range=global_month_range)
+        if df_processed is None:
+            df_processed = fill_missing_months(df, global_month_range=global_month_range)
+        stage.rows = len(df_processed)
+    if progress:
+        progress('transform', rows=len(df_processed))
     
-    # Save the processed data to a CSV file
-    output_file_name = f"{wikiproject_name}_latest_monthly.csv"
-    df_processed.to_csv(output_file_name, index=False)
+    # Save the processed data
+    with span('monthly', 'write') as stage:
+        output_file_name = write_dataset(df_processed, wikiproject_name, 'latest_monthly')
+        stage.rows, stage.bytes = len(df_processed), os.path.getsize(output_file_name)
     print(f"Processed data saved to {output_file_name}")
+    
+    # Materialize the per-month aggregates served to the dashboard
+    with span('monthly', 'aggregate') as stage:
+        df_aggregated = aggregate_months(df_processed)
+        aggregated_file_name = write_dataset(df_aggregated, wikiproject_name, 'monthly_aggregated')
+        stage.rows = len(df_aggregated)
+    print(f"Monthly aggregates saved to {aggregated_file_name}")
+    save_watermark(wikiproject_name, 'monthly', df, source, global_month_range=global_month_range)
+    if progress:
+        progress('write', rows=len(df_processed))
+    return output_file_name
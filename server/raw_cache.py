@@ -0,0 +1,215 @@
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from downloader import download_file, CHUNK_SIZE
+
+# Location and limits of the raw download cache, overridable from the environment
+RAW_CACHE_DIR = os.getenv('RAW_CACHE_DIR', 'raw_cache')
+RAW_CACHE_MAX_BYTES = int(os.getenv('RAW_CACHE_MAX_BYTES', 20 * 1024 ** 3))
+RAW_CACHE_MAX_AGE = int(os.getenv('RAW_CACHE_MAX_AGE', 7 * 24 * 3600))
+# Entries validated less than this many seconds ago are served without asking upstream
+RAW_CACHE_FRESH_SECONDS = int(os.getenv('RAW_CACHE_FRESH_SECONDS', 60))
+
+
+# Local, content-addressed cache of the raw upstream CSV files.
+#
+# Files are stored once under objects/<sha256> and indexed by URL together with the
+# ETag and Last-Modified returned by upstream. A cached URL is revalidated with
+# If-None-Match / If-Modified-Since, so an unchanged file costs a single 304.
+# Entries unused for longer than max_age are dropped, and the least recently used
+# ones are evicted while the cache is larger than max_bytes.
+#
+# Several processes (gunicorn workers, batch ingests) may share the directory:
+# changes to the index and removals of stored files hold an exclusive lock on
+# index.lock, and a URL is downloaded by one process at a time.
+class RawCache:
+    def __init__(self, directory=RAW_CACHE_DIR, max_bytes=RAW_CACHE_MAX_BYTES,
+                 max_age=RAW_CACHE_MAX_AGE, fresh_seconds=RAW_CACHE_FRESH_SECONDS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.fresh_seconds = fresh_seconds
+        self._lock = threading.Lock()
+        self._url_locks = {}
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+
+    # Return the local path of the cached copy of url, downloading or revalidating it first
+    def fetch(self, url, progress=None):
+        with self._url_lock(url), self._file_lock(os.path.join('downloads', f"{_url_key(url)}.lock")):
+            now = time.time()
+            entry = self._load_index().get(url)
+            if entry and not os.path.exists(self._object_path(entry['digest'])):
+                entry = None
+
+            if entry and now - entry['validated_at'] < self.fresh_seconds:
+                self._update_entry(url, last_used=now)
+                with self._lock:
+                    self.hits += 1
+                return self._object_path(entry['digest'])
+
+            headers = {}
+            if entry and entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry and entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+            download_path = os.path.join(self.directory, 'downloads', _url_key(url))
+            response = download_file(url, download_path, headers=headers, progress=progress)
+            if response.status_code == 304 and entry:
+                self._update_entry(url, validated_at=now, last_used=now)
+                with self._lock:
+                    self.revalidations += 1
+                return self._object_path(entry['digest'])
+
+            digest, size = _file_digest(download_path)
+            object_path = self._object_path(digest)
+            # Stored and indexed under one lock, so no other process sees the file as an orphan
+            with self._index_lock():
+                if os.path.exists(object_path):
+                    os.remove(download_path)
+                else:
+                    os.replace(download_path, object_path)
+                self._write_entry(url, digest=digest, size=size,
+                                  etag=response.headers.get('ETag'),
+                                  last_modified=response.headers.get('Last-Modified'),
+                                  fetched_at=now, validated_at=now, last_used=now)
+            with self._lock:
+                self.misses += 1
+            self.evict(keep=url)
+            return object_path
+
+    # Drop entries older than max_age, then least recently used ones until under max_bytes
+    def evict(self, keep=None):
+        with self._index_lock():
+            index = self._load_index()
+            now = time.time()
+            for url in [url for url, entry in index.items() if url != keep and now - entry['last_used'] > self.max_age]:
+                del index[url]
+            total = sum(entry['size'] for entry in _unique_objects(index))
+            for url in sorted(index, key=lambda url: index[url]['last_used']):
+                if total <= self.max_bytes:
+                    break
+                if url == keep:
+                    continue
+                digest = index.pop(url)['digest']
+                if all(entry['digest'] != digest for entry in index.values()):
+                    total -= os.path.getsize(self._object_path(digest))
+            self._save_index(index)
+            self._remove_orphans(index)
+
+    def stats(self):
+        with self._lock:
+            index = self._load_index()
+            return {
+                'hits': self.hits,
+                'revalidations': self.revalidations,
+                'misses': self.misses,
+                'entries': len(index),
+                'bytes': sum(entry['size'] for entry in _unique_objects(index)),
+                'max_bytes': self.max_bytes,
+            }
+
+    def _update_entry(self, url, **fields):
+        with self._index_lock():
+            self._write_entry(url, **fields)
+
+    # Read-modify-write of one index entry; the caller holds the index lock
+    def _write_entry(self, url, **fields):
+        index = self._load_index()
+        previous = index.get(url, {})
+        index[url] = {**previous, **fields}
+        self._save_index(index)
+        if previous.get('digest') not in (None, index[url]['digest']):
+            self._remove_orphans(index)
+
+    # Exclusive access to the index and the stored files, across threads and processes
+    @contextmanager
+    def _index_lock(self):
+        with self._lock, self._file_lock('index.lock'):
+            yield
+
+    # Exclusive lock on a file of the cache directory, held by one process at a time.
+    # The cache's folders are created on first use, not when the cache is constructed.
+    @contextmanager
+    def _file_lock(self, name):
+        for folder in ('objects', 'downloads'):
+            os.makedirs(os.path.join(self.directory, folder), exist_ok=True)
+        with open(os.path.join(self.directory, name), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # Remove stored files that no entry points to any more
+    def _remove_orphans(self, index):
+        referenced = {entry['digest'] for entry in index.values()}
+        objects_dir = os.path.join(self.directory, 'objects')
+        if not os.path.isdir(objects_dir):
+            return
+        for digest in os.listdir(objects_dir):
+            if digest not in referenced:
+                os.remove(os.path.join(objects_dir, digest))
+
+    def _object_path(self, digest):
+        return os.path.join(self.directory, 'objects', digest)
+
+    def _index_path(self):
+        return os.path.join(self.directory, 'index.json')
+
+    def _load_index(self):
+        try:
+            with open(self._index_path()) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index):
+        temporary_path = f"{self._index_path()}.{os.getpid()}.tmp"
+        with open(temporary_path, 'w') as file:
+            json.dump(index, file)
+        os.replace(temporary_path, self._index_path())
+
+    def _url_lock(self, url):
+        with self._lock:
+            return self._url_locks.setdefault(url, threading.Lock())
+
+
+# Function to fetch a CSV file through the shared cache, reporting failures instead of raising
+def fetch_csv(url):
+    try:
+        path = raw_cache.fetch(url)
+        print(f"Fetched {url}")
+        return path
+    except Exception as e:
+        print(f"Error downloading the file from {url}: {e}")
+        return None
+
+
+def _url_key(url):
+    return hashlib.sha1(url.encode()).hexdigest()
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def _unique_objects(index):
+    return {entry['digest']: entry for entry in index.values()}.values()
+
+
+# Cache shared by the ingestion pipelines
+raw_cache = RawCache()
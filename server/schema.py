@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from downloader import CSV_CHUNK_ROWS, read_csv_chunks
+
+# Low-cardinality string columns, held as categoricals
+CATEGORY_COLUMNS = ['wiki_db', 'quality_class', 'importance_class', 'wikiproject', 'month']
+
+# Feature counts of a revision, held in the smallest integer type their values fit in
+COUNT_COLUMNS = ['page_length', 'num_refs', 'num_wikilinks', 'num_categories', 'num_media', 'num_headings']
+
+# Revision timestamps, parsed once when the raw revisions are read
+TIMESTAMP_COLUMNS = ['revision_timestamp']
+
+# Types the CSV parser can produce directly; columns missing from a file are ignored
+CSV_DTYPES = {column: 'category' for column in CATEGORY_COLUMNS}
+
+# Integers up to this magnitude are exact in float32
+_FLOAT32_EXACT = 2 ** 24
+
+
+# Function to read a CSV file with the compact types.
+#
+# `source` may be a local path or an http(s) URL. The file is parsed chunk by
+# chunk (see downloader.read_csv_chunks) and every chunk is converted before the
+# next one is read, so the parser's full-width columns (64-bit counts, raw
+# timestamp strings) are only ever held for one chunk of rows.
+#
+# With timestamps=True (for the raw revisions files) the revision timestamps are
+# parsed into UTC datetimes; files written by the pipelines keep them as the
+# formatted strings the API serves.
+def read_csv(source, timestamps=False, chunksize=CSV_CHUNK_ROWS, **read_csv_kwargs):
+    chunks = []
+    for chunk in read_csv_chunks(source, chunksize=chunksize, dtype=CSV_DTYPES, **read_csv_kwargs):
+        compact(chunk)
+        if timestamps:
+            for column in TIMESTAMP_COLUMNS:
+                if column in chunk.columns:
+                    chunk[column] = pd.to_datetime(chunk[column], utc=True, format='ISO8601')
+        chunks.append(chunk)
+    return compact(_concat_chunks(chunks))
+
+
+# Function to convert the columns of a DataFrame to the compact types, in place.
+#
+# Columns that already have them are left alone, so this is cheap on data that
+# was read or written through this module. Returns the DataFrame.
+def compact(df):
+    for column in df.columns:
+        series = df[column]
+        if column in CATEGORY_COLUMNS and series.dtype == object:
+            df[column] = series.astype('category')
+        elif column in COUNT_COLUMNS:
+            compacted = compact_counts(series)
+            if compacted is not series:
+                df[column] = compacted
+    return df
+
+
+# Function to store counts in the smallest signed integer type that holds them.
+#
+# Counts with missing values cannot be integers; they become float32 when all of
+# them are exact in it. Returns the series itself when it cannot be made smaller.
+def compact_counts(series):
+    if not pd.api.types.is_numeric_dtype(series.dtype) or series.dtype.itemsize <= 1:
+        return series
+    values = series.to_numpy()
+    missing = np.isnan(values) if values.dtype.kind == 'f' else None
+    if missing is not None and missing.any():
+        present = values[~missing]
+        if series.dtype == np.float64 and (not len(present) or np.abs(present).max() <= _FLOAT32_EXACT):
+            return series.astype(np.float32)
+        return series
+    if values.dtype.kind == 'f' and not np.array_equal(values, np.round(values)):
+        return series
+    compacted = pd.to_numeric(series, downcast='integer')
+    return compacted if compacted.dtype.itemsize < series.dtype.itemsize or compacted.dtype.kind != series.dtype.kind else series
+
+
+# Function to join the chunks of a file, keeping categorical columns categorical
+# (chunks each have the categories they contain; the result has all of them, sorted)
+def _concat_chunks(chunks):
+    if len(chunks) == 1:
+        return chunks[0]
+    df = pd.concat(chunks, ignore_index=True)
+    for column in chunks[0].columns:
+        if isinstance(chunks[0][column].dtype, pd.CategoricalDtype) and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = union_categoricals([chunk[column] for chunk in chunks], sort_categories=True)
+    return df
+
+
+# Function to describe the memory a DataFrame holds per column, in bytes
+def memory_usage(df):
+    usage = df.memory_usage(index=False, deep=True)
+    return {'total': int(usage.sum()), **{column: int(size) for column, size in usage.items()}}
@@ -0,0 +1,109 @@
+import gzip
+import json
+import os
+import zlib
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:
+    # Optional: without the brotli package responses are only gzip compressed
+    brotli = None
+
+# Response formats of the table endpoints, selected with ?format=
+RESPONSE_FORMATS = ('records', 'columns')
+
+# Responses smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+# Fast levels by default: table responses are large and compressing them can cost more than serializing
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 1))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 4))
+
+# Decimal places written for floats, the most pandas' serializer supports
+DOUBLE_PRECISION = 15
+
+
+# Function to serialize a dataframe to a JSON string without building a dict per row.
+#
+# 'records' is the list of row objects the endpoints have always returned. 'columns'
+# is {"columns": [...], "data": {column: [values]}}, which names every column once.
+# Both are written by pandas' C serializer; missing values become null.
+def dataframe_to_json(df, format='records'):
+    if format == 'records':
+        return df.to_json(orient='records', double_precision=DOUBLE_PRECISION, date_format='iso')
+    if format == 'columns':
+        columns = ', '.join(_json_string(column) for column in df.columns)
+        data = ', '.join(
+            f"{_json_string(column)}: {df[column].to_json(orient='values', double_precision=DOUBLE_PRECISION, date_format='iso')}"
+            for column in df.columns
+        )
+        return f'{{"columns": [{columns}], "data": {{{data}}}}}'
+    raise ValueError(f"format must be one of {', '.join(RESPONSE_FORMATS)}")
+
+
+# Function to read the response format requested with ?format=, defaulting to records
+def requested_format():
+    format = request.args.get('format', 'records')
+    if format not in RESPONSE_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(RESPONSE_FORMATS)}")
+    return format
+
+
+# Function to answer a request with a dataframe in the requested format
+def dataframe_response(df, format=None):
+    return Response(dataframe_to_json(df, format or requested_format()), mimetype='application/json')
+
+
+# Function to compress a response with the best encoding the client accepts.
+#
+# Registered as an after_request hook. Streamed responses, responses that are
+# already encoded and small bodies are passed through unchanged.
+def compress_response(response):
+    response.vary.add('Accept-Encoding')
+    if (response.direct_passthrough or response.is_streamed or response.status_code < 200
+            or response.status_code >= 300 or 'Content-Encoding' in response.headers):
+        return response
+    if response.content_length is not None and response.content_length < COMPRESS_MIN_BYTES:
+        return response
+
+    encodings = ['br', 'gzip'] if brotli is not None else ['gzip']
+    encoding = request.accept_encodings.best_match(encodings)
+    if encoding is None:
+        return response
+
+    body = response.get_data()
+    if encoding == 'br':
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+    else:
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+# Function to gzip a sequence of byte chunks as they are produced
+def gzip_stream(chunks, level=GZIP_LEVEL):
+    # wbits=31 writes the gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# Function to answer a request with a body generated chunk by chunk.
+#
+# The body is gzip-compressed while it is produced when the client accepts gzip,
+# as compress_response leaves streamed responses alone.
+def stream_response(chunks, mimetype, headers=None):
+    headers = dict(headers or {})
+    if request.accept_encodings.best_match(['gzip']) == 'gzip':
+        chunks = gzip_stream(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(chunks, mimetype=mimetype, headers=headers)
+
+
+def _json_string(value):
+    return json.dumps(str(value))
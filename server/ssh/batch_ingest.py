@@ -0,0 +1,299 @@
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+# Share the ingestion helpers of the Flask server
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from downloader import download_csv, REVISIONS_BASE_URL, ASSESSMENTS_BASE_URL
+from bulk_upsert import upsert, DEFAULT_CHUNK_SIZE, DEFAULT_STRATEGY, STRATEGIES
+from db_pool import get_pool
+from schema import read_csv
+from sshtunnelStoreData import construct_url, prepare_upsert, record_upsert
+
+# Progress of the batch, so an interrupted run continues with the projects it had not finished
+DEFAULT_CHECKPOINT_FILE = 'batch_ingest_checkpoint.json'
+
+# Directory the raw files are downloaded to while a project is transformed
+WORK_DIR = 'batch_ingest_work'
+
+# Seconds to wait before retrying a failed project, multiplied by the attempt number
+RETRY_BACKOFF_SECONDS = 5
+
+# Seconds the batch waits on a full write queue before checking that a writer is still running
+WRITER_CHECK_SECONDS = 10
+
+
+# Completed projects of a batch, saved to disk after every project
+class Checkpoint:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path) as file:
+                self._projects = json.load(file)
+        except (OSError, ValueError):
+            self._projects = {}
+
+    def done(self, project):
+        return self._projects.get(project, {}).get('state') == 'done'
+
+    def record(self, project, **details):
+        with self._lock:
+            self._projects[project] = {**details, 'recorded_at': time.time()}
+            temporary_path = f"{self.path}.tmp"
+            with open(temporary_path, 'w') as file:
+                json.dump(self._projects, file, indent=1)
+            os.replace(temporary_path, self.path)
+
+
+# Outcome and timings of every project of a batch
+class BatchReport:
+    def __init__(self, skipped):
+        self.started_at = time.time()
+        self.skipped = skipped
+        self.succeeded = {}
+        self.failed = {}
+        self._lock = threading.Lock()
+
+    def success(self, project, rows, timings, attempts):
+        with self._lock:
+            self.succeeded[project] = {'rows': rows, 'attempts': attempts, **timings}
+
+    def failure(self, project, stage, error, attempts):
+        with self._lock:
+            self.failed[project] = {'stage': stage, 'error': error, 'attempts': attempts}
+
+    def to_dict(self):
+        with self._lock:
+            elapsed = time.time() - self.started_at
+            rows = sum(result['rows'] for result in self.succeeded.values())
+            stage_seconds = {
+                stage: round(sum(result.get(stage, 0) for result in self.succeeded.values()), 2)
+                for stage in ('download', 'transform', 'write')
+            }
+            return {
+                'elapsed_seconds': round(elapsed, 2),
+                'projects_succeeded': len(self.succeeded),
+                'projects_failed': len(self.failed),
+                'projects_skipped': len(self.skipped),
+                'rows_written': rows,
+                'rows_per_second': round(rows / elapsed, 1) if elapsed else 0,
+                'projects_per_minute': round(len(self.succeeded) * 60 / elapsed, 2) if elapsed else 0,
+                'stage_seconds': stage_seconds,
+                'succeeded': dict(self.succeeded),
+                'failed': dict(self.failed),
+                'skipped': list(self.skipped),
+            }
+
+
+# Function to download and transform one project; runs in a worker process.
+# Returns the project, its latest revisions, the rows to upsert, the watermark to
+# store once they are written and the seconds spent on every stage.
+def prepare_project(project, work_dir=WORK_DIR):
+    os.makedirs(work_dir, exist_ok=True)
+    revisions_file_name = os.path.join(work_dir, f"{project}_revisions.csv")
+    assessments_file_name = os.path.join(work_dir, f"{project}_assessments.csv")
+    try:
+        start = time.perf_counter()
+        if not download_csv(construct_url(REVISIONS_BASE_URL, project), revisions_file_name):
+            raise RuntimeError(f"Failed to download the revisions of {project}")
+        if not download_csv(construct_url(ASSESSMENTS_BASE_URL, project), assessments_file_name):
+            raise RuntimeError(f"Failed to download the assessments of {project}")
+        downloaded = time.perf_counter()
+
+        df_revisions = read_csv(revisions_file_name, timestamps=True)
+        df_pages = read_csv(assessments_file_name)
+        transformed_df, changed_df, watermark = prepare_upsert(df_revisions, df_pages, project)
+        transformed = time.perf_counter()
+        upsert_df = transformed_df if changed_df is None else changed_df
+        timings = {'download': downloaded - start, 'transform': transformed - downloaded}
+        return project, transformed_df, upsert_df, watermark, timings
+    finally:
+        for file_name in (revisions_file_name, assessments_file_name):
+            if os.path.exists(file_name):
+                os.remove(file_name)
+
+
+# Function to upsert prepared projects from the queue until it yields None.
+# A project that fails in an unexpected way is reported as failed and the writer
+# goes on with the next one, so the queue never stops being drained.
+def write_projects(pool, write_queue, checkpoint, report, retries, strategy, chunk_size):
+    while True:
+        item = write_queue.get()
+        if item is None:
+            return
+        try:
+            write_project(pool, item, checkpoint, report, retries, strategy, chunk_size)
+        except Exception as e:
+            project, attempts = item[0], item[5]
+            print(f"[{project}] write failed unexpectedly: {e}")
+            report.failure(project, 'write', str(e), attempts)
+
+
+# Function to upsert one prepared project, retrying failed writes
+def write_project(pool, item, checkpoint, report, retries, strategy, chunk_size):
+    project, transformed_df, upsert_df, watermark, timings, attempts = item
+    for attempt in range(1, retries + 2):
+        try:
+            start = time.perf_counter()
+            with pool.connection() as conn:
+                rows = upsert(conn, upsert_df, strategy=strategy, chunk_size=chunk_size)
+            record_upsert(project, transformed_df, watermark)
+            timings = {**timings, 'write': time.perf_counter() - start}
+            checkpoint.record(project, state='done', rows=rows)
+            report.success(project, rows, timings, attempts + attempt - 1)
+            print(f"[{project}] wrote {rows} rows in {timings['write']:.1f}s")
+            return
+        except Exception as e:
+            print(f"[{project}] write attempt {attempt} failed: {e}")
+            if attempt > retries:
+                report.failure(project, 'write', str(e), attempts + attempt - 1)
+                checkpoint.record(project, state='failed', stage='write', error=str(e))
+            else:
+                time.sleep(RETRY_BACKOFF_SECONDS * attempt)
+
+
+# Function to hand an item to the writers, raising if none of them is left to take it
+def queue_for_writers(write_queue, item, writer_threads):
+    while True:
+        try:
+            write_queue.put(item, timeout=WRITER_CHECK_SECONDS)
+            return
+        except queue.Full:
+            if not any(thread.is_alive() for thread in writer_threads):
+                raise RuntimeError("No database writer is running")
+
+
+# Function to ingest many projects: downloads and transforms run in a process pool,
+# and their results are upserted by a bounded number of database writer threads.
+#
+# At most workers + writers projects are being prepared or waiting for a writer at
+# any time: the next project is submitted only once a result has been queued, so
+# transformed data never piles up in memory faster than it is written. A failed
+# project is resubmitted after its backoff delay, without holding a worker meanwhile.
+def run_batch(projects, workers, writers, retries, checkpoint_path, strategy, chunk_size):
+    checkpoint = Checkpoint(checkpoint_path)
+    skipped = [project for project in projects if checkpoint.done(project)]
+    pending = [project for project in projects if not checkpoint.done(project)]
+    report = BatchReport(skipped)
+    print(f"Ingesting {len(pending)} projects ({len(skipped)} already done according to {checkpoint_path})")
+
+    # Built before any writer starts, so a misconfigured database fails the batch right away
+    pool = get_pool()
+
+    # Bounded, so the batch waits for the writers once they fall behind
+    write_queue = queue.Queue(maxsize=writers)
+    writer_threads = [
+        threading.Thread(target=write_projects,
+                         args=(pool, write_queue, checkpoint, report, retries, strategy, chunk_size))
+        for _ in range(writers)
+    ]
+    for thread in writer_threads:
+        thread.start()
+
+    in_flight = workers + writers
+    attempts = {project: 1 for project in pending}
+    pending.reverse()
+    # (time the retry may start, project) of the projects waiting to be retried
+    retrying = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        while futures or pending or retrying:
+            now = time.monotonic()
+            retrying.sort()
+            while len(futures) < in_flight and (pending or (retrying and retrying[0][0] <= now)):
+                project = retrying.pop(0)[1] if retrying and retrying[0][0] <= now else pending.pop()
+                futures[executor.submit(prepare_project, project)] = project
+
+            timeout = max(retrying[0][0] - now, 0) if retrying else None
+            if not futures:
+                time.sleep(timeout)
+                continue
+            done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                project = futures.pop(future)
+                try:
+                    _, transformed_df, upsert_df, watermark, timings = future.result()
+                except Exception as e:
+                    print(f"[{project}] attempt {attempts[project]} failed: {e}")
+                    if attempts[project] > retries:
+                        checkpoint.record(project, state='failed', stage='prepare', error=str(e))
+                        report.failure(project, 'prepare', str(e), attempts[project])
+                    else:
+                        retrying.append((time.monotonic() + RETRY_BACKOFF_SECONDS * attempts[project], project))
+                        attempts[project] += 1
+                    continue
+                print(f"[{project}] prepared {len(transformed_df)} articles, {len(upsert_df)} new or changed")
+                try:
+                    queue_for_writers(write_queue, (project, transformed_df, upsert_df, watermark, timings,
+                                                    attempts[project]), writer_threads)
+                except RuntimeError as e:
+                    report.failure(project, 'write', str(e), attempts[project])
+                    executor.shutdown(cancel_futures=True)
+                    raise
+
+    for _ in writer_threads:
+        queue_for_writers(write_queue, None, writer_threads)
+    for thread in writer_threads:
+        thread.join()
+    return report
+
+
+# Function to resolve the projects named on the command line, 'all' meaning every project in the catalog
+def resolve_projects(names):
+    if names == ['all']:
+        from catalog import wikiproject_catalog
+        return [project['name'] for project in wikiproject_catalog.projects()]
+    # Remove the ".csv" extension from the names if provided, keeping their order
+    return list(dict.fromkeys(name[:-4] if name.endswith('.csv') else name for name in names))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the latest revisions of many WikiProjects into MySQL")
+    parser.add_argument('projects', nargs='*', help="WikiProject names, or 'all' for every project upstream")
+    parser.add_argument('--projects-file', help="file with one WikiProject name per line")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="processes downloading and transforming")
+    parser.add_argument('--writers', type=int, default=2, help="threads writing to MySQL")
+    parser.add_argument('--retries', type=int, default=2, help="retries of a failed project")
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT_FILE, help="progress file of the batch")
+    parser.add_argument('--restart', action='store_true', help="ignore the checkpoint and ingest every project again")
+    parser.add_argument('--strategy', choices=STRATEGIES, default=DEFAULT_STRATEGY, help="MySQL upsert strategy")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="rows per executemany chunk")
+    parser.add_argument('--report', help="write the summary report as JSON to this file")
+    args = parser.parse_args()
+
+    names = list(args.projects)
+    if args.projects_file:
+        with open(args.projects_file) as file:
+            names += [line.strip() for line in file if line.strip()]
+    if not names:
+        parser.error("no projects given")
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    report = run_batch(resolve_projects(names), args.workers, args.writers, args.retries,
+                       args.checkpoint, args.strategy, args.chunk_size)
+    summary = report.to_dict()
+    get_pool().close()
+
+    print(f"Succeeded: {summary['projects_succeeded']}, failed: {summary['projects_failed']}, "
+          f"skipped: {summary['projects_skipped']} in {summary['elapsed_seconds']}s")
+    print(f"Rows written: {summary['rows_written']} ({summary['rows_per_second']} rows/s, "
+          f"{summary['projects_per_minute']} projects/min)")
+    print(f"Time per stage (summed over projects): {summary['stage_seconds']}")
+    for project, failure in summary['failed'].items():
+        print(f"  {project}: {failure['stage']} failed after {failure['attempts']} attempts: {failure['error']}")
+    if args.report:
+        with open(args.report, 'w') as file:
+            json.dump(summary, file, indent=1)
+        print(f"Saved the report to {args.report}")
+    sys.exit(1 if summary['projects_failed'] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import os
+import tempfile
+
+import pandas as pd
+
+# Table the latest revision of every article is upserted into
+TABLE = 'wikiprojects_data_latest_rev'
+
+# Columns written for every article, in insert order
+COLUMNS = [
+    'page_id',
+    'item_id',
+    'revision_id',
+    'revision_timestamp',
+    'page_length',
+    'num_refs',
+    'num_wikilinks',
+    'num_categories',
+    'num_media',
+    'num_headings',
+    'pred_qual',
+    'page_title',
+    'quality_class',
+    'importance_class',
+    'wikiproject',
+]
+
+# Columns overwritten when the article is already stored
+UPDATE_COLUMNS = [
+    'revision_id',
+    'revision_timestamp',
+    'page_length',
+    'num_refs',
+    'num_wikilinks',
+    'num_categories',
+    'num_media',
+    'num_headings',
+    'pred_qual',
+    'quality_class',
+    'importance_class',
+]
+
+# Strategies save_to_mysql can use, and the one it uses unless told otherwise
+STRATEGIES = ('executemany', 'load_data')
+DEFAULT_STRATEGY = os.getenv('MYSQL_BULK_STRATEGY', 'executemany')
+
+# Rows sent and committed together by the executemany strategy
+DEFAULT_CHUNK_SIZE = int(os.getenv('MYSQL_BULK_CHUNK_SIZE', 5000))
+
+# Integer columns of the table, written without a fractional part
+_INTEGER_COLUMNS = {'page_id', 'revision_id', 'page_length', 'num_refs', 'num_wikilinks',
+                    'num_categories', 'num_media', 'num_headings'}
+
+_UPDATE_CLAUSE = ',\n    '.join(f"{column} = VALUES({column})" for column in UPDATE_COLUMNS)
+
+
+# Function to build the upsert statement for one row of values per article
+def insert_query(table=TABLE):
+    return (
+        f"INSERT INTO {table} ({', '.join(COLUMNS)})\n"
+        f"VALUES ({', '.join(['%s'] * len(COLUMNS))})\n"
+        f"ON DUPLICATE KEY UPDATE\n    {_UPDATE_CLAUSE}"
+    )
+
+
+# Function to convert the rows of a dataframe to tuples of plain Python values.
+#
+# Converting whole columns at once avoids boxing every row into a Series as
+# iterrows does; missing values become None, which the driver sends as NULL.
+def row_values(df):
+    frame = df[COLUMNS].astype(object)
+    return list(map(tuple, frame.where(df[COLUMNS].notna(), None).to_numpy()))
+
+
+# Function to upsert a dataframe with multi-row INSERT statements.
+#
+# pymysql's executemany rewrites the statement into one INSERT carrying many rows,
+# so every chunk of chunk_size rows costs a single round trip. Every chunk is
+# committed on its own; a failure leaves the chunks before it stored. The
+# connection must not be in autocommit mode, or every statement commits by itself.
+# Returns the number of rows sent.
+def upsert_executemany(conn, df, chunk_size=DEFAULT_CHUNK_SIZE, table=TABLE):
+    query = insert_query(table)
+    values = row_values(df)
+    try:
+        with conn.cursor() as cursor:
+            for start in range(0, len(values), chunk_size):
+                cursor.executemany(query, values[start:start + chunk_size])
+                conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(values)
+
+
+# Function to upsert a dataframe through a staging table filled by LOAD DATA LOCAL INFILE.
+#
+# The rows are streamed to the server as one tab-separated file into a temporary
+# table, then merged into the target with a single INSERT ... SELECT ... ON
+# DUPLICATE KEY UPDATE and one commit. The connection must have been opened with
+# local_infile=True and without autocommit, and the server must allow local_infile.
+# Returns the number of rows loaded.
+def upsert_load_data(conn, df, table=TABLE):
+    staging_table = f"{table}_staging"
+    columns = ', '.join(COLUMNS)
+    with tempfile.NamedTemporaryFile('w', suffix='.tsv', delete=False, encoding='utf-8') as file:
+        file.write(_load_data_text(df))
+        path = file.name
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"CREATE TEMPORARY TABLE {staging_table} LIKE {table}")
+            try:
+                cursor.execute(
+                    f"LOAD DATA LOCAL INFILE %s INTO TABLE {staging_table} CHARACTER SET utf8mb4 "
+                    f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({columns})",
+                    (path,))
+                cursor.execute(
+                    f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging_table}\n"
+                    f"ON DUPLICATE KEY UPDATE\n    {_UPDATE_CLAUSE}")
+                conn.commit()
+            finally:
+                cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {staging_table}")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        os.remove(path)
+    return len(df)
+
+
+# Function to upsert a dataframe with the given strategy
+def upsert(conn, df, strategy=DEFAULT_STRATEGY, chunk_size=DEFAULT_CHUNK_SIZE, table=TABLE):
+    if strategy == 'executemany':
+        return upsert_executemany(conn, df, chunk_size, table)
+    if strategy == 'load_data':
+        return upsert_load_data(conn, df, table)
+    raise ValueError(f"strategy must be one of {', '.join(STRATEGIES)}")
+
+
+# Rows in the text format LOAD DATA reads by default: tab separated, with
+# backslash escapes and \N for NULL
+def _load_data_text(df):
+    fields = []
+    for column in COLUMNS:
+        values = df[column]
+        present = values.notna()
+        if column in _INTEGER_COLUMNS and pd.api.types.is_float_dtype(values):
+            # Counts that went through pandas as floats because of missing values
+            values = values.astype('Int64')
+        text = values.astype(str)
+        if not pd.api.types.is_numeric_dtype(values):
+            text = (text.str.replace('\\', '\\\\', regex=False)
+                        .str.replace('\t', '\\t', regex=False)
+                        .str.replace('\n', '\\n', regex=False)
+                        .str.replace('\r', '\\r', regex=False))
+        fields.append(text.where(present, '\\N'))
+    if not len(df):
+        return ''
+    return '\n'.join(fields[0].str.cat(fields[1:], sep='\t')) + '\n'
@@ -0,0 +1,260 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pymysql
+from dotenv import load_dotenv
+from sshtunnel import SSHTunnelForwarder
+
+# Load environment variables from .env file
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
+
+# Connections kept open to MySQL, and how long a free one is kept before it is closed
+MYSQL_POOL_SIZE = int(os.getenv('MYSQL_POOL_SIZE', 4))
+MYSQL_POOL_IDLE_TIMEOUT = int(os.getenv('MYSQL_POOL_IDLE_TIMEOUT', 300))
+# Free connections unused for longer than this are pinged before being handed out
+MYSQL_POOL_PING_AFTER = int(os.getenv('MYSQL_POOL_PING_AFTER', 30))
+# Seconds a caller waits for a free connection before giving up
+MYSQL_POOL_WAIT_TIMEOUT = int(os.getenv('MYSQL_POOL_WAIT_TIMEOUT', 60))
+
+# Interval of the SSH keepalive packets that keep the tunnel from being dropped while idle
+SSH_KEEPALIVE_SECONDS = 30
+
+
+# Long-lived SSH tunnel to the MySQL server.
+#
+# The tunnel is opened on first use and reopened whenever its transport has gone
+# down, so callers only ever ask for the local port to connect to.
+class TunnelManager:
+    def __init__(self, ssh_host, ssh_user, ssh_key_file, remote_host, remote_port):
+        self.ssh_host = ssh_host
+        self.ssh_user = ssh_user
+        self.ssh_key_file = ssh_key_file
+        self.remote_host = remote_host
+        self.remote_port = remote_port
+        self.restarts = 0
+        self._tunnel = None
+        self._lock = threading.Lock()
+
+    # Return the local (host, port) forwarded to MySQL, (re)opening the tunnel if needed
+    def address(self):
+        with self._lock:
+            if self._tunnel is None or not self._tunnel.is_active:
+                if self._tunnel is not None:
+                    print("SSH tunnel is down, reconnecting")
+                    self._stop()
+                    self.restarts += 1
+                self._tunnel = SSHTunnelForwarder(
+                    (self.ssh_host, 22),
+                    ssh_username=self.ssh_user,
+                    ssh_private_key=self.ssh_key_file,
+                    remote_bind_address=(self.remote_host, self.remote_port),
+                    set_keepalive=SSH_KEEPALIVE_SECONDS
+                )
+                self._tunnel.start()
+                print("SSH Tunnel established")
+            return '127.0.0.1', self._tunnel.local_bind_port
+
+    @property
+    def is_active(self):
+        return self._tunnel is not None and self._tunnel.is_active
+
+    def close(self):
+        with self._lock:
+            self._stop()
+
+    def _stop(self):
+        if self._tunnel is not None:
+            try:
+                self._tunnel.stop()
+            except Exception as e:
+                print(f"Error while stopping the SSH tunnel: {e}")
+            self._tunnel = None
+
+
+# Small pool of MySQL connections made through a TunnelManager.
+#
+# Connections are created on demand up to `size`. A free connection that has not
+# been used for ping_after seconds is pinged before it is handed out, and is
+# replaced (after reopening the tunnel if that went down) when the ping fails.
+# Free connections idle for longer than idle_timeout are closed, and once none are
+# left in use or free the tunnel is closed too; both reopen on the next request.
+#
+# Connections are not in autocommit mode. Every borrower that writes must call
+# conn.commit() before giving the connection back (the execute_query helpers and
+# the bulk upserts do): whatever is left uncommitted is rolled back on release.
+class ConnectionPool:
+    def __init__(self, tunnel, size=MYSQL_POOL_SIZE, idle_timeout=MYSQL_POOL_IDLE_TIMEOUT,
+                 ping_after=MYSQL_POOL_PING_AFTER, wait_timeout=MYSQL_POOL_WAIT_TIMEOUT, **connect_kwargs):
+        self.tunnel = tunnel
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.ping_after = ping_after
+        self.wait_timeout = wait_timeout
+        self.connect_kwargs = connect_kwargs
+        self._free = []
+        self._in_use = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._last_released = time.monotonic()
+        self.created = 0
+        self.waits = 0
+        self.reconnects = 0
+        threading.Thread(target=self._reap_idle, daemon=True).start()
+
+    # Context manager lending a connection for the duration of the block.
+    # Connections that raised a MySQL connection error are closed instead of reused.
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except (pymysql.OperationalError, pymysql.InterfaceError):
+            self.release(conn, discard=True)
+            raise
+        except Exception:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def acquire(self):
+        deadline = time.monotonic() + self.wait_timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                if self._free:
+                    conn, last_used = self._free.pop()
+                    self._in_use += 1
+                    break
+                if self._in_use < self.size:
+                    conn, last_used = None, None
+                    self._in_use += 1
+                    break
+                self.waits += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._condition.wait(remaining):
+                    raise TimeoutError(f"No MySQL connection became free within {self.wait_timeout} seconds")
+        try:
+            if conn is not None and time.monotonic() - last_used > self.ping_after and not self._alive(conn):
+                conn = None
+                with self._condition:
+                    self.reconnects += 1
+            if conn is None:
+                conn = self._connect()
+            return conn
+        except Exception:
+            with self._condition:
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, conn, discard=False):
+        if not discard:
+            try:
+                # Leave no transaction open for the next borrower
+                conn.rollback()
+            except pymysql.MySQLError:
+                discard = True
+        with self._condition:
+            self._in_use -= 1
+            self._last_released = time.monotonic()
+            keep = not discard and not self._closed
+            if keep:
+                self._free.append((conn, time.monotonic()))
+            self._condition.notify()
+        if not keep:
+            _close_quietly(conn)
+
+    def stats(self):
+        with self._condition:
+            return {
+                'size': self.size,
+                'in_use': self._in_use,
+                'free': len(self._free),
+                'created': self.created,
+                'waits': self.waits,
+                'reconnects': self.reconnects,
+                'tunnel_restarts': self.tunnel.restarts,
+                'tunnel_active': self.tunnel.is_active,
+            }
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            free, self._free = self._free, []
+            self._condition.notify_all()
+        for conn, _ in free:
+            _close_quietly(conn)
+        self.tunnel.close()
+        print("MySQL connections and SSH tunnel are closed.")
+
+    def _connect(self):
+        host, port = self.tunnel.address()
+        conn = pymysql.connect(host=host, port=port, **self.connect_kwargs)
+        with self._condition:
+            self.created += 1
+        return conn
+
+    def _alive(self, conn):
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except pymysql.MySQLError:
+            _close_quietly(conn)
+            return False
+
+    # Close connections left free for longer than idle_timeout, then the tunnel once nothing uses it
+    def _reap_idle(self):
+        while True:
+            time.sleep(max(self.idle_timeout / 2, 1))
+            with self._condition:
+                if self._closed:
+                    return
+                cutoff = time.monotonic() - self.idle_timeout
+                expired = [conn for conn, last_used in self._free if last_used < cutoff]
+                self._free = [(conn, last_used) for conn, last_used in self._free if last_used >= cutoff]
+                for conn in expired:
+                    _close_quietly(conn)
+                # Checked under the lock, as a borrower counts as in use before it connects
+                if not self._free and self._in_use == 0 and self._last_released < cutoff:
+                    self.tunnel.close()
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# Function to get the connection pool shared by the scripts, configured from the environment
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            tunnel = TunnelManager(
+                os.getenv('SSH_HOST'),
+                os.getenv('SSH_USER'),
+                os.getenv('SSH_KEY_FILE'),
+                os.getenv('MYSQL_HOST'),
+                int(os.getenv('MYSQL_PORT'))
+            )
+            _pool = ConnectionPool(
+                tunnel,
+                user=os.getenv('MYSQL_USER'),
+                password=os.getenv('MYSQL_PASSWORD'),
+                database=os.getenv('MYSQL_DATABASE'),
+                connect_timeout=30,
+                read_timeout=30,
+                autocommit=False,
+                # Any strategy may be chosen per call (e.g. batch_ingest --strategy load_data)
+                local_infile=True
+            )
+        return _pool
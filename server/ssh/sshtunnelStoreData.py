@@ -1,49 +1,19 @@
 import pandas as pd
-import requests
 import os
-from sshtunnel import SSHTunnelForwarder
+import sys
 import pymysql
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
-
-# Database configuration from environment variables
-SSH_HOST = os.getenv('SSH_HOST')
-SSH_USER = os.getenv('SSH_USER')
-SSH_KEY_FILE = os.getenv('SSH_KEY_FILE')
-MYSQL_HOST = os.getenv('MYSQL_HOST')
-MYSQL_PORT = int(os.getenv('MYSQL_PORT'))
-MYSQL_USER = os.getenv('MYSQL_USER')
-MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD')
-MYSQL_DATABASE = os.getenv('MYSQL_DATABASE')
-
-# Function to establish an SSH tunnel and connect to MySQL
-def connect_to_db_via_ssh():
-    try:
-        tunnel = SSHTunnelForwarder(
-            (SSH_HOST, 22),
-            ssh_username=SSH_USER,
-            ssh_private_key=SSH_KEY_FILE,
-            remote_bind_address=(MYSQL_HOST, MYSQL_PORT)
-        )
-        tunnel.start()
-        print("SSH Tunnel established")
-        conn = pymysql.connect(
-            host='127.0.0.1',
-            port=tunnel.local_bind_port,
-            user=MYSQL_USER,
-            password=MYSQL_PASSWORD,
-            database=MYSQL_DATABASE,
-            connect_timeout=30,
-            read_timeout=30,
-            autocommit=True  # Enable autocommit
-        )
-        print("Connection to MySQL successful!")
-        return conn, tunnel
-    except Exception as e:
-        print(f"Error while connecting to MySQL: {e}")
-        return None, None
+# Share the ingestion helpers of the Flask server
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from downloader import download_csv, REVISIONS_BASE_URL, ASSESSMENTS_BASE_URL
+from storage import dataset_path, read_dataset, write_dataset
+from watermarks import (INCREMENTAL_INGEST, changed_rows, latest_revision_inputs, load_watermark,
+                        new_revisions, revision_watermark, store_watermark)
+from bulk_upsert import upsert, DEFAULT_CHUNK_SIZE, DEFAULT_STRATEGY
+from db_pool import get_pool
+from latest_revisions import MYSQL_TIMESTAMP_FORMAT, latest_revisions
+from metrics import span
+from schema import read_csv
 
 # Function to execute SQL queries
 def execute_query(conn, query, params=None):
@@ -51,7 +21,9 @@ def execute_query(conn, query, params=None):
         with conn.cursor() as cursor:
             print("Executing query...")
             cursor.execute(query, params)
-            print("Query executed successfully")
+        # Pooled connections are not in autocommit mode; a failed query is rolled back on release
+        conn.commit()
+        print("Query executed successfully")
     except pymysql.MySQLError as e:
         print(f"MySQL error during query execution: {e}")
     except Exception as e:
@@ -62,88 +34,49 @@ def construct_url(base_url, wikiproject_name):
     file_name = f"{wikiproject_name}.csv"
     return f"{base_url}{file_name}"
 
-# Function to download the CSV file
-def download_csv(url, local_file_name):
-    try:
-        # Disable SSL verification
-        response = requests.get(url, verify=False)
-        response.raise_for_status()  # Raise an error for bad status
-        with open(local_file_name, 'wb') as file:
-            file.write(response.content)
-        print(f"Downloaded {local_file_name}")
-    except Exception as e:
-        print(f"Error downloading the file from {url}: {e}")
-        return False
-    return True
-
 def transform_data(df_revisions, df_pages, wikiproject_name):
-    # Convert the timestamp format to 'YYYY-MM-DD HH:MM:SS'
-    df_revisions['revision_timestamp'] = pd.to_datetime(df_revisions['revision_timestamp']).dt.strftime('%Y-%m-%d %H:%M:%S')
-    
-    df_merged = df_revisions.merge(df_pages, on='page_id')
-    sorted_df = df_merged.sort_values(by=['page_title', 'revision_timestamp'], ascending=[True, False])
-    latest_revisions_df = sorted_df.groupby('page_title').first().reset_index()
+    # Get the latest revisions with their assessments, timestamps formatted as 'YYYY-MM-DD HH:MM:SS'
+    latest_revisions_df = latest_revisions(df_revisions, df_pages, MYSQL_TIMESTAMP_FORMAT)
     latest_revisions_df['wikiproject'] = wikiproject_name
     return latest_revisions_df
 
-# Function to insert the transformed data into the MySQL database
-def save_to_mysql(df, conn):
-    try:
-        with conn.cursor() as cursor:
-            # Insert data into the wikiprojects_data_latest_rev table
-            insert_query = """
-            INSERT INTO wikiprojects_data_latest_rev (
-                page_id,
-                item_id,
-                revision_id,
-                revision_timestamp,
-                page_length,
-                num_refs,
-                num_wikilinks,
-                num_categories,
-                num_media,
-                num_headings,
-                pred_qual,
-                page_title,
-                quality_class,
-                importance_class,
-                wikiproject
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-                revision_id = VALUES(revision_id),
-                revision_timestamp = VALUES(revision_timestamp),
-                page_length = VALUES(page_length),
-                num_refs = VALUES(num_refs),
-                num_wikilinks = VALUES(num_wikilinks),
-                num_categories = VALUES(num_categories),
-                num_media = VALUES(num_media),
-                num_headings = VALUES(num_headings),
-                pred_qual = VALUES(pred_qual),
-                quality_class = VALUES(quality_class),
-                importance_class = VALUES(importance_class)
-            """
-            for _, row in df.iterrows():
-                cursor.execute(insert_query, (
-                    row['page_id'],
-                    row['item_id'],
-                    row['revision_id'],
-                    row['revision_timestamp'],
-                    row['page_length'],
-                    row['num_refs'],
-                    row['num_wikilinks'],
-                    row['num_categories'],
-                    row['num_media'],
-                    row['num_headings'],
-                    row['pred_qual'],
-                    row['page_title'],
-                    row['quality_class'],
-                    row['importance_class'],
-                    row['wikiproject']
-                ))
+# Function to compute the latest revisions of a project and the rows MySQL lacks.
+#
+# Once a project has been loaded, only the revisions added since its 'mysql'
+# watermark are merged into the table stored at the last successful load, and
+# only the articles whose row changed are upserted. Returns the latest revisions,
+# the rows to upsert and the watermark to store once they are written.
+def prepare_upsert(df_revisions, df_pages, wikiproject_name, incremental=INCREMENTAL_INGEST):
+    snapshot_file_name = dataset_path(wikiproject_name, 'mysql_latest') if incremental else None
+    watermark = load_watermark(wikiproject_name, 'mysql') if snapshot_file_name else None
+    new_mask = new_revisions(df_revisions, watermark)
+    watermark = revision_watermark(df_revisions)
+    if new_mask is None:
+        return transform_data(df_revisions, df_pages, wikiproject_name), None, watermark
+    
+    previous_df = read_dataset(snapshot_file_name)
+    print(f"Merging {int(new_mask.sum())} new revisions into {snapshot_file_name}")
+    df_input = latest_revision_inputs(df_revisions, df_pages, previous_df, new_mask)
+    transformed_df = transform_data(df_input, df_pages, wikiproject_name)
+    return transformed_df, changed_rows(transformed_df, previous_df), watermark
 
-            conn.commit()
-            print("Data inserted into MySQL successfully.")
+# Function to record a successful load, so the next one only sends what changed since
+def record_upsert(wikiproject_name, transformed_df, watermark):
+    write_dataset(transformed_df, wikiproject_name, 'mysql_latest')
+    store_watermark(wikiproject_name, 'mysql', watermark)
+
+# Function to insert the transformed data into the MySQL database.
+#
+# 'executemany' sends chunk_size rows per statement and commits every chunk;
+# 'load_data' loads all rows into a staging table with LOAD DATA LOCAL INFILE
+# and merges them with a single statement. Returns the number of rows written,
+# or None if the insertion failed.
+def save_to_mysql(df, conn, strategy=DEFAULT_STRATEGY, chunk_size=DEFAULT_CHUNK_SIZE):
+    try:
+        # Upsert the data into the wikiprojects_data_latest_rev table
+        rows = upsert(conn, df, strategy=strategy, chunk_size=chunk_size)
+        print(f"Data inserted into MySQL successfully ({rows} rows, {strategy}).")
+        return rows
     except pymysql.MySQLError as e:
         print(f"MySQL error during data insertion: {e}")
     except Exception as e:
@@ -152,68 +85,82 @@ def save_to_mysql(df, conn):
 # Main function to execute the script
 def main():
     # Base URLs
-    revisions_base_url = "https://analytics.wikimedia.org/published/datasets/outreachy-round-28/revisions/"
-    assessments_base_url = "https://analytics.wikimedia.org/published/datasets/outreachy-round-28/assessments/"
+    revisions_base_url = REVISIONS_BASE_URL
+    assessments_base_url = ASSESSMENTS_BASE_URL
     
-    conn, tunnel = connect_to_db_via_ssh()
+    # Connections through the SSH tunnel are opened on first use and reused for every project
+    pool = get_pool()
     
-    if conn and tunnel:
-        while True:
-            # Prompt the user for the Wikiproject name
-            wikiproject_name = input("Enter the Wikiproject name (or type 'exit' to finish): ")
-            
-            if wikiproject_name.lower() == 'exit':
-                break
-            
-            # Remove the ".csv" extension from the input if provided
-            if wikiproject_name.endswith(".csv"):
-                wikiproject_name = wikiproject_name[:-4]
-            
-            # Construct the URLs and local file names
-            revisions_url = construct_url(revisions_base_url, wikiproject_name)
-            assessments_url = construct_url(assessments_base_url, wikiproject_name)
-            revisions_file_name = f"{wikiproject_name}_revisions.csv"
-            assessments_file_name = f"{wikiproject_name}_assessments.csv"
-            
-            # Download the CSV files
-            if not download_csv(revisions_url, revisions_file_name):
-                continue
-            if not download_csv(assessments_url, assessments_file_name):
-                continue
-            
-            # Read the CSV files
-            try:
-                df_revisions = pd.read_csv(revisions_file_name)
-                df_pages = pd.read_csv(assessments_file_name)
-            except Exception as e:
-                print(f"Error reading the CSV files: {e}")
-                continue
-            
-            # Perform the data transformations
-            transformed_df = transform_data(df_revisions, df_pages, wikiproject_name)
-            
-            # Save the transformed data to a CSV file
+    while True:
+        # Prompt the user for the Wikiproject name
+        wikiproject_name = input("Enter the Wikiproject name (or type 'exit' to finish): ")
+        
+        if wikiproject_name.lower() == 'exit':
+            break
+        
+        # Remove the ".csv" extension from the input if provided
+        if wikiproject_name.endswith(".csv"):
+            wikiproject_name = wikiproject_name[:-4]
+        
+        # Construct the URLs and local file names
+        revisions_url = construct_url(revisions_base_url, wikiproject_name)
+        assessments_url = construct_url(assessments_base_url, wikiproject_name)
+        revisions_file_name = f"{wikiproject_name}_revisions.csv"
+        assessments_file_name = f"{wikiproject_name}_assessments.csv"
+        
+        # Download the CSV files
+        with span('mysql', 'download') as stage:
+            downloaded = download_csv(revisions_url, revisions_file_name) and download_csv(assessments_url, assessments_file_name)
+            if downloaded:
+                stage.bytes = os.path.getsize(revisions_file_name) + os.path.getsize(assessments_file_name)
+        if not downloaded:
+            continue
+        
+        # Read the CSV files
+        try:
+            with span('mysql', 'read') as stage:
+                df_revisions = read_csv(revisions_file_name, timestamps=True)
+                df_pages = read_csv(assessments_file_name)
+                stage.rows = len(df_revisions) + len(df_pages)
+        except Exception as e:
+            print(f"Error reading the CSV files: {e}")
+            continue
+        
+        # Perform the data transformations, only on the new revisions when possible
+        with span('mysql', 'transform') as stage:
+            transformed_df, changed_df, watermark = prepare_upsert(df_revisions, df_pages, wikiproject_name)
+            stage.rows = len(transformed_df)
+        
+        # Save the transformed data to a CSV file
+        with span('mysql', 'write_csv') as stage:
             merged_file_name = f"{wikiproject_name}_merged.csv"
             transformed_df.to_csv(merged_file_name, index=False)
-            print(f"Saved merged data to {merged_file_name}")
+            stage.rows, stage.bytes = len(transformed_df), os.path.getsize(merged_file_name)
+        print(f"Saved merged data to {merged_file_name}")
 
-            # Save the transformed data to the MySQL database
-            print("Inserting data into MySQL...")
-            save_to_mysql(transformed_df, conn)
-            
-            # Delete the downloaded and merged CSV files
-            try:
-                os.remove(revisions_file_name)
-                os.remove(assessments_file_name)
-                os.remove(merged_file_name)
-                print(f"Deleted {revisions_file_name}, {assessments_file_name}, and {merged_file_name}")
-            except Exception as e:
-                print(f"Error deleting the files: {e}")
+        # Save the new and changed rows to the MySQL database
+        upsert_df = transformed_df if changed_df is None else changed_df
+        print(f"Inserting {len(upsert_df)} of {len(transformed_df)} rows into MySQL...")
+        try:
+            with span('mysql', 'upsert') as stage, pool.connection() as conn:
+                stage.rows = save_to_mysql(upsert_df, conn)
+                if stage.rows is not None:
+                    record_upsert(wikiproject_name, transformed_df, watermark)
+        except Exception as e:
+            print(f"Error while connecting to MySQL: {e}")
         
-        # Close the MySQL connection and stop the SSH tunnel
-        conn.close()
-        tunnel.stop()
-        print("MySQL connection and SSH tunnel are closed.")
+        # Delete the downloaded and merged CSV files
+        try:
+            os.remove(revisions_file_name)
+            os.remove(assessments_file_name)
+            os.remove(merged_file_name)
+            print(f"Deleted {revisions_file_name}, {assessments_file_name}, and {merged_file_name}")
+        except Exception as e:
+            print(f"Error deleting the files: {e}")
+    
+    # Close the MySQL connections and stop the SSH tunnel
+    print(f"Connection pool: {pool.stats()}")
+    pool.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,136 @@
+import os
+
+import pandas as pd
+import pyarrow as pa
+
+from schema import CSV_DTYPES, compact, read_csv
+
+# Also write a CSV copy next to every artifact, for consumers that still expect CSV files
+EXPORT_CSV = os.getenv('EXPORT_CSV', '0') == '1'
+
+# Low-cardinality string columns, and strings repeated across the months of an article,
+# are dictionary encoded (and load as categoricals)
+_DICTIONARY_STRING = pa.dictionary(pa.int32(), pa.string())
+
+# Explicit column types of the derived artifacts. Columns not listed here keep the
+# type Arrow infers for them, which for the feature counts is the compact integer
+# type schema.compact gave them.
+SCHEMAS = {
+    # One row per article, written by process_wikiproject_latest
+    'merged': {
+        'index': pa.int64(),
+        'wiki_db': _DICTIONARY_STRING,
+        'page_id': pa.int64(),
+        'item_id': pa.string(),
+        'revision_id': pa.int64(),
+        'revision_timestamp': pa.string(),
+        'pred_qual': pa.float64(),
+        'page_title': pa.string(),
+        'quality_class': _DICTIONARY_STRING,
+        'importance_class': _DICTIONARY_STRING,
+    },
+    # One row per article and month, written by process_wikiproject_monthly
+    'latest_monthly': {
+        'page_id': pa.int64(),
+        'month': _DICTIONARY_STRING,
+        'wiki_db': _DICTIONARY_STRING,
+        'item_id': _DICTIONARY_STRING,
+        'revision_id': pa.int64(),
+        'revision_timestamp': _DICTIONARY_STRING,
+        'pred_qual': pa.float64(),
+    },
+}
+
+
+# File names of a project's artifact in the columnar and CSV formats
+def artifact_path(project, kind):
+    return f"{project}_{kind}.arrow"
+
+
+def csv_path(project, kind):
+    return f"{project}_{kind}.csv"
+
+
+# Path to read a project's artifact from: the columnar file, or a CSV written by an older ingest
+def dataset_path(project, kind):
+    for path in (artifact_path(project, kind), csv_path(project, kind)):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+# Function to write a derived artifact as an uncompressed Arrow IPC file.
+#
+# The file is written under a temporary name and renamed into place, so readers never
+# see a partially written artifact. Returns the path of the written file.
+def write_dataset(df, project, kind, export_csv=EXPORT_CSV):
+    # Converted columns replace those of a shallow copy, the caller's frame is left as it is
+    df = compact(df.copy(deep=False))
+    schema = _schema_for(df, SCHEMAS.get(kind, {}))
+    # Timestamps declared as strings are stored the way they appear in the CSV export
+    converted = {
+        field.name: df[field.name].astype(str)
+        for field in schema
+        if field.type in (pa.string(), _DICTIONARY_STRING) and pd.api.types.is_datetime64_any_dtype(df[field.name])
+    }
+    table = pa.Table.from_pandas(df.assign(**converted), schema=schema, preserve_index=False)
+    path = artifact_path(project, kind)
+    temporary_path = f"{path}.tmp"
+    with pa.OSFile(temporary_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(temporary_path, path)
+    if export_csv:
+        df.to_csv(csv_path(project, kind), index=False)
+    return path
+
+
+# Function to read a dataset with the compact column types, optionally restricted to some columns.
+#
+# Arrow files are memory-mapped, so only the requested columns are paged in and
+# processes reading the same artifact share the operating system's page cache.
+# Artifacts written before the compact types are converted as they are read.
+def read_dataset(path, columns=None):
+    if not path.endswith('.arrow'):
+        return read_csv(path, usecols=columns)
+    # The mapping stays open for as long as the returned columns reference it
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    if columns is not None:
+        table = table.select(columns)
+    return compact(table.to_pandas(split_blocks=True))
+
+
+# Function to read a dataset as a sequence of DataFrames of at most chunk_rows rows each,
+# for computations that make one pass over the data without holding all of it
+def read_dataset_chunks(path, columns=None, chunk_rows=100000):
+    if not path.endswith('.arrow'):
+        for chunk in pd.read_csv(path, usecols=columns, chunksize=chunk_rows, dtype=CSV_DTYPES):
+            yield compact(chunk)
+        return
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    if columns is not None:
+        table = table.select(columns)
+    for batch in table.to_batches(max_chunksize=chunk_rows):
+        yield compact(batch.to_pandas())
+
+
+# Function to convert a project's artifact to CSV for compatibility
+def export_csv(project, kind):
+    read_dataset(artifact_path(project, kind)).to_csv(csv_path(project, kind), index=False)
+    return csv_path(project, kind)
+
+
+def _schema_for(df, known_types):
+    inferred = pa.Schema.from_pandas(df, preserve_index=False)
+    return pa.schema([
+        pa.field(field.name, known_types.get(field.name, field.type))
+        for field in inferred
+    ])
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 3:
+        print("Usage: python storage.py <wikiproject> <merged|latest_monthly>")
+        sys.exit(1)
+    print(f"Exported {export_csv(sys.argv[1], sys.argv[2])}")
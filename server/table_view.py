@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+# Page size used when a request pages through a table without giving a limit
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 10000
+
+
+# Paging, sorting and column projection requested for a table endpoint.
+#
+# Built from query arguments or a JSON body: `limit`, `offset`, `sort_by`, `order`
+# ('asc' or 'desc') and `columns` (a list or a comma-separated string). Requests
+# without any of them get the full, unpaged table as before.
+class PageRequest:
+    PARAMETERS = ('limit', 'offset', 'sort_by', 'order', 'columns')
+
+    def __init__(self, params):
+        self.paginated = any(params.get(name) is not None for name in self.PARAMETERS)
+        # A limit of 0 (e.g. from a JSON body) is rejected below, not replaced by the default
+        self.limit = int(DEFAULT_PAGE_SIZE if params.get('limit') in (None, '') else params.get('limit'))
+        self.offset = int(params.get('offset') or 0)
+        self.sort_by = params.get('sort_by')
+        self.order = params.get('order') or 'asc'
+        columns = params.get('columns')
+        if isinstance(columns, str):
+            columns = [column for column in columns.split(',') if column]
+        self.columns = columns or None
+
+        if not 0 < self.limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        if self.offset < 0:
+            raise ValueError("offset must not be negative")
+        if self.order not in ('asc', 'desc'):
+            raise ValueError("order must be 'asc' or 'desc'")
+
+    def validate(self, df):
+        requested = list(self.columns or [])
+        if self.sort_by:
+            requested.append(self.sort_by)
+        unknown = [column for column in requested if column not in df.columns]
+        if unknown:
+            raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+
+
+# Row orderings of one column, computed once per dataset load.
+# Missing values come last in both directions.
+class SortOrder:
+    def __init__(self, series):
+        series = series.reset_index(drop=True)
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Sort by the class labels, not by the order the categories were encoded in
+            series = series.astype(object)
+        self.ascending = series.sort_values(kind='stable', na_position='last').index.to_numpy()
+        present = int(series.notna().sum())
+        self.descending = np.concatenate([self.ascending[:present][::-1], self.ascending[present:]])
+        self.nbytes = self.ascending.nbytes + self.descending.nbytes
+
+
+# Function to cut one page out of the selected rows of a table.
+#
+# `rows` are the ascending positions of the rows to page through and `sort_order`
+# the precomputed SortOrder of the sort column (None when not sorting). Sorting
+# walks the precomputed ordering and keeps the selected rows, so no page needs a
+# sort of its own. Returns the total number of selected rows and the page.
+def select_page(df, rows, page_request, sort_order=None):
+    if sort_order is not None:
+        ordering = sort_order.ascending if page_request.order == 'asc' else sort_order.descending
+        if len(rows) != len(df):
+            selected = np.zeros(len(df), dtype=bool)
+            selected[rows] = True
+            ordering = ordering[selected[ordering]]
+        rows = ordering
+    page_rows = rows[page_request.offset:page_request.offset + page_request.limit]
+    page = df.iloc[page_rows]
+    if page_request.columns:
+        page = page[page_request.columns]
+    return len(rows), page
@@ -0,0 +1,105 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from article_index import ArticleIndex
+from process_wikiproject_monthly import fill_missing_months
+from schema import read_csv
+from serialization import dataframe_to_json
+from storage import read_dataset, write_dataset
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'df_revisions_pred_manual_Carribean.csv')
+
+PROJECT = 'ArticleIndexTest'
+UNKNOWN_IDS = [0, -1, 10 ** 12]
+# One article in four keeps the monthly grid small
+SAMPLE_EVERY = 4
+
+
+@pytest.fixture(scope='module')
+def monthly_path(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('article_index')
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        df = read_csv(SAMPLE_FILE, timestamps=True)
+        df = df[df['page_id'].isin(df['page_id'].drop_duplicates().iloc[::SAMPLE_EVERY])]
+        write_dataset(fill_missing_months(df), PROJECT, 'latest_monthly')
+    finally:
+        os.chdir(cwd)
+    return directory
+
+
+@pytest.fixture(scope='module')
+def monthly(monthly_path):
+    return read_dataset(str(monthly_path / f"{PROJECT}_latest_monthly.arrow"))
+
+
+@pytest.fixture
+def client(monthly_path, monkeypatch):
+    monkeypatch.chdir(monthly_path)
+    import app
+    return app.app.test_client()
+
+
+# Page ids spread over the dataset: the first, the last and some in between
+def sample_ids(df):
+    page_ids = df['page_id'].drop_duplicates().sort_values()
+    return page_ids.iloc[[0, 1, len(page_ids) // 3, len(page_ids) // 2, -2, -1]].tolist()
+
+
+def test_lookup_matches_boolean_mask(monthly):
+    article_index = ArticleIndex(monthly)
+    # Rows written by the monthly pipeline are already sorted and used as they are
+    assert article_index.frame is monthly
+    for page_id in sample_ids(monthly):
+        assert_frame_equal(article_index.lookup(page_id), monthly[monthly.page_id == page_id])
+    for page_id in UNKNOWN_IDS:
+        assert article_index.lookup(page_id) is None
+        assert monthly[monthly.page_id == page_id].empty
+
+
+def test_lookup_of_unsorted_rows(monthly):
+    shuffled = monthly.sample(frac=1, random_state=0)
+    article_index = ArticleIndex(shuffled)
+    assert article_index.nbytes > 0
+    for page_id in sample_ids(monthly):
+        expected = shuffled[shuffled.page_id == page_id].sort_values('month').reset_index(drop=True)
+        assert_frame_equal(article_index.lookup(page_id).reset_index(drop=True), expected)
+
+
+def test_lookup_many(monthly):
+    article_index = ArticleIndex(monthly)
+    page_ids = sample_ids(monthly)
+    requested = [page_ids[2], UNKNOWN_IDS[0], page_ids[0], UNKNOWN_IDS[2]]
+    found, missing = article_index.lookup_many(requested)
+    assert list(found) == [page_ids[2], page_ids[0]]
+    assert missing == [UNKNOWN_IDS[0], UNKNOWN_IDS[2]]
+    for page_id, rows in found.items():
+        assert_frame_equal(rows, monthly[monthly.page_id == page_id])
+
+
+def test_get_article_data(client, monthly):
+    for page_id in sample_ids(monthly):
+        response = client.get(f'/get_article_data?project={PROJECT}&page_id={page_id}')
+        assert response.status_code == 200
+        assert response.get_json() == json.loads(dataframe_to_json(monthly[monthly.page_id == page_id]))
+    for page_id in UNKNOWN_IDS:
+        response = client.get(f'/get_article_data?project={PROJECT}&page_id={page_id}')
+        assert response.status_code == 404
+
+
+def test_get_articles_data(client, monthly):
+    page_ids = sample_ids(monthly)
+    requested = page_ids[:3] + UNKNOWN_IDS + page_ids[:1]
+    response = client.post(f'/get_articles_data?project={PROJECT}', json={'page_ids': requested})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert list(body['articles']) == [str(page_id) for page_id in page_ids[:3]]
+    assert body['missing'] == UNKNOWN_IDS
+    for page_id in page_ids[:3]:
+        assert body['articles'][str(page_id)] == json.loads(dataframe_to_json(monthly[monthly.page_id == page_id]))
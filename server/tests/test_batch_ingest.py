@@ -0,0 +1,90 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+import pytest
+
+import batch_ingest
+from batch_ingest import BatchReport, Checkpoint, queue_for_writers, write_projects
+
+
+# Pool handing out placeholder connections; the upsert is replaced in the tests
+class FakePool:
+    @contextmanager
+    def connection(self):
+        yield object()
+
+
+def item(project):
+    df = pd.DataFrame({'page_id': [1, 2]})
+    return project, df, df, None, {'download': 0.0, 'transform': 0.0}, 1
+
+
+def test_writer_keeps_draining_after_unexpected_errors(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_ingest, 'upsert', lambda conn, df, **kw: len(df))
+    monkeypatch.setattr(batch_ingest, 'record_upsert', lambda *args: None)
+    checkpoint = Checkpoint(str(tmp_path / 'checkpoint.json'))
+    record = checkpoint.record
+
+    # Recording a checkpoint fails for one project, outside the retried write
+    def flaky_record(project, **details):
+        if project == 'Broken':
+            raise OSError("disk full")
+        record(project, **details)
+    monkeypatch.setattr(checkpoint, 'record', flaky_record)
+    monkeypatch.setattr(batch_ingest, 'RETRY_BACKOFF_SECONDS', 0)
+
+    report = BatchReport([])
+    write_queue = queue.Queue()
+    for project in ('Cuba', 'Broken', 'Haiti', None):
+        write_queue.put(None if project is None else item(project))
+    write_projects(FakePool(), write_queue, checkpoint, report, 1, 'executemany', 10)
+
+    assert sorted(report.succeeded) == ['Cuba', 'Haiti']
+    assert list(report.failed) == ['Broken']
+    assert write_queue.empty()
+    assert checkpoint.done('Cuba') and checkpoint.done('Haiti') and not checkpoint.done('Broken')
+
+
+def test_failed_writes_are_retried_then_reported(tmp_path, monkeypatch):
+    calls = []
+
+    def failing_upsert(conn, df, **kw):
+        calls.append(len(df))
+        raise ConnectionError("MySQL went away")
+    monkeypatch.setattr(batch_ingest, 'upsert', failing_upsert)
+    monkeypatch.setattr(batch_ingest, 'RETRY_BACKOFF_SECONDS', 0)
+    checkpoint = Checkpoint(str(tmp_path / 'checkpoint.json'))
+    report = BatchReport([])
+    write_queue = queue.Queue()
+    write_queue.put(item('Cuba'))
+    write_queue.put(None)
+    write_projects(FakePool(), write_queue, checkpoint, report, 2, 'executemany', 10)
+
+    assert len(calls) == 3
+    assert report.failed['Cuba'] == {'stage': 'write', 'error': 'MySQL went away', 'attempts': 3}
+
+
+def test_queueing_fails_once_no_writer_is_alive(monkeypatch):
+    monkeypatch.setattr(batch_ingest, 'WRITER_CHECK_SECONDS', 0.05)
+    write_queue = queue.Queue(maxsize=1)
+    write_queue.put(item('Cuba'))
+    writer = threading.Thread(target=lambda: None)
+    writer.start()
+    writer.join()
+    with pytest.raises(RuntimeError):
+        queue_for_writers(write_queue, item('Haiti'), [writer])
+
+
+def test_queueing_waits_for_a_live_writer(monkeypatch):
+    monkeypatch.setattr(batch_ingest, 'WRITER_CHECK_SECONDS', 0.05)
+    write_queue = queue.Queue(maxsize=1)
+    write_queue.put(item('Cuba'))
+    taken = []
+    writer = threading.Thread(target=lambda: (threading.Event().wait(0.2), taken.append(write_queue.get())))
+    writer.start()
+    queue_for_writers(write_queue, item('Haiti'), [writer])
+    writer.join()
+    assert taken[0][0] == 'Cuba'
+    assert write_queue.get_nowait()[0] == 'Haiti'
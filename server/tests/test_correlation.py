@@ -0,0 +1,109 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from correlation import CORRELATION_FEATURES, CorrelationStats
+from schema import read_csv
+from storage import write_dataset
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'df_revisions_pred_manual_Carribean.csv')
+
+
+@pytest.fixture(scope='module')
+def articles():
+    df = read_csv(SAMPLE_FILE).drop_duplicates('page_id').reset_index(drop=True)
+    df = df.astype({feature: np.float64 for feature in CORRELATION_FEATURES})
+    # Pairs of features are correlated over the rows where both are present
+    df.loc[::37, 'num_refs'] = np.nan
+    df.loc[::53, 'pred_qual'] = np.nan
+    return df
+
+
+# Function to turn {feature: {feature: r}} into a matrix, with NaN for null
+def as_matrix(correlation):
+    return np.array([[np.nan if correlation[i][j] is None else correlation[i][j] for j in CORRELATION_FEATURES]
+                     for i in CORRELATION_FEATURES])
+
+
+def assert_matches_corr(correlation, df):
+    np.testing.assert_allclose(as_matrix(correlation), df[CORRELATION_FEATURES].corr().to_numpy(),
+                               rtol=1e-9, atol=1e-9)
+
+
+def test_chunks_of_a_stored_dataset(articles, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    stats = CorrelationStats.from_dataset(write_dataset(articles, 'Correlation', 'merged'), chunk_rows=1000)
+    assert_matches_corr(stats.correlation(), articles)
+
+
+@pytest.mark.parametrize('quality_classes, importance_classes', [
+    (['B', 'GA', 'FA'], None),
+    (None, ['Top', 'High']),
+    (['Stub', 'Start'], ['Low']),
+])
+def test_class_filters(articles, quality_classes, importance_classes):
+    stats = CorrelationStats(np.zeros(len(CORRELATION_FEATURES)))
+    stats.add(articles)
+    rows = articles
+    if quality_classes is not None:
+        rows = rows[rows['quality_class'].isin(quality_classes)]
+    if importance_classes is not None:
+        rows = rows[rows['importance_class'].isin(importance_classes)]
+    assert_matches_corr(stats.correlation(quality_classes, importance_classes), rows)
+
+
+def test_incremental_updates_match_a_full_recompute(articles):
+    first, rest = articles.iloc[:15000], articles.iloc[15000:]
+    stats = CorrelationStats(first[CORRELATION_FEATURES].median().to_numpy())
+    stats.add(first)
+
+    # Some articles change, some are removed and the rest are new
+    changed = first.iloc[::11].copy()
+    changed['page_length'] = changed['page_length'] * 2 + 100
+    changed['pred_qual'] = 1 - changed['pred_qual']
+    removed = first.iloc[5::13]
+    removed = removed[~removed.index.isin(changed.index)]
+    stats.subtract(first.loc[changed.index])
+    stats.subtract(removed)
+    stats.add(changed)
+    stats.add(rest)
+
+    final = articles.drop(removed.index)
+    final.loc[changed.index] = changed
+    assert_matches_corr(stats.correlation(), final)
+    assert_matches_corr(stats.correlation(['C', 'B']), final[final['quality_class'].isin(['C', 'B'])])
+
+    # Saved and loaded statistics give the same matrix
+    loaded = CorrelationStats.from_dict(json.loads(json.dumps(stats.to_dict())))
+    assert loaded.correlation() == stats.correlation()
+
+
+def test_constant_features_have_null_correlations(articles):
+    df = articles.copy()
+    df['num_media'] = 3.0
+    # Constant only within the FA articles, and away from the reference point
+    df.loc[df['quality_class'] == 'FA', 'num_headings'] = 17.0
+    df.loc[df['quality_class'] == 'FA', 'pred_qual'] = 0.7364
+    stats = CorrelationStats(df[CORRELATION_FEATURES].median().to_numpy())
+    stats.add(df)
+
+    correlation = stats.correlation()
+    assert all(value is None for value in correlation['num_media'].values())
+    assert all(row['num_media'] is None for row in correlation.values())
+    assert correlation['num_headings']['num_refs'] is not None
+
+    fa = stats.correlation(['FA'])
+    assert all(value is None for value in fa['num_headings'].values())
+    assert all(value is None for value in fa['pred_qual'].values())
+    assert_matches_corr(fa, df[df['quality_class'] == 'FA'])
+
+
+def test_fully_subtracted_classes_are_dropped(articles):
+    stats = CorrelationStats(np.zeros(len(CORRELATION_FEATURES)))
+    stats.add(articles)
+    stats.subtract(articles[articles['quality_class'] == 'FA'])
+    assert not any(quality_class == 'FA' for quality_class, _ in stats.groups)
+    assert_matches_corr(stats.correlation(), articles[articles['quality_class'] != 'FA'])
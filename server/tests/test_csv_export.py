@@ -0,0 +1,146 @@
+import os
+
+import pandas as pd
+import pytest
+
+import csv_export
+from article_index import ArticleIndex
+from csv_export import ExportRequest, csv_chunks
+from process_wikiproject_monthly import fill_missing_months
+from schema import read_csv
+from storage import read_dataset, write_dataset
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'df_revisions_pred_manual_Carribean.csv')
+
+PROJECT = 'CsvExportTest'
+# One article in four keeps the monthly grid small
+SAMPLE_EVERY = 4
+# Small chunks, so an export spans many of them and long articles fill one on their own
+CHUNK_ROWS = 37
+
+
+@pytest.fixture(scope='module')
+def project_dir(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('csv_export')
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        df = read_csv(SAMPLE_FILE, timestamps=True)
+        df = df[df['page_id'].isin(df['page_id'].drop_duplicates().iloc[::SAMPLE_EVERY])]
+        write_dataset(df.drop_duplicates('page_id', keep='last'), PROJECT, 'merged')
+        write_dataset(fill_missing_months(df), PROJECT, 'latest_monthly')
+    finally:
+        os.chdir(cwd)
+    return directory
+
+
+@pytest.fixture(scope='module')
+def monthly(project_dir):
+    return read_dataset(str(project_dir / f"{PROJECT}_latest_monthly.arrow"))
+
+
+@pytest.fixture(scope='module')
+def titles(project_dir):
+    merged = read_dataset(str(project_dir / f"{PROJECT}_merged.arrow"))
+    return dict(zip(merged['page_id'].tolist(), merged['page_title'].tolist()))
+
+
+@pytest.fixture
+def client(project_dir, monkeypatch):
+    monkeypatch.chdir(project_dir)
+    monkeypatch.setattr(csv_export, 'EXPORT_CHUNK_ROWS', CHUNK_ROWS)
+    import app
+    return app.app.test_client()
+
+
+# Page ids of the export: some short and some long histories, in no particular order
+def export_ids(monthly):
+    lengths = monthly.groupby('page_id').size().sort_values(kind='stable')
+    return lengths.index[[-1, 0, len(lengths) // 2, 5, -3, len(lengths) // 3]].tolist()
+
+
+# The export written in one go with DataFrame.to_csv, as the reference
+def expected_csv(monthly, page_ids, columns=None, titles=None, start=None, end=None):
+    rows = pd.concat([monthly[monthly['page_id'] == page_id] for page_id in page_ids])
+    months = rows['month'].astype(str)
+    rows = rows[(months >= (start or '')) & (months <= (end or '9999-99'))]
+    columns = columns or list(monthly.columns)
+    if titles is not None:
+        columns = [column for column in columns if column != 'page_title']
+    selected = rows[columns].copy()
+    if titles is not None:
+        selected.insert(0, 'page_title', rows['page_id'].map(titles))
+    return selected.to_csv(index=False)
+
+
+def export(monthly, page_ids, columns, **kw):
+    return b''.join(csv_chunks(ArticleIndex(monthly), page_ids, columns, **kw)).decode('utf-8')
+
+
+def test_chunks_match_to_csv(monthly, titles, monkeypatch):
+    monkeypatch.setattr(csv_export, 'EXPORT_CHUNK_ROWS', CHUNK_ROWS)
+    page_ids = export_ids(monthly)
+    assert export(monthly, page_ids, list(monthly.columns)) == expected_csv(monthly, page_ids)
+    assert export(monthly, page_ids, ['month', 'pred_qual'], titles=titles) == \
+        expected_csv(monthly, page_ids, ['month', 'pred_qual'], titles)
+    # The titles of the merged data replace the page_title column of the monthly rows
+    with_titles = export(monthly, page_ids, list(monthly.columns), titles=titles)
+    assert with_titles.splitlines()[0].split(',').count('page_title') == 1
+    assert with_titles == expected_csv(monthly, page_ids, titles=titles)
+
+
+def test_month_range(monthly, monkeypatch):
+    monkeypatch.setattr(csv_export, 'EXPORT_CHUNK_ROWS', CHUNK_ROWS)
+    page_ids = export_ids(monthly)
+    months = sorted(monthly['month'].astype(str).unique())
+    start, end = months[len(months) // 3], months[2 * len(months) // 3]
+    for bounds in ({'start': start}, {'end': end}, {'start': start, 'end': end}):
+        assert export(monthly, page_ids, ['page_id', 'month'], **bounds) == \
+            expected_csv(monthly, page_ids, ['page_id', 'month'], **bounds)
+
+
+def test_unknown_articles_are_skipped(monthly):
+    page_ids = export_ids(monthly)[:2]
+    assert export(monthly, [0] + page_ids + [-5], ['page_id', 'month']) == \
+        expected_csv(monthly, page_ids, ['page_id', 'month'])
+    assert export(monthly, [0], ['page_id', 'month']) == 'page_id,month\n'
+
+
+@pytest.mark.parametrize('body', [None, [], {}, {'page_ids': []}, {'page_ids': [1], 'start': '2023-1'}])
+def test_invalid_export_requests(body):
+    with pytest.raises(ValueError):
+        ExportRequest(body)
+
+
+def test_download_by_page_id(client, monthly, titles):
+    page_ids = export_ids(monthly)
+    response = client.post(f'/download_csv?project={PROJECT}', json={'page_ids': page_ids})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert response.get_data(as_text=True) == expected_csv(monthly, page_ids, titles=titles)
+
+
+def test_download_by_titles_as_the_client_used_to_send(client, monthly, titles):
+    page_ids = export_ids(monthly)
+    response = client.post(f'/download_csv?project={PROJECT}', json=[titles[page_id] for page_id in page_ids])
+    assert response.status_code == 200
+    assert response.get_data(as_text=True) == expected_csv(monthly, page_ids, titles=titles)
+
+
+def test_download_columns_and_months(client, monthly, titles):
+    page_ids = export_ids(monthly)
+    body = {'page_ids': page_ids[:3], 'titles': [titles[page_ids[3]]], 'columns': 'month,num_refs',
+            'start': '2020-01', 'end': '2022-12'}
+    response = client.post(f'/download_csv?project={PROJECT}', json=body)
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    assert len(body.splitlines()) > 1
+    assert body == expected_csv(monthly, page_ids[:4], ['month', 'num_refs'], titles, '2020-01', '2022-12')
+
+
+@pytest.mark.parametrize('body', [{'page_ids': [1], 'columns': 'month,missing'}, {'titles': []}])
+def test_download_rejects_invalid_requests(client, body):
+    response = client.post(f'/download_csv?project={PROJECT}', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
@@ -0,0 +1,124 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+import requests
+from pandas.testing import assert_frame_equal
+
+from downloader import download_file
+from schema import CSV_DTYPES, compact, read_csv
+
+CHUNK_SIZE = 4096
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'df_revisions_pred_manual_Carribean.csv')
+
+# Revisions of the fixture files served upstream, sliced from the sample
+FIXTURE_ROWS = 3000
+
+
+# Function to build a fixture revisions CSV from rows of the sample
+def fixture_csv(start, stop):
+    with open(SAMPLE_FILE, 'rb') as file:
+        lines = file.read().splitlines(keepends=True)
+    return b''.join([lines[0]] + lines[1 + start:1 + stop])
+
+
+# Serves one file with an ETag and Range/If-Range support, and can break off the
+# next transfer after a number of bytes
+class FileHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        body, etag = server.body, server.etag
+        start = 0
+        range_header = self.headers.get('Range')
+        if range_header and self.headers.get('If-Range') == etag:
+            start = int(range_header[len('bytes='):].rstrip('-'))
+        server.requests.append({'range': range_header, 'if_range': self.headers.get('If-Range'),
+                                'status': 206 if start else 200})
+
+        self.send_response(206 if start else 200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body) - start))
+        if start:
+            self.send_header('Content-Range', f"bytes {start}-{len(body) - 1}/{len(body)}")
+        self.end_headers()
+        if server.cut_after is not None:
+            # Close the connection partway, as a dropped transfer would
+            self.wfile.write(body[start:start + server.cut_after])
+            server.cut_after = None
+            return
+        self.wfile.write(body[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FileHandler)
+    server.body = fixture_csv(0, FIXTURE_ROWS)
+    server.etag = '"v1"'
+    server.cut_after = None
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/revisions.csv"
+
+
+def read(file_name):
+    with open(file_name, 'rb') as file:
+        return file.read()
+
+
+def test_interrupted_download_resumes_to_identical_file(server, tmp_path):
+    local_file_name = str(tmp_path / 'revisions.csv')
+    server.cut_after = 20 * CHUNK_SIZE + 7
+
+    download_file(url(server), local_file_name, chunk_size=CHUNK_SIZE)
+
+    assert read(local_file_name) == server.body
+    assert [request['status'] for request in server.requests] == [200, 206]
+    # Resumed from the bytes that reached the disk, not from the start
+    offset = int(server.requests[1]['range'][len('bytes='):].rstrip('-'))
+    assert 0 < offset <= 20 * CHUNK_SIZE + 7
+    assert server.requests[1]['if_range'] == '"v1"'
+    assert not os.path.exists(f"{local_file_name}.part")
+    assert not os.path.exists(f"{local_file_name}.part.json")
+
+
+def test_changed_validator_restarts_download(server, tmp_path):
+    local_file_name = str(tmp_path / 'revisions.csv')
+    server.cut_after = 10 * CHUNK_SIZE
+    with pytest.raises(requests.exceptions.RequestException):
+        download_file(url(server), local_file_name, chunk_size=CHUNK_SIZE, retries=0)
+    assert os.path.getsize(f"{local_file_name}.part") == 10 * CHUNK_SIZE
+
+    # The file changed upstream: the partial bytes belong to the old version
+    server.body = fixture_csv(FIXTURE_ROWS, 2 * FIXTURE_ROWS)
+    server.etag = '"v2"'
+    download_file(url(server), local_file_name, chunk_size=CHUNK_SIZE)
+
+    assert read(local_file_name) == server.body
+    assert server.requests[1]['if_range'] == '"v1"'
+    assert server.requests[1]['status'] == 200
+
+
+def test_chunked_read_matches_whole_file(server, tmp_path):
+    local_file_name = tmp_path / 'revisions.csv'
+    local_file_name.write_bytes(server.body)
+    expected = pd.read_csv(local_file_name, dtype=CSV_DTYPES)
+    compact(expected)
+    expected['revision_timestamp'] = pd.to_datetime(expected['revision_timestamp'], utc=True, format='ISO8601')
+
+    # Several chunks, whose categoricals hold different classes, parsed straight from the response
+    assert_frame_equal(read_csv(url(server), timestamps=True, chunksize=250), expected)
+    assert_frame_equal(read_csv(str(local_file_name), timestamps=True, chunksize=250), expected)
@@ -0,0 +1,74 @@
+import os
+import warnings
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from process_wikiproject_monthly import fill_missing_months
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'df_revisions_pred_manual_Carribean.csv')
+
+# The baseline takes over a minute on the whole sample, so one article in ten is used
+SAMPLE_EVERY = 10
+
+
+# Frozen copy of fill_missing_months before it was vectorized: every article
+# spans the project's full month range, back-filled from its first revision
+def baseline_fill_missing_months(df):
+    df['revision_timestamp'] = pd.to_datetime(df['revision_timestamp'])
+    df['month'] = df['revision_timestamp'].dt.to_period('M').astype(str)
+    df = df.sort_values(by=['page_id', 'revision_timestamp'])
+    all_months = pd.period_range(start=df['revision_timestamp'].min(), end=df['revision_timestamp'].max(), freq='M')
+    expanded_df = pd.DataFrame([
+        (page_id, month) for page_id in df['page_id'].unique() for month in all_months
+    ], columns=['page_id', 'month'])
+    df['month'] = df['month'].astype(str)
+    expanded_df['month'] = expanded_df['month'].astype(str)
+    df_filled = pd.merge(expanded_df, df, on=['page_id', 'month'], how='left')
+    df_filled = df_filled.groupby('page_id').apply(lambda group: group.ffill().bfill())
+    df_filled = df_filled.dropna()
+    return df_filled
+
+
+# Function to compare grids regardless of the column types each implementation uses
+def normalize(df):
+    df = df.reset_index(drop=True)
+    types = {}
+    for column in df.columns:
+        if column == 'revision_timestamp':
+            continue
+        if isinstance(df[column].dtype, pd.CategoricalDtype) or df[column].dtype == object:
+            types[column] = str
+        else:
+            types[column] = 'float64'
+    return df.astype(types)
+
+
+@pytest.fixture(scope='module')
+def revisions():
+    df = pd.read_csv(SAMPLE_FILE)
+    page_ids = df['page_id'].drop_duplicates().sort_values().iloc[::SAMPLE_EVERY]
+    return df[df['page_id'].isin(page_ids)].reset_index(drop=True)
+
+
+@pytest.fixture(scope='module')
+def baseline(revisions):
+    with warnings.catch_warnings():
+        # The baseline relies on pandas behaviour that now warns (groupby.apply over
+        # the grouping column, periods of tz-aware timestamps)
+        warnings.simplefilter('ignore')
+        return normalize(baseline_fill_missing_months(revisions.copy()))
+
+
+def test_global_month_range_matches_baseline(revisions, baseline):
+    filled = fill_missing_months(revisions.copy(), global_month_range=True)
+    assert_frame_equal(normalize(filled), baseline)
+
+
+def test_local_month_range_matches_baseline_from_first_revision(revisions, baseline):
+    first_months = pd.to_datetime(revisions['revision_timestamp']).dt.strftime('%Y-%m').groupby(revisions['page_id']).min()
+    expected = baseline[baseline['month'] >= baseline['page_id'].map(first_months)].reset_index(drop=True)
+    filled = fill_missing_months(revisions.copy())
+    assert_frame_equal(normalize(filled), expected)
@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import pytest
+
+from filter_engine import FilterIndex
+from schema import read_csv
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'df_revisions_pred_manual_Carribean.csv')
+
+
+# Frozen copy of the filtering /filter did with boolean masks before FilterIndex
+def baseline_filter(df, filters):
+    filtered_data = df[
+        (df['num_refs'] >= filters.get('num_refs_min', df['num_refs'].min())) &
+        (df['num_refs'] <= filters.get('num_refs_max', df['num_refs'].max())) &
+        (df['num_media'] >= filters.get('num_media_min', df['num_media'].min())) &
+        (df['num_media'] <= filters.get('num_media_max', df['num_media'].max())) &
+        (df['num_wikilinks'] >= filters.get('num_wikilinks_min', df['num_wikilinks'].min())) &
+        (df['num_wikilinks'] <= filters.get('num_wikilinks_max', df['num_wikilinks'].max())) &
+        (df['num_categories'] >= filters.get('num_categories_min', df['num_categories'].min())) &
+        (df['num_categories'] <= filters.get('num_categories_max', df['num_categories'].max())) &
+        (df['num_headings'] >= filters.get('num_headings_min', df['num_headings'].min())) &
+        (df['num_headings'] <= filters.get('num_headings_max', df['num_headings'].max())) &
+        (df['page_length'] >= filters.get('page_length_min', df['page_length'].min())) &
+        (df['page_length'] <= filters.get('page_length_max', df['page_length'].max())) &
+        (df['pred_qual'] >= filters.get('pred_qual_min', df['pred_qual'].min())) &
+        (df['pred_qual'] <= filters.get('pred_qual_max', df['pred_qual'].max()))
+    ]
+    if filters.get('quality_class'):
+        filtered_data = filtered_data[filtered_data['quality_class'].isin(filters['quality_class'])]
+    if filters.get('importance_class'):
+        filtered_data = filtered_data[filtered_data['importance_class'].isin(filters['importance_class'])]
+    return filtered_data
+
+
+@pytest.fixture(scope='module')
+def articles():
+    df = read_csv(SAMPLE_FILE).drop_duplicates('page_id').reset_index(drop=True)
+    # Missing features never match a bound
+    df.loc[::97, 'num_refs'] = np.nan
+    df.loc[::89, 'pred_qual'] = np.nan
+    return df
+
+
+@pytest.mark.parametrize('filters', [
+    {},
+    {'pred_qual_min': 0.5},
+    {'pred_qual_max': 0.45172086},
+    {'num_refs_min': 10, 'num_refs_max': 50, 'page_length_min': 5000},
+    {'num_media_min': 3, 'num_headings_max': 20, 'num_categories_min': 2, 'num_wikilinks_max': 400},
+    {'quality_class': ['B', 'GA', 'FA']},
+    {'importance_class': ['Top'], 'pred_qual_min': 0.3, 'pred_qual_max': 0.9},
+    {'quality_class': ['Start'], 'importance_class': ['Low', 'Mid'], 'num_refs_max': 5},
+    # Bounds equal to values in the data are inclusive
+    {'num_refs_min': 7, 'num_refs_max': 7},
+])
+def test_query_matches_boolean_masks(articles, filters):
+    rows = FilterIndex(articles).query(filters)
+    expected = baseline_filter(articles, filters).index.to_numpy()
+    assert len(expected)
+    np.testing.assert_array_equal(rows, expected)
+
+
+@pytest.mark.parametrize('filters', [
+    {'num_refs_min': 10, 'num_refs_max': 5},
+    {'page_length_min': 10 ** 9},
+    {'quality_class': ['Unknown']},
+    {'pred_qual_min': 0.99, 'quality_class': ['Stub']},
+])
+def test_query_without_matches(articles, filters):
+    rows = FilterIndex(articles).query(filters)
+    assert len(rows) == 0
+    assert len(baseline_filter(articles, filters)) == 0
@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from process_wikiproject_monthly import aggregate_months, fill_missing_months, update_monthly_grid
+from schema import read_csv
+from storage import read_dataset, write_dataset
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'df_revisions_pred_manual_Carribean.csv')
+
+# The sample has one revision per article and month at most, so some articles get a
+# second revision in the sample's last month; new revisions are appended two months later
+SECOND_REVISIONS = 20
+NEW_REVISIONS = 30
+
+# One article in five keeps the grids of the global month range small
+SAMPLE_EVERY = 5
+
+
+@pytest.fixture(scope='module')
+def revisions():
+    df = read_csv(SAMPLE_FILE, timestamps=True)
+    page_ids = df['page_id'].drop_duplicates().sort_values().iloc[::SAMPLE_EVERY]
+    df = df[df['page_id'].isin(page_ids)].reset_index(drop=True)
+    last_month = df['revision_timestamp'].dt.strftime('%Y-%m') == df['revision_timestamp'].max().strftime('%Y-%m')
+
+    second = df[last_month].sample(SECOND_REVISIONS, random_state=0).reset_index(drop=True)
+    second['revision_timestamp'] = second['revision_timestamp'] - pd.Timedelta(minutes=1)
+    second['page_length'] = second['page_length'] - 1
+    new = df.sample(NEW_REVISIONS, random_state=1).reset_index(drop=True)
+    new['revision_timestamp'] = df['revision_timestamp'].max() + pd.DateOffset(months=2) - pd.to_timedelta(np.arange(NEW_REVISIONS), unit='h')
+    new['pred_qual'] = new['pred_qual'] + 0.125
+
+    # Revisions are told apart by their ids, the new ones being the highest
+    added = pd.concat([second, new], ignore_index=True)
+    added['revision_id'] = df['revision_id'].max() + 1 + np.arange(len(added))
+    return pd.concat([df, added], ignore_index=True)
+
+
+# Function to read a grid back the way the pipeline stored it, with plain values for comparison
+def stored(df, project):
+    grid = read_dataset(write_dataset(df, project, 'latest_monthly'))
+    return grid.astype({column: object for column in grid.columns if isinstance(grid[column].dtype, pd.CategoricalDtype)})
+
+
+@pytest.mark.parametrize('global_month_range', [False, True])
+def test_incremental_grid_matches_full_recompute(revisions, tmp_path, monkeypatch, global_month_range):
+    monkeypatch.chdir(tmp_path)
+    new_mask = (revisions['revision_id'] > revisions['revision_id'].iloc[:-NEW_REVISIONS].max()).to_numpy()
+    previous = fill_missing_months(revisions[~new_mask].copy(), global_month_range=global_month_range)
+    previous = read_dataset(write_dataset(previous, 'Previous', 'latest_monthly'))
+
+    updated = update_monthly_grid(previous, revisions.copy(), new_mask, global_month_range=global_month_range)
+    full = fill_missing_months(revisions.copy(), global_month_range=global_month_range)
+
+    updated, full = stored(updated, 'Updated'), stored(full, 'Full')
+    assert_frame_equal(updated, full)
+    assert_frame_equal(aggregate_months(updated), aggregate_months(full))
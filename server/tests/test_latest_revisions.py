@@ -0,0 +1,125 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from latest_revisions import API_TIMESTAMP_FORMAT, MYSQL_TIMESTAMP_FORMAT, latest_revisions
+from schema import read_csv
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'df_revisions_pred_manual_Carribean.csv')
+
+# Columns of the assessments file; the sample revisions were joined with them
+PAGE_COLUMNS = ['page_id', 'page_title', 'quality_class', 'importance_class']
+
+# Articles taken from the sample
+ARTICLES = 400
+
+# Added to the revision ids of the revisions tied with another one
+TIED_ID_OFFSET = 10 ** 9
+
+
+# Frozen copy of the transform_data selection both pipelines used before latest_revisions
+def baseline_latest_revisions(df_revisions, df_pages, timestamp_format):
+    df_revisions = df_revisions.copy()
+    df_revisions['revision_timestamp'] = pd.to_datetime(df_revisions['revision_timestamp']).dt.strftime(timestamp_format)
+    df_merged = df_revisions.merge(df_pages, on='page_id')
+    sorted_df = df_merged.sort_values(by=['page_title', 'revision_timestamp'], ascending=[True, False])
+    latest_revisions_df = sorted_df.groupby('page_title').first().reset_index()
+    return latest_revisions_df
+
+
+@pytest.fixture(scope='module')
+def sample():
+    df = read_csv(SAMPLE_FILE)
+    return df[df['page_id'].isin(df['page_id'].drop_duplicates().iloc[:ARTICLES])].reset_index(drop=True)
+
+
+@pytest.fixture(scope='module')
+def pages(sample):
+    df_pages = sample[PAGE_COLUMNS].drop_duplicates('page_id').reset_index(drop=True)
+    # Titles shared by several page_ids, e.g. a page that was moved and recreated
+    df_pages.loc[[10, 20, 30], 'page_title'] = 'Shared title'
+    df_pages.loc[41, 'page_title'] = df_pages.loc[40, 'page_title']
+    # Articles without an assessment
+    return df_pages.drop([70, 71]).reset_index(drop=True)
+
+
+# Assessments listing some articles twice
+@pytest.fixture(scope='module')
+def duplicated_pages(pages):
+    return pd.concat([pages, pages.iloc[[50, 60]].assign(quality_class='B')], ignore_index=True)
+
+
+@pytest.fixture(scope='module')
+def revisions(sample):
+    df = sample.drop(columns=PAGE_COLUMNS[1:])
+    rng = np.random.default_rng(0)
+
+    # The sample holds one revision per article; half of them get an older revision
+    older = df.sample(frac=0.5, random_state=0).copy()
+    older['revision_timestamp'] = (pd.to_datetime(older['revision_timestamp']) - pd.Timedelta(days=30)).dt.strftime(API_TIMESTAMP_FORMAT)
+    older['revision_id'] = older['revision_id'] - 1
+    older['num_refs'] = older['num_refs'] // 2
+    df = pd.concat([df, older], ignore_index=True)
+
+    # Revisions made within the same second as another one of the page, listed before or after it
+    ties = df.sample(40, random_state=1).copy()
+    ties['revision_id'] = ties['revision_id'] + TIED_ID_OFFSET
+    ties['page_length'] = ties['page_length'] + 1
+    df = pd.concat([ties.iloc[:20], df, ties.iloc[20:]], ignore_index=True)
+
+    # Missing values, including in the newest revision of some pages, and missing timestamps
+    df = df.astype({'num_refs': np.float64, 'num_media': np.float64})
+    newest = df.sort_values('revision_timestamp').drop_duplicates('page_id', keep='last').index
+    df.loc[newest[::7], 'num_refs'] = np.nan
+    df.loc[newest[::11], 'pred_qual'] = np.nan
+    df.loc[rng.choice(len(df), 200, replace=False), 'num_media'] = np.nan
+    df.loc[rng.choice(len(df), 30, replace=False), 'revision_timestamp'] = np.nan
+    df.loc[newest[5], 'item_id'] = np.nan
+    return df.sample(frac=1, random_state=2).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('timestamp_format', [API_TIMESTAMP_FORMAT, MYSQL_TIMESTAMP_FORMAT])
+@pytest.mark.parametrize('parsed', [False, True])
+def test_matches_the_per_title_sort(revisions, pages, timestamp_format, parsed):
+    df_revisions = revisions.copy()
+    if parsed:
+        # As schema.read_csv(timestamps=True) gives them
+        df_revisions['revision_timestamp'] = pd.to_datetime(df_revisions['revision_timestamp'], utc=True, format='ISO8601')
+        # Timestamps are compared to the second
+        tied = df_revisions['revision_id'] > TIED_ID_OFFSET
+        df_revisions.loc[tied, 'revision_timestamp'] += pd.Timedelta(milliseconds=600)
+    before = df_revisions.copy()
+
+    result = latest_revisions(df_revisions, pages, timestamp_format)
+    expected = baseline_latest_revisions(df_revisions, pages, timestamp_format)
+    assert_frame_equal(result, expected)
+    # The caller's revisions are left as they were
+    assert_frame_equal(df_revisions, before)
+
+
+# With an article assessed twice, pandas' many-to-many merge reorders the joined rows,
+# so which of two revisions made in the same second the old code kept was arbitrary.
+# Articles assessed twice are compared on revisions without such ties.
+@pytest.mark.parametrize('timestamp_format', [API_TIMESTAMP_FORMAT, MYSQL_TIMESTAMP_FORMAT])
+def test_articles_assessed_twice(revisions, duplicated_pages, timestamp_format):
+    df_revisions = revisions[revisions['revision_id'] < TIED_ID_OFFSET]
+    result = latest_revisions(df_revisions, duplicated_pages, timestamp_format)
+    assert_frame_equal(result, baseline_latest_revisions(df_revisions, duplicated_pages, timestamp_format))
+
+
+def test_cases_are_covered(revisions, pages):
+    result = latest_revisions(revisions, pages, API_TIMESTAMP_FORMAT).set_index('page_title')
+    assert result.index.is_unique
+    assert 'Shared title' in result.index
+    # Some newest revisions are tied with another one of the same second
+    assert result['revision_id'].gt(TIED_ID_OFFSET).any()
+    assert revisions['revision_timestamp'].isna().any()
+    # Values missing from the newest revision of a page come from an older one
+    timestamps = pd.to_datetime(revisions['revision_timestamp'])
+    newest = revisions.loc[timestamps.sort_values(kind='stable').index].drop_duplicates('page_id', keep='last')
+    filled = newest.loc[newest['num_refs'].isna(), 'revision_id']
+    assert result.loc[result['revision_id'].isin(filled), 'num_refs'].notna().any()
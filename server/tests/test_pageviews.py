@@ -0,0 +1,165 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+import pytest
+
+from pageviews import PageviewsClient
+
+# Seconds every stub response is held back, so concurrent requests overlap
+RESPONSE_DELAY = 0.2
+
+
+# Answers /<title>/<granularity>/<start>/<end> with one item per day, the way the
+# per-article pageviews API does. "Unknown" has no pageviews (404) and "Broken"
+# always fails (500).
+class PageviewsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        title, granularity, start, end = [unquote(part) for part in self.path.strip('/').split('/')[-4:]]
+        with server.lock:
+            server.requests.append((title, start, end))
+            server.in_flight += 1
+            server.most_in_flight = max(server.most_in_flight, server.in_flight)
+        try:
+            time.sleep(server.delay)
+            if title == 'Unknown':
+                return self.reply(404, {'title': 'Not found.'})
+            if title == 'Broken':
+                return self.reply(500, {'title': 'Internal error.'})
+            day = datetime.strptime(start, '%Y%m%d').date()
+            items = []
+            while day <= datetime.strptime(end, '%Y%m%d').date():
+                items.append({'article': title, 'granularity': granularity,
+                              'timestamp': f"{day:%Y%m%d}00", 'views': day.day + len(title)})
+                day += timedelta(days=1)
+            self.reply(200, {'items': items})
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def reply(self, status, body):
+        body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PageviewsHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.in_flight = 0
+    server.most_in_flight = 0
+    server.delay = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(server):
+    return PageviewsClient(base_url=f"http://127.0.0.1:{server.server_address[1]}/per-article/",
+                           max_workers=4)
+
+
+def days(items):
+    return [item['timestamp'][:8] for item in items]
+
+
+def test_only_gaps_are_fetched(server, client):
+    first = client.get('Jamaica', '20230101', '20230110')
+    assert days(first['items']) == [f"202301{day:02d}" for day in range(1, 11)]
+
+    # Overlapping and enclosing ranges only ask upstream for the days not covered yet
+    second = client.get('Jamaica', '20230105', '20230120')
+    assert days(second['items']) == [f"202301{day:02d}" for day in range(5, 21)]
+    client.get('Jamaica', '20221225', '20230125')
+    assert server.requests == [
+        ('Jamaica', '20230101', '20230110'),
+        ('Jamaica', '20230111', '20230120'),
+        ('Jamaica', '20221225', '20221231'),
+        ('Jamaica', '20230121', '20230125'),
+    ]
+
+    # A covered range is answered from the cache
+    cached = client.get('Jamaica', '20230103', '20230122')
+    assert len(server.requests) == 4
+    assert days(cached['items']) == [f"202301{day:02d}" for day in range(3, 23)]
+    assert cached['items'][0] == {'article': 'Jamaica', 'granularity': 'daily', 'timestamp': '2023010300', 'views': 10}
+    assert client.stats() == {'series': 1, 'hits': 1, 'upstream_requests': 4}
+
+
+def test_series_are_kept_per_title_and_granularity(server, client):
+    client.get('Jamaica', '20230101', '20230131')
+    client.get('Jamaica', '20230101', '20230131', granularity='monthly')
+    client.get('Cuba', '20230101', '20230131')
+    assert len(server.requests) == 3
+    assert client.stats()['series'] == 3
+
+
+def test_recent_days_are_fetched_again(server, client):
+    today = datetime.now(timezone.utc).date()
+    start, end = f"{today - timedelta(days=10):%Y%m%d}", f"{today:%Y%m%d}"
+    client.get('Haiti', start, end)
+    client.get('Haiti', start, end)
+    settled = today - timedelta(days=2)
+    assert server.requests == [
+        ('Haiti', start, end),
+        ('Haiti', f"{settled + timedelta(days=1):%Y%m%d}", end),
+    ]
+
+
+def test_days_without_pageviews_are_covered(server, client):
+    assert client.get('Unknown', '20230101', '20230110') == {'items': []}
+    assert client.get('Unknown', '20230101', '20230110') == {'items': []}
+    assert len(server.requests) == 1
+
+
+def test_invalid_days(client):
+    with pytest.raises(ValueError):
+        client.get('Jamaica', '2023-01-01', '20230110')
+    with pytest.raises(ValueError):
+        client.get('Jamaica', '20230110', '20230101')
+
+
+def test_batch_is_fetched_concurrently(server, client):
+    server.delay = RESPONSE_DELAY
+    titles = [f"Island {number}" for number in range(8)] + ['Unknown', 'Broken']
+    started = time.monotonic()
+    results = client.get_many(titles, '20230101', '20230103')
+    elapsed = time.monotonic() - started
+
+    assert list(results) == titles
+    for title in titles[:8]:
+        assert days(results[title]['items']) == ['20230101', '20230102', '20230103']
+        assert results[title]['items'][0]['article'] == title
+    assert results['Unknown'] == {'items': []}
+    assert results['Broken']['status_code'] == 500
+    # At most max_workers requests run at once, and far fewer rounds than titles
+    assert 1 < server.most_in_flight <= 4
+    assert elapsed < len(titles) * RESPONSE_DELAY / 2
+
+
+def test_batch_endpoint(server, client, monkeypatch):
+    import app
+    monkeypatch.setattr(app, 'pageviews_client', client)
+    response = app.app.test_client().post('/get_pageviews_batch', json={
+        'titles': ['Jamaica', 'Broken', 'Jamaica'], 'start': '20230101', 'end': '20230102'})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert days(body['pageviews']['Jamaica']['items']) == ['20230101', '20230102']
+    assert body['errors']['Broken']['status_code'] == 500
+    # Repeated titles are fetched once
+    assert [request[0] for request in server.requests].count('Jamaica') == 1
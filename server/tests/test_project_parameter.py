@@ -0,0 +1,63 @@
+import pytest
+
+import app
+
+
+class FakeJob:
+    id = 'job-1'
+
+    def to_dict(self):
+        return {'id': self.id, 'state': 'queued'}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    submitted = []
+    monkeypatch.setattr(app.ingest_jobs, 'submit', lambda project: submitted.append(project) or FakeJob())
+    client = app.app.test_client()
+    client.submitted = submitted
+    return client
+
+
+READ_REQUESTS = [
+    ('get', '/get_csv_data_monthly_aggregated', None),
+    ('get', '/minmax', None),
+    ('post', '/filter', {'pred_qual_min': 0.5}),
+    ('get', '/get_correlation', None),
+    ('get', '/get_csv_data_monthly_Latest', None),
+    ('get', '/get_article_data?page_id=1', None),
+    ('post', '/get_articles_data', {'page_ids': [1]}),
+    ('post', '/download_csv', {'page_ids': [1]}),
+]
+
+
+@pytest.mark.parametrize('method, path, body', READ_REQUESTS)
+def test_read_endpoints_require_a_project(client, method, path, body):
+    # A project selected earlier is not used for requests that do not name one
+    response = client.post('/set_selected_wikiproject', json={'project_name': 'Caribbean'})
+    assert response.status_code == 202
+    assert client.submitted == ['Caribbean']
+
+    response = getattr(client, method)(path, json=body)
+    assert response.status_code == 400
+    assert 'project' in response.get_json()['error']
+
+
+@pytest.mark.parametrize('method, path, body', READ_REQUESTS)
+def test_invalid_project_names_are_rejected(client, method, path, body):
+    separator = '&' if '?' in path else '?'
+    response = getattr(client, method)(f'{path}{separator}project=../secrets', json=body)
+    assert response.status_code == 400
+
+
+def test_unknown_project(client):
+    response = client.get('/minmax?project=NoSuchProjectIngested')
+    assert response.status_code == 404
+
+
+def test_selecting_a_project_starts_its_ingest(client):
+    response = client.post('/set_selected_wikiproject', json={'project_name': 'Caribbean.csv'})
+    assert response.status_code == 202
+    assert response.get_json()['job_id'] == 'job-1'
+    assert client.submitted == ['Caribbean']
+    assert client.post('/set_selected_wikiproject', json={}).status_code == 400
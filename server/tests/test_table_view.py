@@ -0,0 +1,128 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from schema import read_csv
+from table_view import MAX_PAGE_SIZE, PageRequest, SortOrder, select_page
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'df_revisions_pred_manual_Carribean.csv')
+
+
+@pytest.fixture(scope='module')
+def articles():
+    df = read_csv(SAMPLE_FILE).drop_duplicates('page_id').reset_index(drop=True)
+    df.loc[::50, 'pred_qual'] = np.nan
+    return df
+
+
+@pytest.fixture(scope='module')
+def client():
+    import app
+    return app.app.test_client()
+
+
+# Function to walk every page of a sorted selection and return the index of the rows seen
+def page_through(df, rows, sort_by, order, limit):
+    sort_order = SortOrder(df[sort_by])
+    seen = []
+    offset = 0
+    while True:
+        total, page = select_page(df, rows, PageRequest({'limit': limit, 'offset': offset, 'sort_by': sort_by, 'order': order}), sort_order)
+        if page.empty:
+            return total, seen
+        seen += page.index.tolist()
+        offset += limit
+
+
+def test_unpaged_request():
+    page_request = PageRequest({})
+    assert not page_request.paginated
+    assert (page_request.limit, page_request.offset, page_request.order, page_request.columns) == (100, 0, 'asc', None)
+
+
+def test_columns_from_string_or_list():
+    assert PageRequest({'columns': 'page_id,,pred_qual'}).columns == ['page_id', 'pred_qual']
+    assert PageRequest({'columns': ['page_title']}).columns == ['page_title']
+
+
+@pytest.mark.parametrize('params', [
+    {'limit': 0},
+    {'limit': MAX_PAGE_SIZE + 1},
+    {'limit': 'ten'},
+    {'offset': -1},
+    {'order': 'up'},
+])
+def test_invalid_page_requests(params):
+    with pytest.raises(ValueError):
+        PageRequest(params)
+
+
+def test_unknown_columns(articles):
+    with pytest.raises(ValueError):
+        PageRequest({'sort_by': 'missing'}).validate(articles)
+    with pytest.raises(ValueError):
+        PageRequest({'columns': 'page_id,missing'}).validate(articles)
+
+
+def test_offset_past_the_end(articles):
+    total, page = select_page(articles, np.arange(len(articles)), PageRequest({'offset': len(articles), 'limit': 10}))
+    assert total == len(articles)
+    assert page.empty
+
+
+def test_column_projection(articles):
+    _, page = select_page(articles, np.arange(len(articles)), PageRequest({'columns': 'page_title,pred_qual', 'limit': 5}))
+    assert list(page.columns) == ['page_title', 'pred_qual']
+    assert page.index.tolist() == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.parametrize('sort_by', ['quality_class', 'pred_qual', 'num_refs'])
+def test_ascending_pages_follow_a_stable_sort(articles, sort_by):
+    total, seen = page_through(articles, np.arange(len(articles)), sort_by, 'asc', 97)
+    expected = articles[sort_by].astype(object) if sort_by == 'quality_class' else articles[sort_by]
+    assert total == len(articles)
+    assert seen == expected.sort_values(kind='stable', na_position='last').index.tolist()
+
+
+@pytest.mark.parametrize('sort_by', ['quality_class', 'pred_qual'])
+def test_descending_pages_cover_every_row_once(articles, sort_by):
+    rows = np.flatnonzero(articles['importance_class'] != 'Low')
+    total, seen = page_through(articles, rows, sort_by, 'desc', 61)
+    assert total == len(rows)
+    assert sorted(seen) == rows.tolist()
+    values = articles.loc[seen, sort_by]
+    present = values.dropna().astype(object if sort_by == 'quality_class' else float).tolist()
+    assert present == sorted(present, reverse=True)
+    # Missing values come last
+    assert values.isna().sum() == 0 or values.iloc[len(present):].isna().all()
+    # The same request always returns the same page
+    first = select_page(articles, rows, PageRequest({'limit': 61, 'sort_by': sort_by, 'order': 'desc'}), SortOrder(articles[sort_by]))[1]
+    again = select_page(articles, rows, PageRequest({'limit': 61, 'sort_by': sort_by, 'order': 'desc'}), SortOrder(articles[sort_by]))[1]
+    pd.testing.assert_frame_equal(first, again)
+
+
+@pytest.mark.parametrize('query', [
+    'limit=0',
+    'limit=abc',
+    'offset=-5',
+    'order=sideways',
+    'sort_by=not_a_column',
+    'columns=page_id,not_a_column',
+])
+def test_invalid_requests_are_rejected(client, query):
+    response = client.get(f'/get_csv_data?{query}')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_paged_response(client, articles):
+    response = client.get('/get_csv_data?limit=3&offset=2&columns=page_id,pred_qual&sort_by=page_id&order=desc')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['offset'], body['limit']) == (2, 3)
+    assert [set(row) for row in body['rows']] == [{'page_id', 'pred_qual'}] * 3
+    page_ids = [row['page_id'] for row in body['rows']]
+    assert page_ids == sorted(page_ids, reverse=True)
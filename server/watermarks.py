@@ -0,0 +1,117 @@
+import json
+import os
+import time
+
+import pandas as pd
+
+# Where the watermarks of every project and pipeline are kept
+WATERMARK_DIR = os.getenv('WATERMARK_DIR', 'watermarks')
+
+# Process only the revisions added since the last run when a watermark and earlier output exist
+INCREMENTAL_INGEST = os.getenv('INCREMENTAL_INGEST', '1') == '1'
+
+
+# Path of the watermark one pipeline ('latest', 'monthly', 'mysql') keeps for a project
+def watermark_path(project, pipeline):
+    return os.path.join(WATERMARK_DIR, f"{project}.{pipeline}.json")
+
+
+# Function to load the watermark of a pipeline, or None when the project was never processed
+def load_watermark(project, pipeline):
+    try:
+        with open(watermark_path(project, pipeline)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+# Function to describe the newest revision of a set of revisions.
+#
+# `source` identifies the raw file the revisions were read from, so an unchanged
+# file can be skipped without looking at its rows. Other keyword arguments record
+# the options the output was produced with.
+def revision_watermark(df_revisions, source=None, **options):
+    timestamps = pd.to_datetime(df_revisions['revision_timestamp'], utc=True)
+    return {
+        'max_revision_id': int(df_revisions['revision_id'].max()),
+        'max_revision_timestamp': timestamps.max().isoformat(),
+        'revision_count': len(df_revisions),
+        'source': source,
+        'updated_at': time.time(),
+        **options,
+    }
+
+
+# Function to store the watermark of a pipeline once its output has been written
+def store_watermark(project, pipeline, watermark):
+    os.makedirs(WATERMARK_DIR, exist_ok=True)
+    temporary_path = f"{watermark_path(project, pipeline)}.tmp"
+    with open(temporary_path, 'w') as file:
+        json.dump(watermark, file)
+    os.replace(temporary_path, watermark_path(project, pipeline))
+    return watermark
+
+
+# Function to record the newest revision a pipeline has processed
+def save_watermark(project, pipeline, df_revisions, source=None, **options):
+    return store_watermark(project, pipeline, revision_watermark(df_revisions, source, **options))
+
+
+# Function to find the revisions added since a watermark.
+#
+# Returns a boolean mask over df_revisions, or None when the rows cannot be
+# processed incrementally: no watermark, or fewer revisions than were processed
+# before, which means upstream rewrote the history.
+def new_revisions(df_revisions, watermark):
+    if watermark is None or len(df_revisions) < watermark['revision_count']:
+        return None
+    return (df_revisions['revision_id'] > watermark['max_revision_id']).to_numpy()
+
+
+# Function to build the revisions the latest-revision transforms need for an incremental run.
+#
+# Every article already in the previous latest-revision table is represented by its
+# row in that table, which stands for all of its earlier revisions, followed by
+# the revisions added since. The transforms pick the newest value of every column
+# per article, so the result is the same as for a full run. Articles that were not
+# in the previous table (newly assessed), or whose new revisions are older than
+# their previous latest revision, contribute their whole history instead.
+def latest_revision_inputs(df_revisions, df_pages, previous_latest, new_mask):
+    timestamps = pd.to_datetime(df_revisions['revision_timestamp'], utc=True)
+    previous_timestamps = pd.Series(
+        pd.to_datetime(previous_latest['revision_timestamp'], utc=True).to_numpy(),
+        index=previous_latest['page_id'].to_numpy())
+    previous_timestamps = previous_timestamps[~previous_timestamps.index.duplicated()]
+    new_pages = df_revisions.loc[new_mask, 'page_id']
+    backdated = new_pages[(timestamps[new_mask] <= new_pages.map(previous_timestamps)).to_numpy()]
+    unseen = ~df_pages['page_id'].isin(previous_timestamps.index)
+    full_history_pages = pd.concat([df_pages.loc[unseen, 'page_id'], backdated]).unique()
+    
+    full_history = df_revisions['page_id'].isin(full_history_pages).to_numpy()
+    selected = df_revisions[new_mask | full_history].assign(revision_timestamp=timestamps[new_mask | full_history])
+    carried = previous_latest[~previous_latest['page_id'].isin(full_history_pages)]
+    carried = carried[[column for column in df_revisions.columns if column in carried.columns]]
+    # The previous table stores formatted timestamps
+    carried = carried.assign(revision_timestamp=pd.to_datetime(carried['revision_timestamp'], utc=True))
+    return pd.concat([selected, carried], ignore_index=True)
+
+
+# Function to find the rows of a new latest-revision table that differ from the previous one.
+#
+# Rows are matched on `key`; new keys and rows with any changed value (missing
+# values compare equal) are returned.
+def changed_rows(latest, previous_latest, key='page_title'):
+    if previous_latest is None or not len(previous_latest):
+        return latest
+    columns = [column for column in latest.columns if column in previous_latest.columns]
+    previous = previous_latest[columns].drop_duplicates(key).set_index(key)
+    current = latest[columns].set_index(key)
+    previous = previous.reindex(current.index)
+    value_columns = [column for column in columns if column != key]
+    changed = ~current.index.isin(previous_latest[key])
+    for column in value_columns:
+        new_values = current[column].astype(object)
+        old_values = previous[column].astype(object)
+        both_missing = new_values.isna().to_numpy() & old_values.isna().to_numpy()
+        changed |= ~(new_values.to_numpy() == old_values.to_numpy()) & ~both_missing
+    return latest[changed]